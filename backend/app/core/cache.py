@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency, only needed for CACHE_REDIS_URL=redis://...
+    redis_asyncio = None
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``set`` accepts a per-entry ``ttl`` override so callers can cap an entry's
+    lifetime (e.g. at a token's own expiry). A ``ttl`` or ``maxsize`` of 0
+    disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            self.misses += 1
+            return default
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class InMemorySharedCache:
+    """Process-local stand-in for the shared cache tier (CACHE_REDIS_URL=memory://).
+
+    Same async interface as RedisSharedCache, so tests and single-worker
+    deployments exercise the two-tier code path without a Redis server.
+    """
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return json.loads(value)
+
+    async def set(self, key: str, value, ttl: float):
+        if ttl > 0:
+            self._data[key] = (json.dumps(value), time.monotonic() + ttl)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+
+class RedisSharedCache:
+    """Shared cache tier backed by Redis; values are stored as JSON"""
+
+    def __init__(self, url: str, prefix: str = "homeshow:"):
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str):
+        value = await self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value, ttl: float):
+        if ttl > 0:
+            await self._client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._client.delete(self.prefix + key)
+
+
+def create_shared_cache(url):
+    """Build the shared tier for ``url``: None, ``memory://`` or ``redis://...``"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemorySharedCache()
+    if redis_asyncio is None:
+        print("⚠️ CACHE_REDIS_URL is set but the redis package is not installed, shared cache disabled")
+        return None
+    return RedisSharedCache(url)
@@ -5,21 +5,154 @@ import os
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./test.db"
+    DB_POOL_SIZE: int = 5  # connections kept open per engine, per worker process
+    DB_MAX_OVERFLOW: int = 10  # extra connections allowed under burst load
+    DB_POOL_TIMEOUT: float = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced (under proxy/server idle timeouts)
+    DB_POOL_PRE_PING: bool = True  # test connections on checkout so dropped ones are replaced
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # Postgres statement_timeout; 0 leaves the server default
+    HEALTH_CACHE_SECONDS: float = 2.0  # /health reuses its last database check for this long
+    HEALTH_TIMEOUT_SECONDS: float = 5.0  # a database check slower than this reports "disconnected"
+    
+    # Read replicas
+    DATABASE_REPLICA_URLS: str = ""  # comma-separated; read-only endpoints query these, writes always go to DATABASE_URL
+    REPLICA_HEALTH_INTERVAL: float = 5.0  # seconds between replica probes
+    REPLICA_MAX_LAG_SECONDS: float = 30.0  # Postgres replicas further behind are skipped; 0 disables the check
+    REPLICA_STICKY_SECONDS: float = 5.0  # a realtor's or link's reads go to the primary this long after they write
+    REPLICA_STICKY_CACHE_SIZE: int = 20000  # recent writers remembered per worker
     
     # JWT
     JWT_SECRET: str = "test-secret-key-for-development-only"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRES_IN: int = 7 * 24 * 60 * 60  # 7 days in seconds
+    # Embed profile fields in tokens so requests skip the users lookup. A
+    # token then keeps the profile it was issued with, deleted accounts
+    # included, until it expires; such tokens last JWT_PROFILE_CLAIMS_EXPIRES_IN
+    JWT_PROFILE_CLAIMS: bool = False
+    JWT_PROFILE_CLAIMS_EXPIRES_IN: int = 60 * 60  # seconds; caps JWT_EXPIRES_IN for tokens with profile claims
+    
+    # Agreement link tokens
+    LINK_TOKEN_SIGNED: bool = True  # issue HMAC-signed links (agreement id + expiry); False issues opaque random tokens
+    LINK_TOKEN_SECRET: Optional[str] = None  # defaults to a key derived from JWT_SECRET
+    LINK_TOKEN_PREVIOUS_SECRETS: str = ""  # comma-separated; links signed with these still verify during a rotation
+    
+    # Authenticated user cache. Per worker process: a profile edit or
+    # account deletion clears it only in the worker that made the change,
+    # so others may serve the old profile for up to PRINCIPAL_CACHE_TTL
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds; 0 disables
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # changing this rehashes passwords on next login
+    PASSWORD_HASH_CONCURRENCY: int = 4  # bcrypt worker threads
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # waiting logins before returning 503
+    
+    # Response serialization
+    TRUSTED_RESPONSES: bool = True  # encode payloads built from database rows with orjson, skipping response_model validation
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # /metrics endpoint and per-request instrumentation
+    SLOW_REQUEST_SECONDS: float = 0  # log requests slower than this with their SQL; 0 disables
+    # /metrics and /health/details answer callers from these networks
+    # (comma-separated IPs/CIDRs) or with "Authorization: Bearer <OPS_TOKEN>";
+    # everyone else gets a 404
+    OPS_ALLOW_IPS: str = "127.0.0.1,::1"
+    OPS_TOKEN: Optional[str] = None
     
     # Environment
     NODE_ENV: str = "development"
     PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # gunicorn workers in production; 0 = one per CPU
+    # Run the scheduled jobs (SMS outbox, sweepers, audit compaction, PDF
+    # renders) in this process. Set false on web workers when one
+    # scripts/run_background_workers.py process runs them instead
+    BACKGROUND_WORKERS: bool = True
+    AUTO_CREATE_SCHEMA: Optional[bool] = None  # create_all at startup; defaults to off in production (use Alembic)
+    
+    # Shared cache tier: unset, "memory://" (in-process stand-in) or "redis://host:6379/0"
+    CACHE_REDIS_URL: Optional[str] = None
+    
+    # Public agreement page cache
+    PUBLIC_CACHE_TTL: int = 300  # seconds in the shared tier
+    PUBLIC_CACHE_LOCAL_TTL: int = 15  # seconds in each worker's LRU; 0 disables
+    PUBLIC_CACHE_SIZE: int = 5000
+    
+    # Public endpoint rate limits (token buckets); a rate of 0 disables that limit
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # unset or "memory://": per-worker buckets; "redis://...": shared
+    RATE_LIMIT_IP_PER_MINUTE: float = 120  # public requests per client IP
+    RATE_LIMIT_IP_BURST: int = 40
+    RATE_LIMIT_TOKEN_PER_MINUTE: float = 30  # requests per agreement token
+    RATE_LIMIT_TOKEN_BURST: int = 10
+    RATE_LIMIT_MAX_KEYS: int = 100000  # buckets kept per worker by the in-memory backend
+    # Peers whose X-Forwarded-For is believed (comma-separated IPs/CIDRs, or "*"
+    # when only the platform's proxy can reach the app); everyone else's is ignored
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    NEGATIVE_TOKEN_CACHE_TTL: int = 300  # seconds an unknown token gets a 404 without a query; 0 disables
+    NEGATIVE_TOKEN_CACHE_SIZE: int = 10000
+    
+    # Agreements
+    BULK_CREATE_MAX_ITEMS: int = 200
+    TEMPLATE_CACHE_SIZE: int = 1000  # template bodies kept in memory
+    TEMPLATE_RENDER_CACHE_SIZE: int = 5000  # rendered agreement texts kept in memory
+    SIGNATURE_MAX_IMAGE_BYTES: int = 262144  # base64 characters in a signature PNG data URL
+    SIGNATURE_MAX_POINTS: int = 20000  # stroke points per signature
+    SIGNATURE_MAX_IMAGE_WIDTH: int = 2000  # pixels; larger PNGs are rejected, and never decoded
+    SIGNATURE_MAX_IMAGE_HEIGHT: int = 1000
+    
+    # Archive sweeper
+    ARCHIVE_SWEEP_INTERVAL: float = 3600.0  # seconds between sweeps; 0 disables the in-process sweeper
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_EXPIRED_GRACE_HOURS: int = 24  # unsigned agreements stay this long past expiry
+    ARCHIVE_SIGNED_AFTER_DAYS: int = 30  # signed agreements stay this long after signing
+    
+    # Dashboard counters (agreement_counters) and the expiry sweeper feeding them
+    EXPIRY_SWEEP_INTERVAL: float = 60.0  # seconds between passes marking past-expiry agreements expired; 0 disables the in-process sweeper
+    EXPIRY_BATCH_SIZE: int = 500  # agreements per expiry transaction
+    
+    # Signed agreement PDFs
+    PDF_RENDER_ENABLED: bool = True
+    PDF_STORAGE_DIR: str = "./storage/pdfs"  # content-addressed; share it between workers/instances
+    PDF_RENDER_CONCURRENCY: int = 1  # render threads per worker process
+    PDF_RENDER_BATCH_SIZE: int = 20
+    PDF_POLL_INTERVAL: float = 30.0  # seconds between passes for missed agreements
+    PDF_MAX_ATTEMPTS: int = 5  # failed renders are retried until this many, then left to scripts/render_pdfs.py
+    PDF_RETRY_BASE_SECONDS: int = 300  # doubled after each failed render
+    PDF_UNICODE_FONT: Optional[str] = None  # TrueType (.ttf) file for text outside Western European, e.g. Noto Sans CJK
+    
+    # Realtor event stream (GET /api/events)
+    EVENTS_REDIS_URL: Optional[str] = None  # unset: events reach this worker's streams only; "memory://" or "redis://..." for the pub/sub path
+    EVENTS_HEARTBEAT_SECONDS: float = 25.0  # keep-alive comments so proxies don't close idle streams
+    EVENTS_QUEUE_SIZE: int = 100  # undelivered events per stream before it is closed (the client reconnects)
+    EVENTS_MAX_STREAMS_PER_USER: int = 20
+    EVENTS_STREAM_MAX_SECONDS: float = 900.0  # streams end after this long so deploys can drain; EventSource reconnects
+    EVENTS_TICKET_SECONDS: int = 60  # lifetime of a ?ticket= for opening a stream (EventSource can't send a Bearer header)
+    
+    # /view write coalescing
+    VIEW_FLUSH_INTERVAL: float = 5.0  # seconds between bulk agreement_events inserts
+    VIEW_BUFFER_TOKEN_CACHE_SIZE: int = 20000
+    VIEW_BUFFER_MAX_PENDING: int = 50000  # buffered views kept while flushes fail; the oldest are dropped past this
+    
+    # Audit events (agreement_events) and their compaction into audit_trail
+    AUDIT_COMPACT_INTERVAL: float = 600.0  # seconds between compaction passes; 0 disables the in-process compactor
+    AUDIT_COMPACT_QUIET_SECONDS: float = 3600.0  # a final agreement is compacted once its last event is this old
+    AUDIT_COMPACT_BATCH_SIZE: int = 200  # agreements per compaction transaction
     
     # Twilio (optional)
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
     
+    # SMS outbox
+    SMS_TRANSPORT: str = "twilio"  # "twilio" or "fake" (records messages, for offline testing)
+    SMS_OUTBOX_BATCH_SIZE: int = 50
+    SMS_OUTBOX_POLL_INTERVAL: float = 5.0  # seconds between passes when idle
+    SMS_RATE_PER_SECOND: float = 10.0  # per worker process
+    SMS_SEND_CONCURRENCY: int = 4
+    SMS_MAX_ATTEMPTS: int = 5
+    SMS_RETRY_BASE_SECONDS: int = 30  # doubled after each failed attempt
+    SMS_SEND_TIMEOUT: float = 10.0  # seconds for each Twilio connect and read; the claim lease is sized from it
+    SMS_OUTBOX_RETENTION_HOURS: float = 72.0  # sent and failed messages, whose body holds the signing link, are deleted after this
+    
     # Frontend URL
     FRONTEND_URL: Optional[str] = None
     
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import struct
+import time
+import uuid
+from datetime import datetime
+
+from app.core.config import settings
+
+# Version byte, agreement id (16 UUID bytes), expiry (Unix seconds)
+PAYLOAD = struct.Struct(">B16sI")
+VERSION = 1
+MAC_BYTES = 16
+
+# Signed tokens are "<payload>.<mac>"; secrets.token_urlsafe never emits a dot
+SEPARATOR = "."
+PAYLOAD_CHARS = 28  # base64url of PAYLOAD.size bytes, unpadded
+MAC_CHARS = 22  # base64url of MAC_BYTES bytes, unpadded
+
+
+class InvalidLinkToken(Exception):
+    """A signed link token that is malformed, forged or expired"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def derive_key(secret: str) -> bytes:
+    # A separate key, so link MACs and JWT signatures never share one
+    return hmac.new(secret.encode(), b"homeshow agreement links v1", hashlib.sha256).digest()
+
+
+class LinkTokenSigner:
+    """Issues and checks agreement link tokens that carry their own id and expiry.
+
+    A signed token is the agreement id and expiry plus a truncated
+    HMAC-SHA256 over both. Forged, truncated and expired links are
+    rejected here, with no cache or database lookup, and valid ones are
+    resolved by primary key. Tokens without the separator are the opaque
+    random tokens issued before; ``verify`` returns None for those and the
+    caller falls back to the lookup by token.
+    """
+
+    def __init__(self, secret: str, previous_secrets=()):
+        # The first key signs; the rest only verify, so a rotation doesn't break sent links
+        self._keys = [derive_key(secret)] + [derive_key(previous) for previous in previous_secrets]
+        self.verified = 0
+        self.opaque = 0
+        self.rejected = {"malformed": 0, "forged": 0, "expired": 0}
+
+    def _mac(self, key: bytes, payload: bytes) -> bytes:
+        return hmac.new(key, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+    def issue(self, agreement_id: str, expires_at: datetime) -> str:
+        # Rounded up so the link never dies before the row does
+        expires = calendar.timegm(expires_at.utctimetuple()) + (1 if expires_at.microsecond else 0)
+        payload = PAYLOAD.pack(VERSION, uuid.UUID(str(agreement_id)).bytes, expires)
+        return _b64encode(payload) + SEPARATOR + _b64encode(self._mac(self._keys[0], payload))
+
+    def verify(self, token: str, now: float = None):
+        """The agreement id of a valid signed token, or None for an opaque one.
+
+        Raises InvalidLinkToken for a signed token that is malformed,
+        doesn't match any key, or has expired.
+        """
+        if SEPARATOR not in token:
+            self.opaque += 1
+            return None
+        encoded_payload, _, encoded_mac = token.partition(SEPARATOR)
+        try:
+            if len(encoded_payload) != PAYLOAD_CHARS or len(encoded_mac) != MAC_CHARS:
+                raise ValueError("wrong length")
+            payload = _b64decode(encoded_payload)
+            mac = _b64decode(encoded_mac)
+            version, id_bytes, expires = PAYLOAD.unpack(payload)
+        except (ValueError, binascii.Error, struct.error):
+            self.rejected["malformed"] += 1
+            raise InvalidLinkToken("malformed")
+        if version != VERSION or not any(hmac.compare_digest(mac, self._mac(key, payload)) for key in self._keys):
+            self.rejected["forged"] += 1
+            raise InvalidLinkToken("forged")
+        if expires <= (time.time() if now is None else now):
+            self.rejected["expired"] += 1
+            raise InvalidLinkToken("expired")
+        self.verified += 1
+        return str(uuid.UUID(bytes=id_bytes))
+
+    def stats(self) -> dict:
+        return {
+            "signed": settings.LINK_TOKEN_SIGNED,
+            "verified": self.verified,
+            "opaque": self.opaque,
+            "rejected_malformed": self.rejected["malformed"],
+            "rejected_forged": self.rejected["forged"],
+            "rejected_expired": self.rejected["expired"],
+        }
+
+
+link_tokens = LinkTokenSigner(
+    settings.LINK_TOKEN_SECRET or settings.JWT_SECRET,
+    [secret.strip() for secret in settings.LINK_TOKEN_PREVIOUS_SECRETS.split(",") if secret.strip()],
+)
@@ -0,0 +1,259 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+# Prometheus' default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # label values -> [per-bucket counts, sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ("le",), label_values + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """Metrics for this process, rendered in the Prometheus text format.
+
+    ``collectors`` are called on every scrape and return
+    ``(name, help, value)`` gauges, for numbers other services already keep
+    (cache hit counts, outbox totals, ...).
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, help, value in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route"))
+requests_total = registry.counter(
+    "http_requests_total", "Requests by route and status code", ("method", "route", "status"))
+request_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), QUERY_COUNT_BUCKETS)
+request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("route",))
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duration of each SQL statement")
+span_duration = registry.histogram(
+    "span_duration_seconds", "Duration of instrumented hot-path operations", ("span",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if settings.SLOW_REQUEST_SECONDS > 0 else None
+
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block into span_duration_seconds{span=name}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_duration.observe(time.perf_counter() - started, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    db_query_duration.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+            stats.statements.append((elapsed, statement))
+
+
+def instrument_engine(engine):
+    """Count and time every statement ``engine`` runs (pass ``async_engine.sync_engine`` for async engines)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(scope) -> str:
+    """The matched route's template, e.g. /api/agreements/public/{token}.
+
+    Raw paths would turn every token into its own label. The route only
+    knows its path within its router, so the mount prefix is recovered by
+    rendering the route with this request's path params and stripping that
+    suffix off the request path.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    path = scope["path"]
+    try:
+        rendered = path_format.format(**{name: str(value) for name, value in scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    if path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + path_format
+    return path_format
+
+
+class MetricsMiddleware:
+    """Records latency, status and per-request SQL counts for every HTTP request.
+
+    With SLOW_REQUEST_SECONDS set, requests slower than that are logged with
+    the SQL statements they ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            method = scope["method"]
+            route = route_label(scope)
+            request_duration.observe(elapsed, method, route)
+            requests_total.inc(method, route, status_code)
+            request_db_queries.observe(stats.queries, route)
+            request_db_seconds.observe(stats.db_seconds, route)
+            if 0 < settings.SLOW_REQUEST_SECONDS <= elapsed:
+                # The route, not the path: public paths carry live link tokens
+                log_slow_request(method, route, status_code, elapsed, stats)
+
+
+def log_slow_request(method: str, route: str, status_code: int, elapsed: float, stats: RequestStats):
+    print(
+        f"🐢 Slow request: {method} {route} -> {status_code} in {elapsed:.3f}s, "
+        f"{stats.queries} queries ({stats.db_seconds:.3f}s in SQL)"
+    )
+    for query_seconds, statement in stats.statements or ():
+        print(f"    {query_seconds * 1000:.1f}ms  {' '.join(statement.split())}")
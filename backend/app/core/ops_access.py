@@ -0,0 +1,43 @@
+import hmac
+import ipaddress
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+
+def _networks(value: str):
+    networks = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if entry:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+    return networks
+
+
+def _from_allowed_network(request: Request) -> bool:
+    if request.client is None:
+        return False
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return any(address in network for network in _networks(settings.OPS_ALLOW_IPS))
+
+
+def _has_ops_token(request: Request) -> bool:
+    if not settings.OPS_TOKEN:
+        return False
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), settings.OPS_TOKEN.encode())
+
+
+async def require_ops_access(request: Request):
+    """Dependency for /metrics and /health/details.
+
+    ``request.client`` is the X-Forwarded-For client only for proxies in
+    FORWARDED_ALLOW_IPS, so a caller outside OPS_ALLOW_IPS can't claim an
+    internal address. Denied callers get a 404, as if the route didn't exist.
+    """
+    if not (_from_allowed_network(request) or _has_ops_token(request)):
+        raise HTTPException(status_code=404, detail="Not Found")
@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency, only needed for RATE_LIMIT_REDIS_URL=redis://...
+    redis_asyncio = None
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets in this process (RATE_LIMIT_REDIS_URL unset or memory://).
+
+    Each worker keeps its own buckets, so with N workers a client can get up
+    to N times the configured rate. Least recently used buckets beyond
+    ``maxsize`` are dropped; a dropped bucket simply starts full again.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill, take and save in one round trip; Redis' clock keeps workers consistent
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every worker and instance, one Redis hash per key"""
+
+    def __init__(self, url: str, prefix: str = "homeshow:ratelimit:"):
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[rate, burst]))
+
+    def __len__(self):
+        return 0
+
+
+def create_rate_limit_backend(url):
+    """Bucket storage for ``url``: unset / ``memory://`` (per worker) or ``redis://...``"""
+    if not url or url.startswith("memory://"):
+        return InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if redis_asyncio is None:
+        print("⚠️ RATE_LIMIT_REDIS_URL is set but the redis package is not installed, using per-worker buckets")
+        return InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return RedisRateLimitBackend(url)
+
+
+class PublicRateLimiter:
+    """Token-bucket limits for the unauthenticated agreement endpoints.
+
+    Every request takes a token from its client IP's bucket and from its
+    agreement token's bucket, before any cache or database lookup. The IP
+    limit caps what one client can scan; the token limit caps how hard a
+    single (leaked or scraped) link can be hit from many addresses.
+    Rejected requests get 429 with Retry-After.
+    """
+
+    def __init__(self):
+        self.backend = create_rate_limit_backend(settings.RATE_LIMIT_REDIS_URL)
+        self.allowed = 0
+        self.limited = {"ip": 0, "token": 0}
+        self.backend_errors = 0
+
+    async def check(self, client_ip: str, token: str):
+        limits = (
+            ("ip", client_ip, settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST),
+            ("token", token, settings.RATE_LIMIT_TOKEN_PER_MINUTE, settings.RATE_LIMIT_TOKEN_BURST),
+        )
+        for scope, key, per_minute, burst in limits:
+            if per_minute <= 0:
+                continue
+            try:
+                wait = await self.backend.take(f"{scope}:{key}", per_minute / 60, burst)
+            except Exception as e:
+                # An unreachable shared backend must not take the public pages down
+                self.backend_errors += 1
+                print(f"⚠️ Rate limit backend error: {e}")
+                continue
+            if wait > 0:
+                self.limited[scope] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "limited_ip": self.limited["ip"],
+            "limited_token": self.limited["token"],
+            "backend": type(self.backend).__name__,
+            "backend_errors": self.backend_errors,
+            "buckets": len(self.backend),
+        }
+
+
+public_rate_limiter = PublicRateLimiter()
+
+
+async def limit_public_request(token: str, request: Request):
+    """Dependency for the /public/{token} routes.
+
+    ``request.client`` is the proxy's peer address unless the proxy is in
+    FORWARDED_ALLOW_IPS, in which case uvicorn has already replaced it with
+    the X-Forwarded-For client, so a direct caller can't pick its own bucket.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    await public_rate_limiter.check(client_ip, token)
@@ -0,0 +1,119 @@
+from typing import List, Optional, Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency; responses fall back to the stdlib encoder
+    orjson = None
+
+_MISSING = object()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson, which handles datetimes natively
+    and is several times faster than jsonable_encoder + json.dumps"""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(content))
+        return orjson.dumps(content)
+
+
+def _nested_schema(annotation):
+    """(model, many) for a field holding a model or a list of them, else None"""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+    if get_origin(annotation) is list:
+        nested = _nested_schema(get_args(annotation)[0])
+        return (nested[0], True) if nested else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return (annotation, False)
+    return None
+
+
+class ResponseSchema:
+    """Writes a response model's JSON straight from ORM objects, rows or dicts.
+
+    Values are read by field name, as ``from_attributes`` would, from an
+    object's attributes or a dict's keys. With TRUSTED_RESPONSES on they
+    are encoded with orjson and not validated: the payloads come from our
+    own rows, so response_model validation only re-checked what the
+    columns already guarantee, and cost more than the encoding. Fields are
+    written in declaration order with their defaults, so the body is the
+    same as the validated one. With it off, the same values are validated
+    against the model and serialized by pydantic, so a mismatch fails the
+    request as response_model validation did.
+    """
+
+    def __init__(self, schema, many: bool = False):
+        self.schema = schema
+        self.many = many
+        self._adapter = TypeAdapter(List[schema] if many else schema)
+        self._fields = None
+
+    def _plan(self):
+        if self._fields is None:
+            fields = []
+            for name, field in self.schema.model_fields.items():
+                nested = _nested_schema(field.annotation)
+                default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+                fields.append((name, default, ResponseSchema(*nested) if nested else None))
+            self._fields = fields
+        return self._fields
+
+    def _value(self, obj, name: str, default):
+        if isinstance(obj, dict):
+            return obj[name] if default is _MISSING else obj.get(name, default)
+        return getattr(obj, name) if default is _MISSING else getattr(obj, name, default)
+
+    def _dump_one(self, obj) -> dict:
+        payload = {}
+        for name, default, nested in self._plan():
+            value = self._value(obj, name, default)
+            if nested is not None and value is not None:
+                value = nested.dump(value)
+            payload[name] = value
+        return payload
+
+    def _dump_rows(self, rows) -> list:
+        # Result rows (and namedtuples): find each field's position once and
+        # index the rows as tuples; attribute access on a Row costs far more
+        positions = {name: index for index, name in enumerate(rows[0]._fields)}
+        plan = []
+        for name, default, nested in self._plan():
+            position = positions.get(name)
+            if position is None and default is _MISSING:
+                raise AttributeError(f"rows have no column {name!r} for {self.schema.__name__}")
+            plan.append((name, position, default))
+        return [
+            {name: default if position is None else row[position] for name, position, default in plan}
+            for row in rows
+        ]
+
+    def dump(self, content):
+        """The JSON-ready dict (or list of dicts) for ``content``, unvalidated"""
+        if not self.many:
+            return self._dump_one(content)
+        content = list(content)
+        if content and hasattr(content[0], "_fields") and not any(nested for _, _, nested in self._plan()):
+            return self._dump_rows(content)
+        return [self._dump_one(obj) for obj in content]
+
+    def response(self, content, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+        """A finished response, so FastAPI skips its own validation and encoding.
+        Headers set on an injected ``Response`` are not applied to it; pass them here."""
+        if settings.TRUSTED_RESPONSES:
+            return FastJSONResponse(self.dump(content), status_code=status_code, headers=headers)
+        # Validate the mapped dicts rather than the objects: same values,
+        # and reading them here is cheaper than from_attributes on Rows
+        value = self._adapter.validate_python(self.dump(content))
+        return Response(self._adapter.dump_json(value), status_code=status_code, headers=headers, media_type="application/json")
@@ -1,20 +1,92 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Text, Integer
+from sqlalchemy import create_engine, event, Column, String, DateTime, Boolean, Text, Integer, BigInteger, LargeBinary, Index, text, table, column
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, deferred
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 import uuid
 from datetime import datetime
 import os
 
-# Database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+from app.core.config import settings
 
-# Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+# Database URL from environment (or .env, via Settings)
+DATABASE_URL = settings.DATABASE_URL
 
-# Create session factory
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)"""
+    if url.startswith("postgres://"):
+        # Heroku/Railway style URLs
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url[len("postgresql+psycopg2://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool and connection options from Settings for an engine on ``url``"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+def pool_stats(engine) -> dict:
+    """Checked-out / overflow counts for QueuePool-style pools"""
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+# Create engine (used for schema creation, migrations and scripts)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+# Create async engine (used by the request handlers)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+# Async engines on the read replicas (DATABASE_REPLICA_URLS), one pool each;
+# app/services/replicas.py routes read-only handlers to them
+REPLICA_URLS = [get_async_database_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+replica_engines = [create_async_engine(url, **engine_options(url, is_async=True)) for url in REPLICA_URLS]
+
+def dispose_engines_after_fork():
+    """Give a forked worker its own pools.
+
+    With a preloaded app the engines are created in the parent; any
+    connection it opened must not be shared with the children.
+    ``close=False`` leaves the parent's connections alone.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in replica_engines:
+        replica.sync_engine.dispose(close=False)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create base class
 Base = declarative_base()
@@ -27,6 +99,11 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # User model
 class User(Base):
     __tablename__ = "users"
@@ -56,7 +133,10 @@ class Agreement(Base):
     client_email = Column(String(255))
     meeting_type = Column(String(100), nullable=False)
     state = Column(String(2), nullable=False)
-    agreement_text = Column(Text, nullable=False)
+    # Legacy rows keep the full text here; newer rows reference a template
+    agreement_text = Column(Text)
+    template_hash = Column(String(64))
+    template_vars = Column(SQLiteJSON)
     status = Column(String(50), default="draft")
     security_token = Column(String(255), unique=True, nullable=False)
     expires_at = Column(DateTime, nullable=False)
@@ -64,8 +144,190 @@ class Agreement(Base):
     signed_at = Column(DateTime)
     client_ip = Column(String(45))
     user_agent = Column(Text)
+    # Summary only; the signature itself is packed into signature_blob
+    # (see app/services/signatures.py), which is loaded only on request
+    signature_data = Column(SQLiteJSON)
+    signature_blob = deferred(Column(LargeBinary))
+    pdf_url = Column(String(500))
+    # Failed PDF renders: retried with backoff until PDF_MAX_ATTEMPTS
+    pdf_attempts = Column(Integer)
+    pdf_error = Column(String(1000))
+    pdf_retry_at = Column(DateTime)
+    audit_trail = Column(SQLiteJSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Keyset pagination of a realtor's agreements (newest first, ties
+        # by id); also serves every plain user_id filter
+        Index("idx_agreements_user_id_created_at", "user_id", "created_at", "id"),
+        Index("idx_agreements_status", "status"),
+        # Unsigned agreements by expiry: the only rows expiry jobs care about
+        Index(
+            "idx_agreements_open_expires_at",
+            "expires_at",
+            postgresql_where=text("signed_at IS NULL"),
+            sqlite_where=text("signed_at IS NULL"),
+        ),
+        # Signed agreements old enough to archive
+        Index(
+            "idx_agreements_signed_at",
+            "signed_at",
+            postgresql_where=text("signed_at IS NOT NULL"),
+            sqlite_where=text("signed_at IS NOT NULL"),
+        ),
+        # Signed agreements still waiting for their PDF
+        Index(
+            "idx_agreements_pdf_pending",
+            "signed_at",
+            postgresql_where=text("signed_at IS NOT NULL AND pdf_url IS NULL"),
+            sqlite_where=text("signed_at IS NOT NULL AND pdf_url IS NULL"),
+        ),
+    )
+
+# Expired and finished agreements, moved out of the hot table by the
+# archive sweeper. On Postgres the table is range-partitioned by month of
+# created_at (the partition key has to be part of the primary key).
+class AgreementArchive(Base):
+    __tablename__ = "agreements_archive"
+    
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(36), nullable=False)
+    client_name = Column(String(255), nullable=False)
+    client_phone = Column(String(20), nullable=False)
+    client_email = Column(String(255))
+    meeting_type = Column(String(100), nullable=False)
+    state = Column(String(2), nullable=False)
+    agreement_text = Column(Text)
+    template_hash = Column(String(64))
+    template_vars = Column(SQLiteJSON)
+    status = Column(String(50))
+    security_token = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    viewed_at = Column(DateTime)
+    signed_at = Column(DateTime)
+    client_ip = Column(String(45))
+    user_agent = Column(Text)
     signature_data = Column(SQLiteJSON)
+    signature_blob = deferred(Column(LargeBinary))
     pdf_url = Column(String(500))
+    pdf_attempts = Column(Integer)
+    pdf_error = Column(String(1000))
+    pdf_retry_at = Column(DateTime)
     audit_trail = Column(SQLiteJSON)
+    created_at = Column(DateTime, primary_key=True)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("idx_agreements_archive_user_id_created_at", "user_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+# Distinct agreement bodies, stored once and keyed by SHA-256
+class AgreementTemplate(Base):
+    __tablename__ = "agreement_templates"
+    
+    hash = Column(String(64), primary_key=True)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Append-only audit events: one row per view, signature or SMS outcome.
+# Once an agreement is final its events are compacted into audit_trail
+# (see app/services/audit_log.py).
+class AgreementEvent(Base):
+    __tablename__ = "agreement_events"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    agreement_id = Column(String(36), nullable=False)
+    event = Column(String(30), nullable=False)  # view, sign, sms_sent, sms_failed
+    at = Column(DateTime, nullable=False)
+    client_ip = Column(String(45))
+    user_agent = Column(Text)
+    data = Column(SQLiteJSON)
+    
+    __table_args__ = (
+        # An agreement's timeline, and the compactor's per-agreement reads
+        Index("idx_agreement_events_agreement_id_at", "agreement_id", "at"),
+    )
+
+# Client search index (app/services/search.py): one row per agreement,
+# live or archived, with the searchable fields normalized. On SQLite it is
+# an FTS5 virtual table and on Postgres a table with a pg_trgm index, so
+# it is not a mapped model; its DDL runs after create_all and in migration 0009.
+agreement_search = table(
+    "agreement_search",
+    column("agreement_id", String),
+    column("user_id", String),  # without dashes, see search.owner_key()
+    column("created_at", DateTime),
+    column("client_name", Text),
+    column("client_phone", Text),
+    column("client_email", Text),
+    column("meeting_type", Text),
+    column("document", Text),  # Postgres only: the fields above, space-separated
+)
+
+SEARCH_INDEX_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS agreement_search USING fts5("
+        "agreement_id UNINDEXED, user_id, created_at UNINDEXED, "
+        "client_name, client_phone, client_email, meeting_type, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        # Lets the user_id equality share the trigram index
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "CREATE TABLE IF NOT EXISTS agreement_search ("
+        "agreement_id VARCHAR(36) PRIMARY KEY, "
+        "user_id VARCHAR(36) NOT NULL, "
+        "created_at TIMESTAMP NOT NULL, "
+        "client_name TEXT NOT NULL, "
+        "client_phone TEXT NOT NULL, "
+        "client_email TEXT NOT NULL, "
+        "meeting_type TEXT NOT NULL, "
+        "document TEXT GENERATED ALWAYS AS "
+        "(client_name || ' ' || client_phone || ' ' || client_email || ' ' || meeting_type) STORED)",
+        "CREATE INDEX IF NOT EXISTS idx_agreement_search_user_id_document "
+        "ON agreement_search USING gin (user_id, document gin_trgm_ops)",
+    ],
+}
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    for statement in SEARCH_INDEX_DDL.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+# Per-realtor agreement counts by status, live and archived, moved in the
+# same transaction as each status change (app/services/counters.py), so the
+# dashboard summary is one primary-key read
+class AgreementCounter(Base):
+    __tablename__ = "agreement_counters"
+
+    user_id = Column(String(36), primary_key=True)
+    draft = Column(Integer, nullable=False, default=0)
+    viewed = Column(Integer, nullable=False, default=0)
+    signed = Column(Integer, nullable=False, default=0)
+    expired = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Outbound SMS outbox, written in the same transaction as the agreement
+class SmsOutbox(Base):
+    __tablename__ = "sms_outbox"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    agreement_id = Column(String(36))
+    to_phone = Column(String(20), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    provider_message_id = Column(String(64))
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    sent_at = Column(DateTime)
+    
+    __table_args__ = (
+        # The worker's claim query
+        Index("idx_sms_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -1,168 +1,570 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import select, update, insert, tuple_, union_all
+from pydantic import ValidationError
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+import base64
+import hmac
 import secrets
+import uuid
 from typing import List, Optional
 
-from app.database import get_db, User, Agreement
-from app.routers.auth import get_current_user
-from app.schemas.agreements import AgreementCreate, AgreementResponse, AgreementPublic
-from app.services.sms import send_agreement_sms
+from app.database import get_async_db, User, Agreement, AgreementArchive, AgreementEvent
+from app.routers.auth import get_current_user, get_read_db
+from app.schemas.agreements import (
+    AgreementCreate, AgreementCreated, AgreementResponse, AgreementPublic,
+    AgreementBulkCreate, AgreementBulkResponse, AgreementSign, AgreementSummary
+)
+from app.services.sms_outbox import enqueue_agreement_sms, enqueue_agreement_sms_bulk, sms_worker
+from app.services.agreement_cache import public_agreement_cache, unknown_tokens, build_public_payload, etag_matches
+from app.services.view_buffer import view_buffer
+from app.services.audit_log import audit_event, agreement_timeline
+from app.services.search import index_agreements, search_agreement_ids
+from app.services.counters import count_created, count_transition, counter_summary
+from app.services.templates import template_store, extract_template, agreement_variables
+from app.services.pdf_store import pdf_store, pdf_digest
+from app.services.pdf_worker import pdf_worker
+from app.services.signatures import compact_signature, decode_signature
+from app.services.events import event_hub, agreement_event
+from app.services.replicas import replica_router, read_from_primary
 from app.core.config import settings
+from app.core.rate_limit import limit_public_request
+from app.core.link_tokens import link_tokens, InvalidLinkToken
+from app.core.serialization import FastJSONResponse, ResponseSchema
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
-def generate_security_token():
+agreement_created_json = ResponseSchema(AgreementCreated)
+agreement_list_json = ResponseSchema(AgreementResponse, many=True)
+agreement_bulk_json = ResponseSchema(AgreementBulkResponse)
+agreement_public_json = ResponseSchema(AgreementPublic)
+
+# Columns needed for AgreementResponse; the large text/JSON columns stay on disk
+AGREEMENT_LIST_COLUMNS = (
+    Agreement.id,
+    Agreement.client_name,
+    Agreement.client_phone,
+    Agreement.meeting_type,
+    Agreement.state,
+    Agreement.status,
+    Agreement.created_at,
+    Agreement.expires_at,
+    Agreement.signed_at,
+    Agreement.pdf_url,
+)
+
+def agreement_list_query(model, user_id: str, status_filter, created_after, created_before, cursor, limit):
+    """The listing query against ``agreements`` or ``agreements_archive``"""
+    query = select(*(getattr(model, column.key) for column in AGREEMENT_LIST_COLUMNS)).where(model.user_id == user_id)
+    if status_filter:
+        query = query.where(model.status == status_filter)
+    if created_after:
+        query = query.where(model.created_at >= created_after)
+    if created_before:
+        query = query.where(model.created_at < created_before)
+    if cursor:
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(*cursor))
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if limit:
+        # One extra row tells us whether another page exists
+        query = query.limit(limit + 1)
+    return query
+
+def user_agreements_query(user_id: str, status_filter, created_after, created_before, cursor, limit, include_archived: bool):
+    """The /user listing: live agreements, merged with archived ones unless
+    ``include_archived`` is false"""
+    filters = (user_id, status_filter, created_after, created_before, cursor, limit)
+    query = agreement_list_query(Agreement, *filters)
+    if include_archived:
+        # Each side is already ordered and limited; merge them and take the page
+        merged = union_all(
+            select(query.subquery()),
+            select(agreement_list_query(AgreementArchive, *filters).subquery()),
+        ).subquery()
+        query = select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc())
+        if limit:
+            query = query.limit(limit + 1)
+    return query
+
+def active_agreement_query(token: str, agreement_id: str, now: datetime):
+    if agreement_id is not None:
+        # Signed link: by primary key
+        condition = Agreement.id == agreement_id
+    else:
+        # Opaque link issued before signed tokens
+        condition = Agreement.security_token == token
+    return select(Agreement).where(condition, Agreement.expires_at > now)
+
+def search_results_query(ids):
+    # By primary key only: with user_id in the WHERE clause SQLite prefers
+    # the user_id index and walks every agreement the realtor has. The
+    # owner is checked on the rows instead.
+    return union_all(*(
+        select(*(getattr(model, column.key) for column in AGREEMENT_LIST_COLUMNS), model.user_id)
+        .where(model.id.in_(ids))
+        for model in (Agreement, AgreementArchive)
+    ))
+
+def generate_security_token(agreement_id: str, expires_at: datetime) -> str:
+    if settings.LINK_TOKEN_SIGNED:
+        return link_tokens.issue(agreement_id, expires_at)
     return secrets.token_urlsafe(32)
 
-@router.post("/", response_model=AgreementResponse)
+def agreement_not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Agreement not found or expired"
+    )
+
+def signed_agreement_id(token: str):
+    """The agreement id a signed link carries (None for an opaque token).
+    Forged and expired links get their 404 here, before any cache or
+    database lookup."""
+    try:
+        return link_tokens.verify(token)
+    except InvalidLinkToken:
+        raise agreement_not_found()
+
+def encode_cursor(created_at: datetime, agreement_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{agreement_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, agreement_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), agreement_id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+async def get_active_agreement(db: AsyncSession, token: str, agreement_id: str = None) -> Agreement:
+    """The unexpired agreement for ``token``; ``agreement_id`` is what
+    ``signed_agreement_id`` returned for it (None for an opaque token)"""
+    agreement = None
+    if unknown_tokens.get(token) is None:
+        query = active_agreement_query(token, agreement_id, datetime.utcnow())
+        agreement = (await db.execute(query)).scalars().first()
+        if agreement is None and read_from_primary(db):
+            # A link opened right after it was sent can beat replication;
+            # ask the primary before caching the token as unknown
+            agreement = (await db.execute(query)).scalars().first()
+        # A valid MAC for this id is not enough on its own: the link must be the
+        # token the agreement was issued with. This isn't revocation; the public
+        # cache and the view memo answer repeat requests without reaching here
+        if agreement is not None and agreement_id is not None and not hmac.compare_digest(agreement.security_token, token):
+            agreement = None
+    
+    if not agreement:
+        unknown_tokens.set(token, True)
+        raise agreement_not_found()
+    return agreement
+
+@router.post("/", response_model=AgreementCreated)
 async def create_agreement(
     agreement_data: AgreementCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Generate security token and expiration
-    security_token = generate_security_token()
-    expires_at = datetime.utcnow() + timedelta(hours=48)
+    # Generate id, expiration and the security token that carries both
+    agreement_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    expires_at = now + timedelta(hours=48)
+    security_token = generate_security_token(agreement_id, expires_at)
+    
+    # Store the text as a shared template plus this client's values
+    template_body, template_vars = extract_template(
+        agreement_data.agreement_text,
+        agreement_variables(agreement_data.client_name, agreement_data.client_phone, agreement_data.client_email, current_user)
+    )
+    template_hash = await template_store.intern(db, template_body)
     
     # Create agreement
     db_agreement = Agreement(
+        id=agreement_id,
         user_id=current_user.id,
         client_name=agreement_data.client_name,
         client_phone=agreement_data.client_phone,
         client_email=agreement_data.client_email,
         meeting_type=agreement_data.meeting_type,
         state=agreement_data.state,
-        agreement_text=agreement_data.agreement_text,
+        template_hash=template_hash,
+        template_vars=template_vars,
         security_token=security_token,
-        expires_at=expires_at
+        expires_at=expires_at,
+        created_at=now
     )
     
     db.add(db_agreement)
-    db.commit()
-    db.refresh(db_agreement)
+    # Searchable as soon as it exists: indexed in the same transaction
+    await index_agreements(db, [db_agreement])
+    await count_created(db, current_user.id)
+    
+    # Queue the SMS in the same transaction; the outbox worker sends it
+    if sms_worker.enabled:
+        await db.flush()
+        enqueue_agreement_sms(db, db_agreement, f"{current_user.first_name} {current_user.last_name}")
     
-    # Send SMS notification (optional)
-    if settings.TWILIO_ACCOUNT_SID:
+    await db.commit()
+    await db.refresh(db_agreement)
+    await replica_router.mark_write(current_user.id)
+    sms_worker.notify()
+    
+    return agreement_created_json.response(db_agreement)
+
+@router.post("/bulk", response_model=AgreementBulkResponse)
+async def create_agreements_bulk(
+    bulk_data: AgreementBulkCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many agreements in one transaction with one multi-row INSERT.
+    Invalid items are reported in their result and skipped; the rest are
+    created and their SMS queued together."""
+    if len(bulk_data.items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_CREATE_MAX_ITEMS} agreements per request"
+        )
+    
+    now = datetime.utcnow()
+    expires_at = now + timedelta(hours=48)
+    results = []
+    rows = []
+    template_bodies = []
+    for index, item in enumerate(bulk_data.items):
         try:
-            await send_agreement_sms(
-                db_agreement.client_phone,
-                db_agreement.client_name,
-                security_token,
+            agreement_data = AgreementCreate.model_validate(item)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+            results.append({"index": index, "success": False, "error": error})
+            continue
+        template_body, template_vars = extract_template(
+            agreement_data.agreement_text,
+            agreement_variables(agreement_data.client_name, agreement_data.client_phone, agreement_data.client_email, current_user)
+        )
+        template_bodies.append(template_body)
+        agreement_id = str(uuid.uuid4())
+        row = {
+            "id": agreement_id,
+            "user_id": current_user.id,
+            "client_name": agreement_data.client_name,
+            "client_phone": agreement_data.client_phone,
+            "client_email": agreement_data.client_email,
+            "meeting_type": agreement_data.meeting_type,
+            "state": agreement_data.state,
+            "template_vars": template_vars,
+            "status": "draft",
+            "security_token": generate_security_token(agreement_id, expires_at),
+            "expires_at": expires_at,
+            "created_at": now,
+            "updated_at": now,
+        }
+        rows.append(row)
+        results.append({"index": index, "success": True, "agreement": row})
+    
+    if rows:
+        # Every distinct template is stored once, however many items share it
+        template_hashes = await template_store.intern_many(db, template_bodies)
+        for row, template_hash in zip(rows, template_hashes):
+            row["template_hash"] = template_hash
+        await db.execute(insert(Agreement), rows)
+        await index_agreements(db, rows)
+        await count_created(db, current_user.id, len(rows))
+        if sms_worker.enabled:
+            await enqueue_agreement_sms_bulk(
+                db,
+                [Agreement(**row) for row in rows],
                 f"{current_user.first_name} {current_user.last_name}"
             )
-        except Exception as e:
-            print(f"SMS sending failed: {e}")
+        await db.commit()
+        await replica_router.mark_write(current_user.id)
+        sms_worker.notify()
     
-    return {
-        "id": str(db_agreement.id),
-        "security_token": db_agreement.security_token,
-        "expires_at": db_agreement.expires_at,
-        "status": db_agreement.status
-    }
+    return agreement_bulk_json.response({
+        "created": len(rows),
+        "failed": len(results) - len(rows),
+        "results": results
+    })
 
 @router.get("/user", response_model=List[AgreementResponse])
 async def get_user_agreements(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_archived: bool = True,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    agreements = db.query(Agreement).filter(Agreement.user_id == current_user.id).all()
-    return [
-        {
-            "id": str(agreement.id),
-            "client_name": agreement.client_name,
-            "client_phone": agreement.client_phone,
-            "meeting_type": agreement.meeting_type,
-            "state": agreement.state,
-            "status": agreement.status,
-            "created_at": agreement.created_at,
-            "expires_at": agreement.expires_at,
-            "signed_at": agreement.signed_at
-        }
-        for agreement in agreements
-    ]
+    """Newest first. With ``limit`` set, pages are keyset-paginated on
+    (created_at, id) and the next page's cursor is sent in X-Next-Cursor.
+    Archived agreements are included unless ``include_archived=false``."""
+    decoded_cursor = decode_cursor(cursor) if cursor else None
+    query = user_agreements_query(
+        current_user.id, status_filter, created_after, created_before, decoded_cursor, limit, include_archived
+    )
+    result = await db.execute(query)
+    agreements = result.all()
+    
+    headers = {}
+    if limit and len(agreements) > limit:
+        agreements = agreements[:limit]
+        last = agreements[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    
+    # Encoded straight from the rows: no dict or model per agreement
+    return agreement_list_json.response(agreements, headers=headers)
+
+@router.get("/summary", response_model=AgreementSummary)
+async def get_agreement_summary(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The realtor's agreement counts by status, archived ones included:
+    one row read however many agreements they have. Unsigned agreements
+    move from draft/viewed to expired when the expiry sweeper next runs."""
+    return await counter_summary(db, current_user.id)
 
-@router.get("/public/{token}", response_model=AgreementPublic)
-async def get_agreement_by_token(token: str, db: Session = Depends(get_db)):
-    agreement = db.query(Agreement).filter(
-        Agreement.security_token == token,
-        Agreement.expires_at > datetime.utcnow()
-    ).first()
+@router.get("/search", response_model=List[AgreementResponse])
+async def search_agreements(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The realtor's agreements (archived ones too) whose client name, phone,
+    email or meeting type match ``q``, each word as a prefix. Clients whose
+    name, phone or email starts with ``q`` come first, then newest first."""
+    ids = await search_agreement_ids(db, current_user.id, q, limit)
+    if not ids:
+        return agreement_list_json.response([])
+    result = await db.execute(search_results_query(ids))
+    rank = {agreement_id: position for position, agreement_id in enumerate(ids)}
+    agreements = sorted(
+        (row for row in result.all() if row.user_id == current_user.id),
+        key=lambda row: rank[row.id],
+    )
+    return agreement_list_json.response(agreements)
+
+@router.get("/public/{token}", response_model=AgreementPublic, dependencies=[Depends(limit_public_request)])
+async def get_agreement_by_token(
+    token: str,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    agreement_id = signed_agreement_id(token)
+    cached = await public_agreement_cache.get(token)
+    if cached is None:
+        agreement = await get_active_agreement(db, token, agreement_id)
+        agreement_text = await template_store.render_agreement_text(db, agreement)
+        cached = await public_agreement_cache.set(token, build_public_payload(agreement, agreement_text))
     
-    if not agreement:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agreement not found or expired"
-        )
+    # Let the browser revalidate on every open; repeat opens cost a 304
+    headers = {"ETag": cached["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return {
-        "id": str(agreement.id),
-        "client_name": agreement.client_name,
-        "meeting_type": agreement.meeting_type,
-        "state": agreement.state,
-        "agreement_text": agreement.agreement_text,
-        "status": agreement.status,
-        "expires_at": agreement.expires_at
-    }
-
-@router.post("/public/{token}/view")
+    return agreement_public_json.response(cached["payload"], headers=headers)
+
+@router.post("/public/{token}/view", dependencies=[Depends(limit_public_request)])
 async def mark_agreement_as_viewed(
     token: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    agreement = db.query(Agreement).filter(
-        Agreement.security_token == token,
-        Agreement.expires_at > datetime.utcnow()
-    ).first()
+    client_ip = request.client.host
+    user_agent = request.headers.get("user-agent")
+    signed_id = signed_agreement_id(token)
     
-    if not agreement:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agreement not found or expired"
-        )
+    # Repeat views only add an audit entry: buffer it, no query or commit
+    agreement_id = view_buffer.lookup(token)
+    if agreement_id:
+        view_buffer.record(agreement_id, client_ip, user_agent)
+        return {"message": "Agreement marked as viewed"}
     
-    # Update viewed status
-    agreement.viewed_at = datetime.utcnow()
-    agreement.client_ip = request.client.host
-    agreement.user_agent = request.headers.get("user-agent")
-    agreement.status = "viewed"
+    agreement = await get_active_agreement(db, token, signed_id)
     
-    db.commit()
+    if agreement.viewed_at is None:
+        # First view: write it now. The viewed_at guard lets exactly one of
+        # several concurrent first views win; the rest fall through to the buffer.
+        # The status guard keeps a concurrent signature, and the counters
+        # moved with it, from being overwritten.
+        now = datetime.utcnow()
+        new_status = "viewed" if agreement.status == "draft" else agreement.status
+        result = await db.execute(
+            update(Agreement)
+            .where(Agreement.id == agreement.id, Agreement.viewed_at.is_(None), Agreement.status == agreement.status)
+            .values(
+                viewed_at=now,
+                client_ip=client_ip,
+                user_agent=user_agent,
+                status=new_status,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            db.add(AgreementEvent(**audit_event(agreement.id, "view", now, client_ip, user_agent)))
+            await count_transition(db, agreement.user_id, agreement.status, new_status)
+        await db.commit()
+        if result.rowcount:
+            await replica_router.mark_write(token, agreement.user_id)
+            await public_agreement_cache.invalidate(token)
+            await event_hub.publish(agreement.user_id, agreement_event("agreement.viewed", agreement.id, new_status, now))
+        else:
+            view_buffer.record(agreement.id, client_ip, user_agent)
+    else:
+        view_buffer.record(agreement.id, client_ip, user_agent)
+    
+    view_buffer.remember(token, agreement.id, agreement.expires_at)
     
     return {"message": "Agreement marked as viewed"}
 
-@router.post("/public/{token}/sign")
+@router.post("/public/{token}/sign", dependencies=[Depends(limit_public_request)])
 async def sign_agreement(
     token: str,
-    signature_data: dict,
+    sign_data: AgreementSign,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    agreement = db.query(Agreement).filter(
-        Agreement.security_token == token,
-        Agreement.expires_at > datetime.utcnow()
-    ).first()
+    agreement = await get_active_agreement(db, token, signed_agreement_id(token))
+    signature_blob, signature_data = compact_signature(sign_data.signature_data)
+    client_ip = request.client.host
+    user_agent = request.headers.get("user-agent")
     
-    if not agreement:
+    # Update signed status, guarded on the status read, so the counters move
+    # from the status the row really had. A concurrent first view or the
+    # expiry sweeper changes it at most twice, so this re-reads at most twice.
+    while True:
+        if agreement.signed_at:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Agreement already signed"
+            )
+        if agreement.status == "expired":
+            raise agreement_not_found()
+        signed_at = datetime.utcnow()
+        result = await db.execute(
+            update(Agreement)
+            .where(Agreement.id == agreement.id, Agreement.signed_at.is_(None), Agreement.status == agreement.status)
+            .values(
+                signed_at=signed_at,
+                signature_blob=signature_blob,
+                signature_data=signature_data,
+                status="signed",
+                client_ip=client_ip,
+                user_agent=user_agent,
+                updated_at=signed_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            break
+        try:
+            await db.refresh(agreement, ["signed_at", "status"])
+        except InvalidRequestError:
+            # The row is gone: the archive sweeper moved it since it was read
+            raise agreement_not_found()
+    
+    await count_transition(db, agreement.user_id, agreement.status, "signed")
+    # In the same transaction: an agreement is never signed without its audit event
+    db.add(AgreementEvent(**audit_event(agreement.id, "sign", signed_at, client_ip, user_agent)))
+    
+    await db.commit()
+    await replica_router.mark_write(token, agreement.user_id)
+    await public_agreement_cache.invalidate(token)
+    await event_hub.publish(agreement.user_id, agreement_event("agreement.signed", agreement.id, "signed", signed_at))
+    pdf_worker.notify()
+    
+    return {"message": "Agreement signed successfully"}
+
+@router.get("/{agreement_id}/signature")
+async def get_agreement_signature(
+    agreement_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The signature as the client submitted it, for the realtor's audit view"""
+    for model in (Agreement, AgreementArchive):
+        result = await db.execute(
+            select(model.signed_at, model.signature_data, model.signature_blob)
+            .where(model.id == agreement_id, model.user_id == current_user.id)
+        )
+        row = result.first()
+        if row is not None:
+            break
+    if row is None or row.signed_at is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Agreement not found or expired"
+            detail="Signature not found"
         )
-    
-    if agreement.signed_at:
+    return FastJSONResponse({
+        "agreement_id": agreement_id,
+        "signed_at": row.signed_at,
+        "signature_data": decode_signature(row.signature_blob, row.signature_data),
+    })
+
+@router.get("/{agreement_id}/events")
+async def get_agreement_events(
+    agreement_id: str,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The agreement's audit timeline, oldest first: views with IP and user
+    agent, the signature, and SMS delivery. Repeat views appear once the view
+    buffer flushes (VIEW_FLUSH_INTERVAL). Returns the latest ``limit`` entries."""
+    for model in (Agreement, AgreementArchive):
+        result = await db.execute(
+            select(model.id, model.audit_trail)
+            .where(model.id == agreement_id, model.user_id == current_user.id)
+        )
+        row = result.first()
+        if row is not None:
+            break
+    if row is None:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Agreement already signed"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agreement not found"
         )
-    
-    # Update signed status
-    agreement.signed_at = datetime.utcnow()
-    agreement.signature_data = signature_data
-    agreement.status = "signed"
-    agreement.client_ip = request.client.host
-    agreement.user_agent = request.headers.get("user-agent")
-    
-    db.commit()
-    
-    return {"message": "Agreement signed successfully"} 
\ No newline at end of file
+    return FastJSONResponse({
+        "agreement_id": agreement_id,
+        "events": await agreement_timeline(db, row, limit),
+    })
+
+@router.get("/{agreement_id}/pdf")
+async def get_agreement_pdf(
+    agreement_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """The signed agreement's PDF (the path stored in ``pdf_url``), for its
+    realtor only. It holds the client's details and signature, so it is
+    never stored by caches; FileResponse handles range requests."""
+    for model in (Agreement, AgreementArchive):
+        result = await db.execute(
+            select(model.pdf_url).where(model.id == agreement_id, model.user_id == current_user.id)
+        )
+        row = result.first()
+        if row is not None:
+            break
+    digest = pdf_digest(row.pdf_url) if row is not None else None
+    if digest is None or not pdf_store.exists(digest):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="PDF not found"
+        )
+    return FileResponse(
+        pdf_store.path(digest),
+        media_type="application/pdf",
+        headers={
+            "Cache-Control": "private, no-store",
+            "ETag": f'"{digest}"',
+        },
+    ) 
\ No newline at end of file
@@ -1,89 +1,153 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
-import uuid
 
-from app.database import get_db, User
+from app.database import get_async_db, User
 from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.metrics import span
+from app.core.serialization import FastJSONResponse, ResponseSchema
+from app.services.passwords import password_hasher, PasswordHashQueueFull
+from app.services.replicas import replica_router, read_from_primary
 from app.schemas.auth import UserCreate, UserLogin, UserResponse, Token
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Fix for newer bcrypt versions
-try:
-    import bcrypt
-    # Test if bcrypt is working
-    bcrypt.hashpw(b"test", bcrypt.gensalt())
-except AttributeError:
-    # Fallback to a simpler password hashing method for testing
-    import hashlib
-    def simple_hash(password: str) -> str:
-        return hashlib.sha256(password.encode()).hexdigest()
-    
-    def simple_verify(password: str, hashed: str) -> bool:
-        return simple_hash(password) == hashed
+
+token_json = ResponseSchema(Token)
+user_json = ResponseSchema(UserResponse)
+
+# Profile fields cached per user and, optionally, embedded in the JWT
+PRINCIPAL_FIELDS = ("email", "first_name", "last_name", "company_name", "state", "phone", "is_verified")
+
+# sub -> principal fields, so authenticated requests skip the users table
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+principal_claim_hits = 0
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate(str(target.id))
+
+def principal_from_fields(user_id: str, fields: dict) -> User:
+    """Build a detached User carrying only what the handlers read"""
+    return User(id=user_id, **{name: fields.get(name) for name in PRINCIPAL_FIELDS})
+
+def user_query(user_id: str):
+    return select(User).where(User.id == user_id)
+
+def user_by_email_query(email: str):
+    return select(User).where(User.email == email)
+
+def build_token_claims(user: User) -> dict:
+    claims = {"sub": str(user.id)}
+    if settings.JWT_PROFILE_CLAIMS:
+        claims["profile"] = {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+    return claims
+
+def principal_stats() -> dict:
+    return {**principal_cache.stats(), "claim_hits": principal_claim_hits}
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(seconds=settings.JWT_EXPIRES_IN)
+        lifetime = settings.JWT_EXPIRES_IN
+        if "profile" in to_encode:
+            # Nothing revokes the embedded profile; expiry is what bounds it
+            lifetime = min(lifetime, settings.JWT_PROFILE_CLAIMS_EXPIRES_IN)
+        expire = datetime.utcnow() + timedelta(seconds=lifetime)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
-def verify_password(plain_password, hashed_password):
+async def verify_password(plain_password, hashed_password):
+    """Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash should be upgraded"""
+    try:
+        with span("verify_password"):
+            return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHashQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry"
+        )
+
+async def get_password_hash(password):
     try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception:
-        # Fallback for bcrypt issues
-        try:
-            return simple_verify(plain_password, hashed_password)
-        except NameError:
-            return False
-
-def get_password_hash(password):
+        with span("hash_password"):
+            return await password_hasher.hash(password)
+    except PasswordHashQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations in progress, please retry"
+        )
+
+def bearer_subject(request: Request) -> Optional[str]:
+    """The user id the request's bearer JWT names, unverified: only used to
+    pick a database for its reads; get_current_user does the checking"""
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
     try:
-        return pwd_context.hash(password)
-    except Exception:
-        # Fallback for bcrypt issues
-        try:
-            return simple_hash(password)
-        except NameError:
-            # Last resort - return a simple hash
-            import hashlib
-            return hashlib.sha256(password.encode()).hexdigest()
-
-def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
+        return jwt.get_unverified_claims(authorization[7:]).get("sub")
+    except JWTError:
+        return None
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers: on a read replica, unless the realtor
+    or the link token in the path wrote in the last REPLICA_STICKY_SECONDS"""
+    async with replica_router.session(bearer_subject(request), request.path_params.get("token")) as db:
+        yield db
+
+async def get_current_user(token: str = Depends(security), db: AsyncSession = Depends(get_read_db)):
+    return await user_from_token(token.credentials, db)
+
+async def user_from_token(token: str, db: AsyncSession) -> User:
+    """The principal for a bearer JWT; raises 401 if it isn't valid"""
+    global principal_claim_hits
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token.credentials, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Signed profile claims need no lookup at all
+    profile = payload.get("profile")
+    if settings.JWT_PROFILE_CLAIMS and isinstance(profile, dict):
+        principal_claim_hits += 1
+        return principal_from_fields(user_id, profile)
+    
+    fields = principal_cache.get(user_id)
+    if fields is not None:
+        return principal_from_fields(user_id, fields)
+    
+    query = user_query(user_id)
+    user = (await db.execute(query)).scalars().first()
+    if user is None and read_from_primary(db):
+        # Registered on another worker moments ago; the replica hasn't caught up
+        user = (await db.execute(query)).scalars().first()
     if user is None:
         raise credentials_exception
+    principal_cache.set(user_id, {name: getattr(user, name) for name in PRINCIPAL_FIELDS})
     return user
 
 @router.post("/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(user_by_email_query(user_data.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -91,7 +155,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     db_user = User(
         email=user_data.email,
         password_hash=hashed_password,
@@ -104,29 +168,24 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await replica_router.mark_write(db_user.id)
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(db_user.id)})
+    access_token = create_access_token(data=build_token_claims(db_user))
     
-    return {
+    return token_json.response({
         "access_token": access_token,
         "token_type": "bearer",
-        "user": {
-            "id": str(db_user.id),
-            "email": db_user.email,
-            "first_name": db_user.first_name,
-            "last_name": db_user.last_name,
-            "company_name": db_user.company_name,
-            "state": db_user.state
-        }
-    }
+        "user": db_user
+    })
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     # Find user
-    user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(user_by_email_query(user_data.email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -134,37 +193,27 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_data.password, user.password_hash):
+    is_valid, new_hash = await verify_password(user_data.password, user.password_hash)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    # Upgrade legacy hashes / old cost factors transparently
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=build_token_claims(user))
     
-    return {
+    return token_json.response({
         "access_token": access_token,
         "token_type": "bearer",
-        "user": {
-            "id": str(user.id),
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "company_name": user.company_name,
-            "state": user.state
-        }
-    }
+        "user": user
+    })
 
 @router.get("/profile", response_model=UserResponse)
 async def get_profile(current_user: User = Depends(get_current_user)):
-    return {
-        "id": str(current_user.id),
-        "email": current_user.email,
-        "first_name": current_user.first_name,
-        "last_name": current_user.last_name,
-        "company_name": current_user.company_name,
-        "state": current_user.state,
-        "phone": current_user.phone,
-        "is_verified": current_user.is_verified
-    } 
\ No newline at end of file
+    return user_json.response(current_user) 
\ No newline at end of file
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from jose import JWTError, jwt
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import json
+
+from app.database import User
+from app.routers.auth import get_current_user, user_from_token
+from app.services.events import event_hub, CLOSE
+from app.services.replicas import replica_router
+from app.core.config import settings
+
+router = APIRouter()
+
+# Tells EventSource how long to wait before reconnecting
+RECONNECT_MILLISECONDS = 3000
+
+# A ticket's audience: access tokens carry none, so a ticket is refused
+# as a Bearer token and an access token is refused as a ticket
+TICKET_AUDIENCE = "homeshow-events"
+
+def issue_stream_ticket(user_id: str) -> str:
+    expires = datetime.utcnow() + timedelta(seconds=settings.EVENTS_TICKET_SECONDS)
+    claims = {"sub": user_id, "aud": TICKET_AUDIENCE, "exp": expires}
+    return jwt.encode(claims, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+def stream_ticket_subject(ticket: str) -> str:
+    """The user id a stream ticket was issued to; raises 401 if it isn't valid"""
+    try:
+        payload = jwt.decode(ticket, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM], audience=TICKET_AUDIENCE)
+    except JWTError:
+        payload = {}
+    user_id = payload.get("sub")
+    # jose only checks the audience of tokens that have one
+    if not user_id or payload.get("aud") != TICKET_AUDIENCE:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired stream ticket",
+        )
+    return user_id
+
+class EventStreamResponse(StreamingResponse):
+    """StreamingResponse without its per-response disconnect listener task.
+
+    An idle stream would otherwise hold a task group and a second task just
+    to notice the client leaving; ``event_stream`` checks for that at each
+    heartbeat instead, so a closed stream lingers at most one heartbeat.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+async def event_stream(request: Request, user_id: str):
+    stream = event_hub.subscribe(user_id)
+    if stream is None:
+        return
+    loop = asyncio.get_running_loop()
+    closes_at = loop.time() + settings.EVENTS_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {RECONNECT_MILLISECONDS}\n: connected\n\n"
+        while True:
+            remaining = closes_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await stream.next(min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+            except TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is CLOSE:
+                break
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        event_hub.unsubscribe(user_id, stream)
+
+@router.post("/ticket")
+async def create_stream_ticket(current_user: User = Depends(get_current_user)):
+    """A short-lived ticket that opens the signed-in realtor's event stream
+    (``GET /api/events?ticket=``) and nothing else, so the JWT itself never
+    goes in a URL"""
+    return {"ticket": issue_stream_ticket(str(current_user.id)), "expires_in": settings.EVENTS_TICKET_SECONDS}
+
+@router.get("")
+async def stream_events(request: Request, ticket: Optional[str] = Query(None)):
+    """Server-Sent Events for the signed-in realtor's agreements:
+    ``agreement.viewed``, ``agreement.signed``, ``agreement.expired`` and
+    ``agreement.pdf_ready``.
+
+    Send the JWT as a Bearer header or, since EventSource can't set
+    headers, a ticket from ``POST /api/events/ticket`` as ``?ticket=``.
+    Events aren't replayed, so reload the agreement list after reconnecting."""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        # Own short session: a stream must not hold a pooled connection while it's open
+        async with replica_router.session() as db:
+            user = await user_from_token(authorization[7:], db)
+        user_id = str(user.id)
+    elif ticket:
+        user_id = stream_ticket_subject(ticket)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if event_hub.stream_count(user_id) >= settings.EVENTS_MAX_STREAMS_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open event streams"
+        )
+    return EventStreamResponse(
+        event_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
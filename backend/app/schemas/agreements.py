@@ -1,7 +1,10 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, PrivateAttr, model_validator
+from typing import Optional, List, Dict, Any, Tuple, Annotated
 from datetime import datetime
 
+from app.core.config import settings
+from app.services.signatures import InvalidSignature, MAX_COORDINATE, png_from_data_url, png_header
+
 class AgreementCreate(BaseModel):
     client_name: str
     client_phone: str
@@ -11,6 +14,8 @@ class AgreementCreate(BaseModel):
     agreement_text: str
 
 class AgreementResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     client_name: str
     client_phone: str
@@ -20,12 +25,103 @@ class AgreementResponse(BaseModel):
     created_at: datetime
     expires_at: datetime
     signed_at: Optional[datetime] = None
+    pdf_url: Optional[str] = None
+
+class AgreementCreated(AgreementResponse):
+    # The signing link's token: returned once, when the agreement is created
+    security_token: str
 
 class AgreementPublic(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     client_name: str
     meeting_type: str
     state: str
     agreement_text: str
     status: str
-    expires_at: datetime 
\ No newline at end of file
+    expires_at: datetime
+
+class AgreementSummary(BaseModel):
+    draft: int
+    viewed: int
+    signed: int
+    expired: int
+    total: int
+
+class AgreementBulkCreate(BaseModel):
+    # Items are validated one by one against AgreementCreate so a bad row
+    # is reported in its result instead of rejecting the whole batch
+    items: List[Dict[str, Any]]
+
+class AgreementBulkResult(BaseModel):
+    index: int
+    success: bool
+    agreement: Optional[AgreementCreated] = None
+    error: Optional[str] = None
+
+class AgreementBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[AgreementBulkResult]
+
+
+def _signature_point(value):
+    # [x, y] or signature_pad's {"x", "y", "time", "pressure"}; extra values are dropped
+    if isinstance(value, dict):
+        return (value.get("x"), value.get("y"))
+    if isinstance(value, (list, tuple)) and len(value) > 2:
+        return tuple(value[:2])
+    return value
+
+def _signature_stroke(value):
+    # signature_pad's {"points": [...], "penColor": ...} groups
+    if isinstance(value, dict):
+        return value.get("points")
+    return value
+
+# The range the stroke blob can store; see signatures.pack_strokes
+Coordinate = Annotated[float, Field(ge=0, le=MAX_COORDINATE, allow_inf_nan=False)]
+SignaturePoint = Annotated[Tuple[Coordinate, Coordinate], BeforeValidator(_signature_point)]
+SignatureStroke = Annotated[List[SignaturePoint], BeforeValidator(_signature_stroke)]
+
+class SignaturePayload(BaseModel):
+    """A drawn signature: canvas strokes or a PNG data URL, not both"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    signature: Optional[str] = Field(None, max_length=settings.SIGNATURE_MAX_IMAGE_BYTES)
+    strokes: Optional[List[SignatureStroke]] = None
+    width: Optional[float] = Field(None, gt=0, allow_inf_nan=False)
+    height: Optional[float] = Field(None, gt=0, allow_inf_nan=False)
+    timestamp: Optional[str] = Field(None, max_length=64)
+    client_consent: Optional[bool] = Field(None, alias="clientConsent")
+
+    _png: Optional[bytes] = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def check_signature(self):
+        if (self.signature is None) == (self.strokes is None):
+            raise ValueError("provide either signature or strokes")
+        if self.strokes is not None:
+            points = sum(len(stroke) for stroke in self.strokes)
+            if not points:
+                raise ValueError("strokes are empty")
+            if points > settings.SIGNATURE_MAX_POINTS:
+                raise ValueError(f"signature has more than {settings.SIGNATURE_MAX_POINTS} points")
+        else:
+            try:
+                self._png = png_from_data_url(self.signature)
+                width, height, bit_depth, color_type, interlace = png_header(self._png)
+            except InvalidSignature as e:
+                raise ValueError(str(e))
+            # A few hundred KB of PNG can declare an image that takes gigabytes to decode
+            max_width, max_height = settings.SIGNATURE_MAX_IMAGE_WIDTH, settings.SIGNATURE_MAX_IMAGE_HEIGHT
+            if not (0 < width <= max_width and 0 < height <= max_height):
+                raise ValueError(f"signature image must be at most {max_width}x{max_height} pixels")
+            # What the PDF renderer can draw
+            if interlace or color_type not in (0, 2, 3, 4, 6) or (color_type in (4, 6) and bit_depth != 8):
+                raise ValueError("signature image must be a non-interlaced PNG, 8-bit if it has transparency")
+        return self
+
+class AgreementSign(BaseModel):
+    signature_data: SignaturePayload
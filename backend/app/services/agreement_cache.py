@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import datetime
+
+from app.core.cache import TTLCache, create_shared_cache
+from app.core.config import settings
+
+
+def build_public_payload(agreement, agreement_text: str) -> dict:
+    """The AgreementPublic body for an agreement, in JSON-ready form"""
+    return {
+        "id": str(agreement.id),
+        "client_name": agreement.client_name,
+        "meeting_type": agreement.meeting_type,
+        "state": agreement.state,
+        "agreement_text": agreement_text,
+        "status": agreement.status,
+        "expires_at": agreement.expires_at.isoformat(),
+    }
+
+
+def compute_etag(payload: dict) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class PublicAgreementCache:
+    """Token -> AgreementPublic payload, read through a local LRU and an optional shared tier.
+
+    Entries never outlive the agreement's ``expires_at``. The local tier uses
+    a shorter TTL than the shared one: invalidation only reaches this
+    worker's LRU, so that TTL bounds how stale other workers can be.
+    """
+
+    def __init__(self):
+        self.local = TTLCache(maxsize=settings.PUBLIC_CACHE_SIZE, ttl=settings.PUBLIC_CACHE_LOCAL_TTL)
+        self.shared = create_shared_cache(settings.CACHE_REDIS_URL)
+        self.shared_hits = 0
+
+    def _key(self, token: str) -> str:
+        return f"agreement-public:{token}"
+
+    async def get(self, token: str):
+        """Returns ``{"payload": ..., "etag": ...}`` or None"""
+        entry = self.local.get(token)
+        if entry is not None:
+            return entry
+        if self.shared is not None:
+            entry = await self.shared.get(self._key(token))
+            if entry is not None:
+                self.shared_hits += 1
+                self.local.set(token, entry, ttl=self._ttl(entry["payload"]["expires_at"]))
+                return entry
+        return None
+
+    async def set(self, token: str, payload: dict):
+        entry = {"payload": payload, "etag": compute_etag(payload)}
+        ttl = self._ttl(payload["expires_at"])
+        self.local.set(token, entry, ttl=ttl)
+        if self.shared is not None:
+            await self.shared.set(self._key(token), entry, ttl=min(ttl, settings.PUBLIC_CACHE_TTL))
+        return entry
+
+    async def invalidate(self, token: str):
+        self.local.invalidate(token)
+        if self.shared is not None:
+            await self.shared.delete(self._key(token))
+
+    def _ttl(self, expires_at: str) -> float:
+        return (datetime.fromisoformat(expires_at) - datetime.utcnow()).total_seconds()
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared_hits": self.shared_hits, "shared": self.shared is not None}
+
+
+public_agreement_cache = PublicAgreementCache()
+
+# Tokens that matched no active agreement. Misses repeat (scraped or guessed
+# links, expired agreements being reopened) and each one would otherwise
+# cost a query. Tokens are random, so a new agreement can't collide with one.
+unknown_tokens = TTLCache(maxsize=settings.NEGATIVE_TOKEN_CACHE_SIZE, ttl=settings.NEGATIVE_TOKEN_CACHE_TTL)
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, literal, or_, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, Agreement, AgreementArchive
+from app.services.agreement_cache import public_agreement_cache
+from app.services.view_buffer import view_buffer
+from app.services.audit_log import compact_agreements
+from app.services.counters import expire_agreements
+
+# Every agreements column, in order; the archive has the same ones plus archived_at
+ARCHIVED_COLUMNS = [column.name for column in Agreement.__table__.columns]
+
+
+def archive_cutoffs(now: datetime):
+    return (
+        now - timedelta(hours=settings.ARCHIVE_EXPIRED_GRACE_HOURS),
+        now - timedelta(days=settings.ARCHIVE_SIGNED_AFTER_DAYS),
+    )
+
+
+def archivable(now: datetime):
+    """Unsigned agreements past expiry (plus grace) and signed ones past retention"""
+    expired_before, signed_before = archive_cutoffs(now)
+    return or_(
+        and_(Agreement.signed_at.is_(None), Agreement.expires_at < expired_before),
+        Agreement.signed_at < signed_before,
+    )
+
+
+def archive_batch_query(now: datetime, limit: int):
+    return select(Agreement.id, Agreement.security_token, Agreement.created_at).where(archivable(now)).limit(limit)
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+async def ensure_archive_partitions(db: AsyncSession, created_ats):
+    """Create the monthly agreements_archive partitions these rows fall into (Postgres only)"""
+    if db.bind.dialect.name != "postgresql":
+        return
+    for start in sorted({month_start(created_at) for created_at in created_ats}):
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS agreements_archive_{start:%Y_%m} "
+            f"PARTITION OF agreements_archive "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{next_month(start):%Y-%m-%d}')"
+        ))
+
+
+class ArchiveSweeper:
+    """Moves expired and finished agreements from ``agreements`` into ``agreements_archive``.
+
+    Each batch copies up to ARCHIVE_BATCH_SIZE rows with INSERT ... SELECT
+    and deletes them from the hot table in the same transaction, so a row is
+    always in exactly one of the two. Each row's pending audit events are
+    compacted into its audit_trail first, and expired rows not yet marked
+    as such are marked (and counted) first. Archived tokens are dropped from
+    the public page cache and the view buffer.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._lock = None
+        self.runs = 0
+        self.moved_total = 0
+        self.last_run = None
+
+    async def archive_batch(self, db: AsyncSession, now: datetime) -> list:
+        """Archive one batch; returns the security tokens of the rows moved"""
+        query = archive_batch_query(now, settings.ARCHIVE_BATCH_SIZE)
+        if db.bind.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return []
+        ids = [row.id for row in rows]
+        # Archived rows carry their whole trail; their events don't outlive them
+        await compact_agreements(db, ids)
+        # Nor are they archived as drafts, if the expiry sweeper hasn't run
+        await expire_agreements(db, ids, now)
+        await ensure_archive_partitions(db, [row.created_at for row in rows])
+        await db.execute(
+            insert(AgreementArchive).from_select(
+                ARCHIVED_COLUMNS + ["archived_at"],
+                select(*(Agreement.__table__.c[name] for name in ARCHIVED_COLUMNS), literal(now))
+                .where(Agreement.id.in_(ids)),
+            )
+        )
+        await db.execute(delete(Agreement).where(Agreement.id.in_(ids)))
+        await db.commit()
+        return [row.security_token for row in rows]
+
+    async def sweep(self) -> dict:
+        """Archive everything currently eligible, one batch per transaction"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.perf_counter()
+            # Buffered repeat views still target the hot rows
+            await view_buffer.flush()
+            now = datetime.utcnow()
+            moved = 0
+            batches = 0
+            async with AsyncSessionLocal() as db:
+                while True:
+                    tokens = await self.archive_batch(db, now)
+                    if not tokens:
+                        break
+                    batches += 1
+                    moved += len(tokens)
+                    for token in tokens:
+                        view_buffer.forget(token)
+                        await public_agreement_cache.invalidate(token)
+                    if len(tokens) < settings.ARCHIVE_BATCH_SIZE:
+                        break
+            self.runs += 1
+            self.moved_total += moved
+            self.last_run = {
+                "at": now.isoformat(),
+                "moved": moved,
+                "batches": batches,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            if moved:
+                print(f"🗄️ Archived {moved} agreements in {self.last_run['seconds']}s")
+            return self.last_run
+
+    def start(self):
+        if settings.ARCHIVE_SWEEP_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"❌ Archive sweep failed: {e}")
+            await asyncio.sleep(settings.ARCHIVE_SWEEP_INTERVAL)
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "moved": self.moved_total, "last_run": self.last_run}
+
+
+archive_sweeper = ArchiveSweeper()
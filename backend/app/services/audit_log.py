@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, Agreement, AgreementEvent
+from app.services.view_buffer import view_buffer
+
+# Bound parameters per DELETE ... IN (asyncpg allows 32767 per statement)
+DELETE_CHUNK_SIZE = 5000
+
+
+def audit_event(agreement_id, event: str, at: datetime = None, client_ip=None, user_agent=None, **data) -> dict:
+    """An agreement_events row; extra keyword arguments are kept in ``data``"""
+    return {
+        "agreement_id": str(agreement_id),
+        "event": event,
+        "at": at or datetime.utcnow(),
+        "client_ip": client_ip,
+        "user_agent": user_agent,
+        "data": data or None,
+    }
+
+
+def trail_entry(event: AgreementEvent) -> dict:
+    """An event in the audit_trail format, which is what the PDF prints"""
+    entry = {"event": event.event, "at": event.at.isoformat()}
+    if event.client_ip:
+        entry["client_ip"] = event.client_ip
+    if event.user_agent:
+        entry["user_agent"] = event.user_agent
+    for key, value in (event.data or {}).items():
+        entry.setdefault(key, value)
+    return entry
+
+
+async def pending_events(db: AsyncSession, agreement_ids) -> dict:
+    """Events not compacted yet, per agreement id, oldest first"""
+    result = await db.execute(
+        select(AgreementEvent)
+        .where(AgreementEvent.agreement_id.in_([str(agreement_id) for agreement_id in agreement_ids]))
+        .order_by(AgreementEvent.agreement_id, AgreementEvent.at, AgreementEvent.id)
+    )
+    events = defaultdict(list)
+    for event in result.scalars():
+        events[event.agreement_id].append(event)
+    return events
+
+
+def timeline_query(agreement_id, limit: int = None):
+    """The agreement's events not compacted yet, newest first"""
+    query = (
+        select(AgreementEvent)
+        .where(AgreementEvent.agreement_id == str(agreement_id))
+        .order_by(AgreementEvent.at.desc(), AgreementEvent.id.desc())
+    )
+    return query.limit(limit) if limit else query
+
+
+async def agreement_timeline(db: AsyncSession, agreement, limit: int = None) -> list:
+    """The agreement's audit_trail followed by its events not compacted yet.
+
+    ``agreement`` is any row with ``id`` and ``audit_trail`` (live or
+    archived). With ``limit``, only the latest ``limit`` entries.
+    """
+    query = timeline_query(agreement.id, limit)
+    recent = [trail_entry(event) for event in reversed((await db.execute(query)).scalars().all())]
+    timeline = list(agreement.audit_trail or []) + recent
+    return timeline[-limit:] if limit else timeline
+
+
+async def compact_agreements(db: AsyncSession, agreement_ids) -> int:
+    """Append these agreements' events to their audit_trail and delete them,
+    in the caller's transaction; returns the number of events folded in"""
+    query = select(Agreement.id, Agreement.audit_trail).where(Agreement.id.in_(list(agreement_ids)))
+    if db.bind.dialect.name == "postgresql":
+        # Another worker compacting the same rows would append the events twice
+        query = query.with_for_update(skip_locked=True)
+    trails = {row.id: row.audit_trail for row in await db.execute(query)}
+    if not trails:
+        return 0
+    events = await pending_events(db, trails)
+    if not events:
+        return 0
+    # ORM bulk UPDATE by primary key: one executemany
+    await db.execute(update(Agreement), [
+        {"id": agreement_id, "audit_trail": list(trails[agreement_id] or []) + [trail_entry(event) for event in rows]}
+        for agreement_id, rows in events.items()
+    ])
+    # By id, not by agreement: an event written since the read above stays for the next pass
+    event_ids = [event.id for rows in events.values() for event in rows]
+    for start in range(0, len(event_ids), DELETE_CHUNK_SIZE):
+        await db.execute(
+            delete(AgreementEvent)
+            .where(AgreementEvent.id.in_(event_ids[start:start + DELETE_CHUNK_SIZE]))
+            .execution_options(synchronize_session=False)
+        )
+    return len(event_ids)
+
+
+class AuditCompactor:
+    """Folds the events of final agreements into ``agreements.audit_trail``.
+
+    Events are written as single inserts while an agreement is live; once it
+    is signed or its link has expired, and no event has arrived for
+    AUDIT_COMPACT_QUIET_SECONDS, its events are appended to audit_trail and
+    deleted. Each batch of AUDIT_COMPACT_BATCH_SIZE agreements is one
+    transaction, so a row's trail is rewritten once per pass, not once per
+    event. Events arriving later (a repeat view of a signed agreement) are
+    folded in by a later pass. The archive sweeper compacts each batch it
+    moves as well, so archived rows carry their whole trail.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._lock = None
+        self.runs = 0
+        self.compacted_events = 0
+        self.compacted_agreements = 0
+        self.last_run = None
+
+    async def compact(self) -> dict:
+        """Compact everything currently eligible, one batch per transaction"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.perf_counter()
+            await view_buffer.flush()
+            now = datetime.utcnow()
+            quiet_before = now - timedelta(seconds=settings.AUDIT_COMPACT_QUIET_SECONDS)
+            agreements = 0
+            events = 0
+            async with AsyncSessionLocal() as db:
+                while True:
+                    result = await db.execute(
+                        select(AgreementEvent.agreement_id)
+                        .join(Agreement, Agreement.id == AgreementEvent.agreement_id)
+                        .where(or_(Agreement.signed_at.is_not(None), Agreement.expires_at <= now))
+                        .group_by(AgreementEvent.agreement_id)
+                        .having(func.max(AgreementEvent.at) < quiet_before)
+                        .limit(settings.AUDIT_COMPACT_BATCH_SIZE)
+                    )
+                    ids = result.scalars().all()
+                    if not ids:
+                        break
+                    folded = await compact_agreements(db, ids)
+                    await db.commit()
+                    if not folded:
+                        # Every row was locked by another worker's pass
+                        break
+                    agreements += len(ids)
+                    events += folded
+                    if len(ids) < settings.AUDIT_COMPACT_BATCH_SIZE:
+                        break
+            self.runs += 1
+            self.compacted_agreements += agreements
+            self.compacted_events += events
+            self.last_run = {
+                "at": now.isoformat(),
+                "agreements": agreements,
+                "events": events,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            return self.last_run
+
+    def start(self):
+        if settings.AUDIT_COMPACT_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.AUDIT_COMPACT_INTERVAL)
+            try:
+                await self.compact()
+            except Exception as e:
+                print(f"❌ Audit compaction failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "agreements": self.compacted_agreements,
+            "events": self.compacted_events,
+            "last_run": self.last_run,
+        }
+
+
+audit_compactor = AuditCompactor()
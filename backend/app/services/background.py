@@ -0,0 +1,26 @@
+"""The scheduled jobs: workers that drain a database queue or sweep tables.
+
+Each works against the shared database rather than this process's memory,
+so a deployment needs exactly one copy of them: either in every web worker
+(BACKGROUND_WORKERS, the default, fine for a single worker) or, with
+BACKGROUND_WORKERS=false on the web workers, in one
+``python scripts/run_background_workers.py`` process. The per-process
+loops (view buffer, replica health, event hub) stay in every web worker.
+"""
+from app.services.archive import archive_sweeper
+from app.services.audit_log import audit_compactor
+from app.services.counters import expiry_sweeper
+from app.services.pdf_worker import pdf_worker
+from app.services.sms_outbox import sms_worker
+
+BACKGROUND_JOBS = (sms_worker, expiry_sweeper, archive_sweeper, audit_compactor, pdf_worker)
+
+
+def start_background_jobs():
+    for job in BACKGROUND_JOBS:
+        job.start()
+
+
+async def stop_background_jobs():
+    for job in reversed(BACKGROUND_JOBS):
+        await job.stop()
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete, func, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, Agreement, AgreementArchive, AgreementCounter
+from app.services.events import event_hub, agreement_event
+
+STATUSES = ("draft", "viewed", "signed", "expired")
+
+# Statuses an agreement can still leave: by a view, a signature or expiry
+OPEN_STATUSES = ("draft", "viewed")
+
+
+async def count_created(db: AsyncSession, user_id: str, count: int = 1):
+    """Add new drafts to the user's counters, in the caller's transaction"""
+    insert_ = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    await db.execute(
+        insert_(AgreementCounter)
+        .values(user_id=user_id, draft=count, viewed=0, signed=0, expired=0, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"draft": AgreementCounter.draft + count, "updated_at": now},
+        )
+    )
+
+
+async def count_transition(db: AsyncSession, user_id: str, old_status: str, new_status: str, count: int = 1):
+    """Move agreements from one counter to another, in the caller's transaction.
+
+    Only call this for a change the caller's UPDATE actually made, i.e. one
+    guarded on the old status: a transition counted twice, or counted from
+    a status the row no longer had, stays wrong until the next reconcile.
+    """
+    if old_status == new_status:
+        return
+    values = {"updated_at": datetime.utcnow()}
+    if old_status in STATUSES:
+        values[old_status] = getattr(AgreementCounter, old_status) - count
+    if new_status in STATUSES:
+        values[new_status] = getattr(AgreementCounter, new_status) + count
+    await db.execute(
+        update(AgreementCounter)
+        .where(AgreementCounter.user_id == user_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def summary_query(user_id: str):
+    return select(*(getattr(AgreementCounter, status) for status in STATUSES)).where(AgreementCounter.user_id == user_id)
+
+
+def expirable_query(now: datetime, limit: int):
+    """Unsigned agreements past expiry still counted as open"""
+    return (
+        select(Agreement.id)
+        .where(Agreement.signed_at.is_(None), Agreement.expires_at <= now, Agreement.status.in_(OPEN_STATUSES))
+        .limit(limit)
+    )
+
+
+async def counter_summary(db: AsyncSession, user_id: str) -> dict:
+    """The user's agreement counts by status, from their counters row"""
+    result = await db.execute(summary_query(user_id))
+    row = result.first()
+    counts = {status: row[index] if row else 0 for index, status in enumerate(STATUSES)}
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+async def expire_agreements(db: AsyncSession, agreement_ids, now: datetime) -> list:
+    """Mark those of these agreements that are unsigned and past expiry as
+    expired and move their counts, in the caller's transaction; returns
+    (id, user_id, expires_at) for each one marked"""
+    expired = []
+    for status in OPEN_STATUSES:
+        # Guarded on the status, so a view or signature committed since the
+        # caller picked these rows keeps its row and its count
+        result = await db.execute(
+            update(Agreement)
+            .where(
+                Agreement.id.in_(list(agreement_ids)),
+                Agreement.status == status,
+                Agreement.signed_at.is_(None),
+                Agreement.expires_at <= now,
+            )
+            .values(status="expired", updated_at=now)
+            .returning(Agreement.id, Agreement.user_id, Agreement.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        for user_id, count in Counter(row.user_id for row in rows).items():
+            await count_transition(db, user_id, status, "expired", count)
+        expired.extend(rows)
+    return expired
+
+
+def reconcile_counters(connection, now: datetime = None) -> int:
+    """Rebuild every realtor's counters from their agreements (live and
+    archived) on a sync connection (migrations, scripts), first marking
+    unsigned agreements past expiry as expired; returns the number of
+    realtors counted. Run it in one transaction."""
+    now = now or datetime.utcnow()
+    for model in (Agreement, AgreementArchive):
+        connection.execute(
+            update(model)
+            .where(model.signed_at.is_(None), model.expires_at <= now, model.status.in_(OPEN_STATUSES))
+            .values(status="expired")
+        )
+    if connection.dialect.name == "postgresql":
+        # Counter moves from requests wait for the recount and then apply on
+        # top of it; on SQLite the DELETE below already holds the write lock
+        connection.exec_driver_sql("LOCK TABLE agreement_counters IN EXCLUSIVE MODE")
+    connection.execute(delete(AgreementCounter))
+    statuses = union_all(*(select(model.user_id, model.status) for model in (Agreement, AgreementArchive))).subquery()
+    counters = {}
+    for user_id, status, count in connection.execute(
+        select(statuses.c.user_id, statuses.c.status, func.count()).group_by(statuses.c.user_id, statuses.c.status)
+    ):
+        if status in STATUSES:
+            counters.setdefault(user_id, dict.fromkeys(STATUSES, 0))[status] = count
+    if counters:
+        connection.execute(insert(AgreementCounter), [
+            {"user_id": user_id, "updated_at": now, **counts} for user_id, counts in counters.items()
+        ])
+    return len(counters)
+
+
+class ExpirySweeper:
+    """Marks unsigned agreements past their expiry as ``expired``.
+
+    A link stops working at expires_at, but nothing writes to the agreement
+    then; this pass does, every EXPIRY_SWEEP_INTERVAL seconds, moving each
+    one to its realtor's expired counter in the same transaction and
+    publishing ``agreement.expired``. Batches are EXPIRY_BATCH_SIZE rows.
+    Candidates are found by status: once this runs, only links that have
+    not expired yet are still draft or viewed, so the scan stays small. The
+    archive sweeper marks the rows it moves as well, so nothing is archived
+    as a draft.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._lock = None
+        self.runs = 0
+        self.expired_total = 0
+        self.last_run = None
+
+    async def sweep(self) -> dict:
+        """Expire everything currently past expiry, one batch per transaction"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.perf_counter()
+            now = datetime.utcnow()
+            query = expirable_query(now, settings.EXPIRY_BATCH_SIZE)
+            expired = 0
+            async with AsyncSessionLocal() as db:
+                while True:
+                    ids = (await db.execute(query)).scalars().all()
+                    if not ids:
+                        break
+                    rows = await expire_agreements(db, ids, now)
+                    await db.commit()
+                    expired += len(rows)
+                    for row in rows:
+                        await event_hub.publish(row.user_id, agreement_event("agreement.expired", row.id, "expired", row.expires_at))
+                    if len(ids) < settings.EXPIRY_BATCH_SIZE:
+                        break
+            self.runs += 1
+            self.expired_total += expired
+            self.last_run = {
+                "at": now.isoformat(),
+                "expired": expired,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            return self.last_run
+
+    def start(self):
+        if settings.EXPIRY_SWEEP_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"❌ Expiry sweep failed: {e}")
+            await asyncio.sleep(settings.EXPIRY_SWEEP_INTERVAL)
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "expired": self.expired_total, "last_run": self.last_run}
+
+
+expiry_sweeper = ExpirySweeper()
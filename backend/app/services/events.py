@@ -0,0 +1,229 @@
+import asyncio
+import json
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency, only needed for EVENTS_REDIS_URL=redis://...
+    redis_asyncio = None
+
+# Closes a stream: the hub is shutting down or the client fell too far behind
+CLOSE = None
+
+
+class EventStream:
+    """One open stream's pending events.
+
+    Idle streams are the common case, so this is kept small: a list and,
+    only while the stream is waiting, one future (an asyncio.Queue costs
+    four deques and an Event per stream).
+    """
+
+    __slots__ = ("pending", "_waiter")
+
+    def __init__(self):
+        self.pending = []
+        self._waiter = None
+
+    def push(self, event) -> bool:
+        """Queue ``event``; False if the stream is already EVENTS_QUEUE_SIZE behind"""
+        if len(self.pending) >= settings.EVENTS_QUEUE_SIZE:
+            return False
+        self.pending.append(event)
+        self._wake()
+        return True
+
+    def close(self):
+        # The stream ends after the events it already has
+        self.pending.append(CLOSE)
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next(self, timeout: float):
+        """The next event; raises TimeoutError if none arrives within ``timeout``"""
+        if not self.pending:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._waiter
+            finally:
+                self._waiter = None
+        return self.pending.pop(0)
+
+
+class InMemoryEventBackend:
+    """Process-local stand-in for the cross-worker channel (EVENTS_REDIS_URL=memory://).
+
+    Messages make the same publish -> listen round trip as with Redis, so
+    the pub/sub path runs without a Redis server.
+    """
+
+    def __init__(self):
+        self._queue = None
+
+    def _channel(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def publish(self, message: str):
+        self._channel().put_nowait(message)
+
+    async def listen(self):
+        channel = self._channel()
+        while True:
+            yield await channel.get()
+
+
+class RedisEventBackend:
+    """Redis pub/sub channel that every worker's hub listens on"""
+
+    def __init__(self, url: str, channel: str = "homeshow:events"):
+        self.channel = channel
+        self._client = redis_asyncio.from_url(url)
+
+    async def publish(self, message: str):
+        await self._client.publish(self.channel, message)
+
+    async def listen(self):
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+
+def create_event_backend(url):
+    """Cross-worker channel for ``url``: None, ``memory://`` or ``redis://...``"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryEventBackend()
+    if redis_asyncio is None:
+        print("⚠️ EVENTS_REDIS_URL is set but the redis package is not installed, events stay in this worker")
+        return None
+    return RedisEventBackend(url)
+
+
+class EventHub:
+    """Fans agreement events out to each realtor's open event streams.
+
+    Every stream is an EventStream registered under its user id; an idle
+    stream costs that and its response coroutine, nothing else.
+    Without a backend, ``publish`` delivers to this process's streams
+    directly. With one, events go through the backend and every worker's
+    listener delivers them to its own streams, so a signature handled by one
+    worker reaches a realtor connected to another.
+
+    Delivery is best effort: a stream that falls EVENTS_QUEUE_SIZE events
+    behind is closed, and the client reconnects and reloads its list.
+    """
+
+    def __init__(self):
+        self.backend = create_event_backend(settings.EVENTS_REDIS_URL)
+        self._streams = {}
+        self._task = None
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+
+    def subscribe(self, user_id: str) -> EventStream:
+        """A new stream, or None if the user already has too many open"""
+        if self.stream_count(user_id) >= settings.EVENTS_MAX_STREAMS_PER_USER:
+            return None
+        stream = EventStream()
+        self._streams.setdefault(user_id, set()).add(stream)
+        return stream
+
+    def unsubscribe(self, user_id: str, stream: EventStream):
+        streams = self._streams.get(user_id)
+        if streams is not None:
+            streams.discard(stream)
+            if not streams:
+                del self._streams[user_id]
+
+    async def publish(self, user_id: str, event: dict):
+        """Send ``event`` to ``user_id``'s streams. Never raises: a lost event
+        only means the realtor sees the change on their next reload."""
+        self.published += 1
+        try:
+            if self.backend is None:
+                self._deliver(user_id, event)
+            else:
+                await self.backend.publish(json.dumps({"user_id": user_id, "event": event}))
+        except Exception as e:
+            print(f"⚠️ Event publish failed: {e}")
+
+    def _deliver(self, user_id: str, event: dict):
+        for stream in list(self._streams.get(user_id, ())):
+            if stream.push(event):
+                self.delivered += 1
+            else:
+                self.overflowed += 1
+                self.unsubscribe(user_id, stream)
+                stream.close()
+
+    def start(self):
+        if self.backend is not None and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for streams in list(self._streams.values()):
+            for stream in streams:
+                stream.close()
+        self._streams.clear()
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.backend.listen():
+                    data = json.loads(message)
+                    self._deliver(data["user_id"], data["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Event listener failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    def stream_count(self, user_id: str) -> int:
+        return len(self._streams.get(user_id, ()))
+
+    def connections(self) -> int:
+        return sum(len(streams) for streams in self._streams.values())
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "connections": self.connections(),
+            "users": len(self._streams),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflowed": self.overflowed,
+        }
+
+
+event_hub = EventHub()
+
+
+def agreement_event(event_type: str, agreement_id: str, status: str, at, **fields) -> dict:
+    return {
+        "type": event_type,
+        "agreement_id": str(agreement_id),
+        "status": status,
+        "at": at.isoformat(),
+        **fields,
+    }
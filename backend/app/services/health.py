@@ -0,0 +1,61 @@
+import asyncio
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.database import async_engine, pool_stats
+
+
+class DatabaseHealthProbe:
+    """Runs ``SELECT 1`` on a pooled connection, at most once per HEALTH_CACHE_SECONDS.
+
+    Load balancer probes arriving in between get the cached result, and
+    concurrent probes share one check, so probing never holds more than one
+    connection. The connection goes back to the pool as soon as the check
+    is done. A check that takes longer than HEALTH_TIMEOUT_SECONDS (e.g.
+    waiting DB_POOL_TIMEOUT for a connection from an exhausted pool) reports
+    the database as disconnected rather than holding every probe behind it.
+    """
+
+    def __init__(self):
+        self._lock = None
+        self._result = None
+        self._checked_at = 0.0
+        self.checks = 0
+        self.failures = 0
+
+    async def check(self) -> dict:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._result is not None and time.monotonic() - self._checked_at < settings.HEALTH_CACHE_SECONDS:
+                return self._result
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._select_one(), timeout=settings.HEALTH_TIMEOUT_SECONDS)
+                result = {"database": "connected", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+            except asyncio.TimeoutError:
+                self.failures += 1
+                result = {"database": "disconnected"}
+                print(f"❌ Database health check got no answer within {settings.HEALTH_TIMEOUT_SECONDS}s")
+            except Exception as e:
+                self.failures += 1
+                result = {"database": "disconnected"}
+                print(f"❌ Database health check failed: {e}")
+            self.checks += 1
+            result["checked_at"] = datetime.utcnow().isoformat()
+            self._result = result
+            self._checked_at = time.monotonic()
+            return result
+
+    async def _select_one(self):
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    def stats(self) -> dict:
+        return {"checks": self.checks, "failures": self.failures, "pool": pool_stats(async_engine)}
+
+
+database_health = DatabaseHealthProbe()
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import settings
+
+# bcrypt only looks at the first 72 bytes; bcrypt>=5 raises instead of truncating
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+class PasswordHashQueueFull(Exception):
+    """Raised when too many hash/verify calls are already waiting for a worker"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so it never holds the event loop.
+
+    bcrypt releases the GIL while it works, so threads give real parallelism
+    here. ``max_concurrency`` caps how many hashes run at once and
+    ``max_queue`` caps how many callers may wait for a slot before new
+    callers are turned away.
+    """
+
+    def __init__(self, rounds: int, max_concurrency: int, max_queue: int):
+        self.rounds = rounds
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="password-hash")
+        self._semaphore = None
+        self.queued = 0
+        self.in_flight = 0
+        self.hash_count = 0
+        self.verify_count = 0
+        self.rehash_count = 0
+        self.rejected_count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.queued >= self.max_queue and self._semaphore.locked():
+            self.rejected_count += 1
+            raise PasswordHashQueueFull()
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _hash_sync(self, password: str) -> str:
+        secret = password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+        return bcrypt.hashpw(secret, bcrypt.gensalt(rounds=self.rounds)).decode("ascii")
+
+    def _verify_sync(self, password: str, hashed_password: str) -> bool:
+        if is_legacy_sha256(hashed_password):
+            digest = hashlib.sha256(password.encode("utf-8")).hexdigest()
+            return hmac.compare_digest(digest, hashed_password)
+        secret = password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+        try:
+            return bcrypt.checkpw(secret, hashed_password.encode("ascii"))
+        except ValueError:
+            # Malformed or unknown hash format
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if is_legacy_sha256(hashed_password):
+            return True
+        try:
+            # $2b$12$<salt+hash>
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    async def hash(self, password: str) -> str:
+        hashed_password = await self._run(self._hash_sync, password)
+        self.hash_count += 1
+        return hashed_password
+
+    async def verify(self, password: str, hashed_password: str):
+        """Check a password, returning ``(valid, new_hash)``.
+
+        ``new_hash`` is set when the password is valid but the stored hash
+        uses an old scheme or cost factor, so the caller can persist it.
+        """
+        is_valid = await self._run(self._verify_sync, password, hashed_password)
+        self.verify_count += 1
+        if not is_valid:
+            return False, None
+        if self.needs_rehash(hashed_password):
+            self.rehash_count += 1
+            return True, await self.hash(password)
+        return True, None
+
+    def stats(self) -> dict:
+        calls = self.hash_count + self.verify_count
+        return {
+            "rounds": self.rounds,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "hashes": self.hash_count,
+            "verifies": self.verify_count,
+            "rehashes": self.rehash_count,
+            "rejected": self.rejected_count,
+            "avg_ms": round(self.total_seconds / calls * 1000, 2) if calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+def is_legacy_sha256(hashed_password: str) -> bool:
+    """Hashes written by the old unsalted SHA-256 fallback (64 hex chars)"""
+    return len(hashed_password) == 64 and all(c in "0123456789abcdef" for c in hashed_password)
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    max_concurrency=settings.PASSWORD_HASH_CONCURRENCY,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
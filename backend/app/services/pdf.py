@@ -0,0 +1,605 @@
+"""Renders a signed agreement to PDF.
+
+A minimal PDF 1.4 writer: the standard Helvetica/Courier fonts, Flate-
+compressed content streams, PNG signature images and stroke signatures as
+vector paths, with no third-party dependency. Output is deterministic (no wall-clock timestamps), so the same
+agreement always produces the same bytes and the same content address.
+
+The standard fonts only cover WinAnsiEncoding (Western European). Lines
+with other characters are drawn in the TrueType font PDF_UNICODE_FONT,
+subset and embedded; a character neither covers is never replaced or
+dropped, the render fails with UnrenderableText instead.
+"""
+import base64
+import binascii
+import json
+import struct
+import zlib
+from datetime import datetime
+from itertools import accumulate
+
+from app.core.config import settings
+from app.services.pdf_fonts import TrueTypeFont
+from app.services.signatures import STROKES, PNG, unpack_strokes
+
+PAGE_WIDTH = 612  # US Letter, in points
+PAGE_HEIGHT = 792
+MARGIN = 54
+
+BODY_SIZE = 10
+BODY_LEADING = 13
+# Courier is monospaced (600/1000 em), so wrapping is exact
+BODY_CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) / (0.6 * BODY_SIZE))
+SMALL_SIZE = 8
+SMALL_LEADING = 10
+SMALL_CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) / (0.6 * SMALL_SIZE))
+
+SIGNATURE_MAX_WIDTH = 220
+SIGNATURE_MAX_HEIGHT = 90
+SIGNATURE_PEN_WIDTH = 2  # canvas units, as drawn by the signature pad
+
+FONTS = {
+    "F1": "Helvetica-Bold",
+    "F2": "Courier",
+    "F3": "Helvetica",
+}
+UNICODE_FONT = "F4"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class UnsupportedImage(ValueError):
+    pass
+
+
+class UnrenderableText(ValueError):
+    """The agreement has characters none of the PDF's fonts can draw"""
+
+    def __init__(self, characters):
+        self.characters = sorted(characters)
+        shown = ", ".join(f"{char} (U+{ord(char):04X})" for char in self.characters[:10])
+        more = f" and {len(self.characters) - 10} more" if len(self.characters) > 10 else ""
+        super().__init__(f"no font for {shown}{more}; set PDF_UNICODE_FONT to a TrueType font that has them")
+
+
+def win_ansi(text: str) -> bool:
+    """Whether the standard fonts can draw ``text``"""
+    try:
+        text.encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def pdf_string(text: str) -> bytes:
+    """A PDF literal string in WinAnsiEncoding; see ``win_ansi``"""
+    raw = text.encode("cp1252")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def info_string(text: str) -> bytes:
+    """A document information string: literal if it fits WinAnsi, else UTF-16"""
+    if win_ansi(text):
+        return pdf_string(text)
+    return b"<FEFF%s>" % binascii.hexlify(text.encode("utf-16-be")).upper()
+
+
+def wrap(text: str, width: int):
+    """Hard-wrap ``text`` to ``width`` characters, keeping blank lines"""
+    lines = []
+    for paragraph in text.replace("\r\n", "\n").split("\n"):
+        paragraph = paragraph.expandtabs(4).rstrip()
+        if not paragraph:
+            lines.append("")
+            continue
+        while len(paragraph) > width:
+            cut = paragraph.rfind(" ", 0, width + 1)
+            if cut <= 0:
+                cut = width
+            lines.append(paragraph[:cut].rstrip())
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    return lines
+
+
+def fit_width(line: str, max_width: float, char_width) -> list:
+    """Split ``line`` into pieces at most ``max_width`` wide, at spaces where
+    possible, for proportional fonts where ``wrap``'s count doesn't hold"""
+    pieces = []
+    while line:
+        width = 0.0
+        end = 0
+        while end < len(line) and width + char_width(line[end]) <= max_width:
+            width += char_width(line[end])
+            end += 1
+        if end == len(line):
+            pieces.append(line)
+            break
+        cut = line.rfind(" ", 0, end + 1)
+        if cut <= 0:
+            cut = max(end, 1)
+        pieces.append(line[:cut].rstrip())
+        line = line[cut:].lstrip()
+    return pieces
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+_LOW_BYTE = (255).__and__
+
+
+def _add_bytes(a: bytes, b: bytes, masks: tuple) -> bytes:
+    """Byte-wise (a + b) mod 256 over whole rows at once, using big-int arithmetic"""
+    low, high = masks
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    return (((x & low) + (y & low)) ^ ((x ^ y) & high)).to_bytes(len(a), "big")
+
+
+def _undo_sub(line: bytearray, bpp: int):
+    # Each channel is a running sum along the row
+    for channel in range(bpp):
+        line[channel::bpp] = bytes(map(_LOW_BYTE, accumulate(line[channel::bpp])))
+
+
+def _unfilter(raw: bytes, width: int, height: int, bpp: int) -> bytearray:
+    """Undo PNG's per-row filters. Blank rows, Up and Sub (the bulk of a
+    signature canvas) take fast paths; Average and Paeth rows below ink
+    fall back to a per-byte loop."""
+    stride = width * bpp
+    out = bytearray(stride * height)
+    zero = bytes(stride)
+    masks = (int.from_bytes(b"\x7f" * stride, "big"), int.from_bytes(b"\x80" * stride, "big"))
+    prev = zero
+    pos = 0
+    for y in range(height):
+        filter_type = raw[pos]
+        line = bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += stride + 1
+        if filter_type > 4:
+            raise UnsupportedImage(f"bad PNG filter type {filter_type}")
+        prev_blank = prev == zero
+        if filter_type == 0 or (prev_blank and line == zero):
+            pass
+        elif filter_type == 1 or (filter_type == 4 and prev_blank):
+            # Paeth over a blank row always picks the left byte, i.e. Sub
+            _undo_sub(line, bpp)
+        elif filter_type == 2:
+            if not prev_blank:
+                line = bytearray(_add_bytes(line, prev, masks))
+        elif filter_type == 3:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        else:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                up_left = prev[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + _paeth(left, prev[i], up_left)) & 0xFF
+        out[y * stride:(y + 1) * stride] = line
+        prev = bytes(line)
+    return out
+
+
+def _inflate(data: bytes, size: int) -> bytes:
+    """Decompress exactly ``size`` bytes, never more: a stream that holds more
+    or less than the image needs (a zlib bomb, a truncated file) is rejected"""
+    inflater = zlib.decompressobj()
+    try:
+        out = inflater.decompress(data, size)
+        extra = inflater.decompress(inflater.unconsumed_tail, 1)
+    except zlib.error as e:
+        raise UnsupportedImage(f"bad PNG image data: {e}")
+    if extra or len(out) != size:
+        raise UnsupportedImage("PNG image data doesn't match its dimensions")
+    return out
+
+
+def png_image(data: bytes) -> dict:
+    """Image XObject parts for a PNG: dict, stream and optional soft mask.
+
+    Grey, RGB and palette images pass their IDAT stream straight through
+    with a PNG predictor. Images with an alpha channel (what a canvas
+    signature pad produces) are unfiltered here and split into colour and
+    an /SMask, so the signature keeps its transparent background.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise UnsupportedImage("not a PNG")
+    pos = len(PNG_SIGNATURE)
+    header = None
+    palette = b""
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"IDAT":
+            idat.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+    if header is None or not idat:
+        raise UnsupportedImage("truncated PNG")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    # Checked again here for rows stored before /sign checked them
+    if not (0 < width <= settings.SIGNATURE_MAX_IMAGE_WIDTH and 0 < height <= settings.SIGNATURE_MAX_IMAGE_HEIGHT):
+        raise UnsupportedImage(f"{width}x{height} PNG is larger than a signature can be")
+    if interlace:
+        raise UnsupportedImage("interlaced PNG")
+    if color_type == 3 and (not palette or len(palette) % 3):
+        raise UnsupportedImage("palette PNG without a valid palette")
+    compressed = b"".join(idat)
+
+    if color_type in (0, 2, 3):
+        colors = 3 if color_type == 2 else 1
+        if color_type == 3:
+            color_space = b"[/Indexed /DeviceRGB %d <%s>]" % (len(palette) // 3 - 1, binascii.hexlify(palette))
+        else:
+            color_space = b"/DeviceRGB" if color_type == 2 else b"/DeviceGray"
+        return {
+            "width": width,
+            "height": height,
+            "dict": b"/ColorSpace %s /BitsPerComponent %d /Filter /FlateDecode "
+                    b"/DecodeParms << /Predictor 15 /Colors %d /BitsPerComponent %d /Columns %d >>"
+                    % (color_space, bit_depth, colors, bit_depth, width),
+            "stream": compressed,
+            "smask": None,
+        }
+
+    if color_type in (4, 6) and bit_depth == 8:
+        channels = 2 if color_type == 4 else 4
+        pixels = _unfilter(_inflate(compressed, (width * channels + 1) * height), width, height, channels)
+        alpha = bytes(pixels[channels - 1::channels])
+        if color_type == 4:
+            color = bytes(pixels[0::2])
+            color_space = b"/DeviceGray"
+        else:
+            color = bytearray(width * height * 3)
+            color[0::3] = pixels[0::4]
+            color[1::3] = pixels[1::4]
+            color[2::3] = pixels[2::4]
+            color_space = b"/DeviceRGB"
+        return {
+            "width": width,
+            "height": height,
+            "dict": b"/ColorSpace %s /BitsPerComponent 8 /Filter /FlateDecode" % color_space,
+            "stream": zlib.compress(bytes(color)),
+            "smask": zlib.compress(alpha),
+        }
+
+    raise UnsupportedImage(f"unsupported PNG colour type {color_type} at depth {bit_depth}")
+
+
+def signature_png(signature_data):
+    """The PNG bytes in a ``data:image/png;base64,...`` signature, if there is one"""
+    values = signature_data.values() if isinstance(signature_data, dict) else [signature_data]
+    for value in values:
+        if isinstance(value, str) and value.startswith("data:image/png;base64,"):
+            try:
+                return base64.b64decode(value.split(",", 1)[1], validate=False)
+            except (binascii.Error, ValueError):
+                return None
+    return None
+
+
+class _Layout:
+    """Lays out lines top to bottom, starting a new page when one fills up"""
+
+    def __init__(self, unicode_font: TrueTypeFont = None):
+        self.unicode_font = unicode_font
+        self.glyphs = {}  # glyph id -> character, for the embedded font's subset
+        self.unrenderable = set()
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.images = []
+        self.pages.append((self.ops, self.images))
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure(self, height: float):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def text(self, line: str, font: str, size: float, leading: float):
+        if win_ansi(line):
+            self.ensure(leading)
+            self.y -= leading
+            self.ops.append(b"BT /%s %g Tf %g %g Td %s Tj ET" % (font.encode(), size, MARGIN, self.y, pdf_string(line)))
+            return
+        missing = {char for char in line if not win_ansi(char)}
+        if self.unicode_font is not None:
+            missing = self.unicode_font.missing("".join(missing))
+        if missing:
+            # Keep laying out, so the error names every missing character
+            self.unrenderable |= missing
+            return
+        unicode_font = self.unicode_font
+        char_width = lambda char: unicode_font.text_width(char, size)
+        for piece in fit_width(line, PAGE_WIDTH - 2 * MARGIN, char_width):
+            glyphs = [unicode_font.glyph(char) for char in piece]
+            self.glyphs.update(zip(glyphs, piece))
+            self.ensure(leading)
+            self.y -= leading
+            self.ops.append(b"BT /%s %g Tf %g %g Td <%s> Tj ET" % (
+                UNICODE_FONT.encode(), size, MARGIN, self.y, b"".join(b"%04X" % glyph for glyph in glyphs)))
+
+    def gap(self, height: float):
+        self.y -= height
+
+    def rule(self):
+        self.ensure(6)
+        self.y -= 6
+        self.ops.append(b"0.6 G 0.5 w %g %g m %g %g l S 0 G" % (MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y))
+
+    def drawing(self, ops: list, height: float):
+        """Vector ops drawn with their origin at the left margin, ``height`` below the cursor"""
+        self.ensure(height)
+        self.y -= height
+        self.ops.append(b"q 1 0 0 1 %g %g cm" % (MARGIN, self.y))
+        self.ops.extend(ops)
+        self.ops.append(b"Q")
+
+    def image(self, name: str, width: float, height: float):
+        self.ensure(height)
+        self.y -= height
+        self.images.append(name)
+        self.ops.append(b"q %g 0 0 %g %g %g cm /%s Do Q" % (width, height, MARGIN, self.y, name.encode()))
+
+
+def stroke_ops(strokes):
+    """Path ops and (width, height) for strokes, scaled into the signature box.
+
+    Canvas y grows downwards, PDF y upwards. Single-point strokes (dots)
+    still show, as zero-length segments with round caps.
+    """
+    points = [point for stroke in strokes for point in stroke]
+    if not points:
+        return [], (0, 0)
+    pad = SIGNATURE_PEN_WIDTH
+    left = min(x for x, _ in points) - pad
+    top = min(y for _, y in points) - pad
+    bottom = max(y for _, y in points) + pad
+    width = max(x for x, _ in points) + pad - left
+    height = bottom - top
+    scale = min(SIGNATURE_MAX_WIDTH / width, SIGNATURE_MAX_HEIGHT / height, 1.0)
+    ops = [b"0.12 0.16 0.22 RG 1 J 1 j %.2f w" % max(SIGNATURE_PEN_WIDTH * scale, 0.5)]
+    for stroke in strokes:
+        if not stroke:
+            continue
+        coordinates = [((x - left) * scale, (bottom - y) * scale) for x, y in stroke]
+        path = [b"%.2f %.2f m" % coordinates[0]]
+        path.extend(b"%.2f %.2f l" % point for point in coordinates[1:] or coordinates)
+        ops.append(b" ".join(path) + b" S")
+    return ops, (width * scale, height * scale)
+
+
+def _format_time(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S UTC")
+    return str(value) if value else "-"
+
+
+def _audit_line(event) -> str:
+    if not isinstance(event, dict):
+        return str(event)
+    parts = [str(event.get("at", "")), str(event.get("event", ""))]
+    if event.get("client_ip"):
+        parts.append(str(event["client_ip"]))
+    if event.get("user_agent"):
+        parts.append(str(event["user_agent"]))
+    return "  ".join(part for part in parts if part)
+
+
+def render_agreement_pdf(agreement: dict, unicode_font: TrueTypeFont = None) -> bytes:
+    """PDF bytes for a signed agreement.
+
+    ``agreement`` is a plain dict (see ``pdf_worker.agreement_pdf_input``) so
+    rendering can run off the event loop without touching the session.
+    Raises UnrenderableText if a character is in neither the standard fonts
+    nor ``unicode_font``.
+    """
+    layout = _Layout(unicode_font)
+    layout.text("Meeting Agreement", "F1", 16, 22)
+    layout.gap(4)
+    details = [
+        ("Client", agreement["client_name"]),
+        ("Client phone", agreement.get("client_phone")),
+        ("Client email", agreement.get("client_email")),
+        ("Meeting type", agreement.get("meeting_type")),
+        ("State", agreement.get("state")),
+        ("Agreement ID", agreement["id"]),
+        ("Created", _format_time(agreement.get("created_at"))),
+    ]
+    for label, value in details:
+        if value:
+            layout.text(f"{label}: {value}", "F3", 10, 14)
+    layout.gap(6)
+    layout.rule()
+    layout.gap(8)
+
+    for line in wrap(agreement["agreement_text"] or "", BODY_CHARS_PER_LINE):
+        layout.text(line, "F2", BODY_SIZE, BODY_LEADING)
+
+    layout.gap(12)
+    layout.rule()
+    layout.gap(6)
+    layout.text("Signature", "F1", 12, 18)
+
+    images = {}
+    blob = agreement.get("signature_blob")
+    png = None
+    signature_drawn = False
+    if blob is None:
+        png = signature_png(agreement.get("signature_data"))
+    elif blob[0] == PNG:
+        png = blob[1:]
+    elif blob[0] == STROKES:
+        ops, (_, height) = stroke_ops(unpack_strokes(blob))
+        if ops:
+            layout.gap(4)
+            layout.drawing(ops, height)
+            signature_drawn = True
+    if png is not None:
+        try:
+            image = png_image(png)
+        except (UnsupportedImage, zlib.error, struct.error):
+            image = None
+        if image is not None and image["width"] and image["height"]:
+            scale = min(SIGNATURE_MAX_WIDTH / image["width"], SIGNATURE_MAX_HEIGHT / image["height"], 1.0)
+            images["Im1"] = image
+            layout.gap(4)
+            layout.image("Im1", image["width"] * scale, image["height"] * scale)
+            signature_drawn = True
+    if not signature_drawn:
+        digest = zlib.crc32(blob if blob is not None else json.dumps(agreement.get("signature_data"), sort_keys=True, default=str).encode())
+        layout.text(f"[Electronic signature on file, checksum {digest:08x}]", "F3", 10, 14)
+
+    layout.gap(4)
+    layout.text(f"Signed by {agreement['client_name']} at {_format_time(agreement.get('signed_at'))}", "F3", 10, 14)
+    if agreement.get("client_ip"):
+        layout.text(f"IP address: {agreement['client_ip']}", "F3", 10, 14)
+    for line in wrap(f"User agent: {agreement['user_agent']}", SMALL_CHARS_PER_LINE) if agreement.get("user_agent") else []:
+        layout.text(line, "F2", SMALL_SIZE, SMALL_LEADING)
+
+    audit_trail = agreement.get("audit_trail") or []
+    if audit_trail:
+        layout.gap(12)
+        layout.text("Audit trail", "F1", 12, 18)
+        for event in audit_trail:
+            for line in wrap(_audit_line(event), SMALL_CHARS_PER_LINE):
+                layout.text(line, "F2", SMALL_SIZE, SMALL_LEADING)
+
+    if layout.unrenderable:
+        raise UnrenderableText(layout.unrenderable)
+    return _write_pdf(layout.pages, images, agreement, unicode_font, layout.glyphs)
+
+
+def _unicode_font_objects(font: TrueTypeFont, glyphs: dict, first_id: int) -> dict:
+    """Objects for ``font`` as a Type0 font over the glyphs used, numbered
+    from ``first_id`` (the Type0 font itself)"""
+    used = sorted(glyphs)
+    # A subset is named with a tag derived from its glyphs, per the spec
+    tag = "".join(chr(65 + digit % 26) for digit in zlib.crc32(repr(used).encode()).to_bytes(6, "big"))
+    name = b"%s+HomeShowUnicode" % tag.encode()
+    subset = font.subset(used)
+    font_file = zlib.compress(subset)
+    widths = b" ".join(b"%d [%d]" % (glyph, font.width(glyph)) for glyph in used)
+    to_unicode = [
+        b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        b"/CMapName /Adobe-Identity-UCS def /CMapType 2 def",
+        b"1 begincodespacerange <0000> <FFFF> endcodespacerange",
+    ]
+    for start in range(0, len(used), 100):
+        chunk = used[start:start + 100]
+        to_unicode.append(b"%d beginbfchar" % len(chunk))
+        to_unicode.extend(
+            b"<%04X> <%s>" % (glyph, binascii.hexlify(glyphs[glyph].encode("utf-16-be")).upper()) for glyph in chunk
+        )
+        to_unicode.append(b"endbfchar")
+    to_unicode.append(b"endcmap CMapName currentdict /CMap defineresource pop end end")
+    to_unicode = zlib.compress(b"\n".join(to_unicode))
+
+    descendant, descriptor, file_id, cmap_id = first_id + 1, first_id + 2, first_id + 3, first_id + 4
+    bbox = b" ".join(b"%d" % font.scaled(value) for value in font.bbox)
+    return {
+        first_id: b"<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H "
+                  b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (name, descendant, cmap_id),
+        descendant: b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s "
+                    b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                    b"/FontDescriptor %d 0 R /CIDToGIDMap /Identity /DW 1000 /W [%s] >>" % (name, descriptor, widths),
+        descriptor: b"<< /Type /FontDescriptor /FontName /%s /Flags 4 /FontBBox [%s] /ItalicAngle 0 "
+                    b"/Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>"
+                    % (name, bbox, font.scaled(font.ascent), font.scaled(font.descent), font.scaled(font.ascent), file_id),
+        file_id: b"<< /Filter /FlateDecode /Length1 %d /Length %d >>\nstream\n%s\nendstream"
+                 % (len(subset), len(font_file), font_file),
+        cmap_id: b"<< /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream" % (len(to_unicode), to_unicode),
+    }
+
+
+def _write_pdf(pages, images: dict, agreement: dict, unicode_font: TrueTypeFont = None, glyphs: dict = None) -> bytes:
+    objects = {}
+
+    def stream(dictionary: bytes, data: bytes) -> bytes:
+        return b"<< %s /Length %d >>\nstream\n%s\nendstream" % (dictionary, len(data), data)
+
+    # Fixed numbering: 1 catalog, 2 page tree, 3 info, then fonts, images, pages
+    next_id = 4
+    font_ids = {}
+    for name, base_font in FONTS.items():
+        font_ids[name] = next_id
+        objects[next_id] = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % base_font.encode()
+        next_id += 1
+    if glyphs:
+        font_objects = _unicode_font_objects(unicode_font, glyphs, next_id)
+        objects.update(font_objects)
+        font_ids[UNICODE_FONT] = next_id
+        next_id += len(font_objects)
+    image_ids = {}
+    for name, image in images.items():
+        smask = b""
+        if image["smask"] is not None:
+            objects[next_id] = stream(
+                b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Filter /FlateDecode" % (image["width"], image["height"]),
+                image["smask"],
+            )
+            smask = b" /SMask %d 0 R" % next_id
+            next_id += 1
+        objects[next_id] = stream(
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d %s%s"
+            % (image["width"], image["height"], image["dict"], smask),
+            image["stream"],
+        )
+        image_ids[name] = next_id
+        next_id += 1
+
+    fonts = b" ".join(b"/%s %d 0 R" % (name.encode(), object_id) for name, object_id in font_ids.items())
+    page_ids = []
+    for ops, page_images in pages:
+        content = zlib.compress(b"\n".join(ops))
+        objects[next_id] = stream(b"/Filter /FlateDecode", content)
+        content_id = next_id
+        next_id += 1
+        xobjects = b" ".join(b"/%s %d 0 R" % (name.encode(), image_ids[name]) for name in page_images)
+        resources = b"/Font << %s >>" % fonts
+        if xobjects:
+            resources += b" /XObject << %s >>" % xobjects
+        objects[next_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << %s >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, resources, content_id)
+        )
+        page_ids.append(next_id)
+        next_id += 1
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+    info = b"/Title %s /Producer (HomeShow)" % info_string(f"Meeting Agreement - {agreement['client_name']}")
+    signed_at = agreement.get("signed_at")
+    if isinstance(signed_at, datetime):
+        info += b" /CreationDate (D:%s)" % signed_at.strftime("%Y%m%d%H%M%SZ").encode()
+    objects[3] = b"<< %s >>" % info
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for object_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[object_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
@@ -0,0 +1,220 @@
+"""TrueType fonts for the PDF writer: parsing, measuring and subsetting.
+
+Only what embedding needs: the character map, advance widths and the
+metrics for a font descriptor, and a subset that keeps the used glyphs
+(and the glyphs composite ones are built from) while emptying the rest,
+so a large CJK font adds kilobytes to a PDF rather than megabytes. Glyph
+ids are unchanged, which is what the writer's Identity-H encoding needs.
+Fonts with TrueType outlines (a ``glyf`` table) only; CFF-based .otf
+files and .ttc collections are rejected.
+"""
+import struct
+
+# Tables a PDF viewer uses from an embedded TrueType font (FontFile2)
+EMBEDDED_TABLES = (b"head", b"hhea", b"maxp", b"hmtx", b"loca", b"glyf", b"cvt ", b"fpgm", b"prep")
+
+# Composite glyph component flags
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+class FontError(ValueError):
+    pass
+
+
+def _checksum(data: bytes) -> int:
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+class TrueTypeFont:
+    """A parsed TrueType font. Read-only once loaded, so render threads can share one."""
+
+    def __init__(self, data: bytes):
+        if data[:4] not in (b"\x00\x01\x00\x00", b"true"):
+            raise FontError("not a TrueType font (CFF .otf and .ttc collections are not supported)")
+        self.data = data
+        (num_tables,) = struct.unpack(">H", data[4:6])
+        self.tables = {}
+        for index in range(num_tables):
+            tag, _, offset, length = struct.unpack(">4sIII", data[12 + 16 * index:28 + 16 * index])
+            self.tables[tag] = (offset, length)
+        for tag in (b"head", b"hhea", b"maxp", b"hmtx", b"loca", b"glyf", b"cmap"):
+            if tag not in self.tables:
+                raise FontError(f"font has no {tag.decode()} table")
+
+        head = self.table(b"head")
+        self.units_per_em = struct.unpack(">H", head[18:20])[0]
+        self.bbox = struct.unpack(">hhhh", head[36:44])
+        self.long_loca = struct.unpack(">h", head[50:52])[0] == 1
+        hhea = self.table(b"hhea")
+        self.ascent, self.descent = struct.unpack(">hh", hhea[4:8])
+        (metric_count,) = struct.unpack(">H", hhea[34:36])
+        (self.glyph_count,) = struct.unpack(">H", self.table(b"maxp")[4:6])
+
+        hmtx = self.table(b"hmtx")
+        advances = [struct.unpack(">H", hmtx[4 * i:4 * i + 2])[0] for i in range(metric_count)]
+        self.advances = advances + [advances[-1]] * (self.glyph_count - metric_count)
+
+        loca = self.table(b"loca")
+        if self.long_loca:
+            self.offsets = struct.unpack(f">{self.glyph_count + 1}I", loca[:4 * (self.glyph_count + 1)])
+        else:
+            self.offsets = [2 * offset for offset in struct.unpack(f">{self.glyph_count + 1}H", loca[:2 * (self.glyph_count + 1)])]
+        self.cmap = self._read_cmap()
+
+    def table(self, tag: bytes) -> bytes:
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def _read_cmap(self) -> dict:
+        cmap = self.table(b"cmap")
+        (count,) = struct.unpack(">H", cmap[2:4])
+        subtables = {}
+        for index in range(count):
+            platform, encoding, offset = struct.unpack(">HHI", cmap[4 + 8 * index:12 + 8 * index])
+            subtables[(platform, encoding)] = offset
+        # Full Unicode (format 12) first, then the BMP (format 4)
+        for key in ((3, 10), (0, 4), (0, 6), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0)):
+            if key in subtables:
+                offset = subtables[key]
+                (format_,) = struct.unpack(">H", cmap[offset:offset + 2])
+                if format_ == 12:
+                    return self._cmap_format_12(cmap, offset)
+                if format_ == 4:
+                    return self._cmap_format_4(cmap, offset)
+        raise FontError("font has no Unicode character map")
+
+    @staticmethod
+    def _cmap_format_4(cmap: bytes, offset: int) -> dict:
+        (seg_count,) = struct.unpack(">H", cmap[offset + 6:offset + 8])
+        seg_count //= 2
+        ends = struct.unpack(f">{seg_count}H", cmap[offset + 14:offset + 14 + 2 * seg_count])
+        starts_at = offset + 16 + 2 * seg_count
+        starts = struct.unpack(f">{seg_count}H", cmap[starts_at:starts_at + 2 * seg_count])
+        deltas = struct.unpack(f">{seg_count}h", cmap[starts_at + 2 * seg_count:starts_at + 4 * seg_count])
+        range_offsets_at = starts_at + 4 * seg_count
+        range_offsets = struct.unpack(f">{seg_count}H", cmap[range_offsets_at:range_offsets_at + 2 * seg_count])
+        mapping = {}
+        for segment in range(seg_count):
+            start, end, delta, range_offset = starts[segment], ends[segment], deltas[segment], range_offsets[segment]
+            if start == 0xFFFF:
+                continue
+            for code in range(start, end + 1):
+                if range_offset == 0:
+                    glyph = (code + delta) & 0xFFFF
+                else:
+                    at = range_offsets_at + 2 * segment + range_offset + 2 * (code - start)
+                    (glyph,) = struct.unpack(">H", cmap[at:at + 2])
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    @staticmethod
+    def _cmap_format_12(cmap: bytes, offset: int) -> dict:
+        (groups,) = struct.unpack(">I", cmap[offset + 12:offset + 16])
+        mapping = {}
+        for index in range(groups):
+            start, end, glyph = struct.unpack(">III", cmap[offset + 16 + 12 * index:offset + 28 + 12 * index])
+            for code in range(start, end + 1):
+                mapping[code] = glyph + code - start
+        return mapping
+
+    def glyph(self, char: str):
+        """The glyph id for ``char``, or None if the font doesn't have it"""
+        return self.cmap.get(ord(char))
+
+    def missing(self, text: str) -> set:
+        return {char for char in text if ord(char) not in self.cmap}
+
+    def width(self, glyph: int) -> int:
+        """Advance width in thousandths of an em"""
+        return round(self.advances[glyph] * 1000 / self.units_per_em)
+
+    def text_width(self, text: str, size: float) -> float:
+        return sum(self.width(self.cmap.get(ord(char), 0)) for char in text) * size / 1000
+
+    def scaled(self, value: int) -> int:
+        return round(value * 1000 / self.units_per_em)
+
+    def _glyph_data(self, glyph: int) -> bytes:
+        offset = self.tables[b"glyf"][0]
+        return self.data[offset + self.offsets[glyph]:offset + self.offsets[glyph + 1]]
+
+    def _components(self, glyph: int):
+        """Glyph ids a composite glyph is built from"""
+        data = self._glyph_data(glyph)
+        if len(data) < 10 or struct.unpack(">h", data[:2])[0] >= 0:
+            return
+        pos = 10
+        while True:
+            flags, component = struct.unpack(">HH", data[pos:pos + 4])
+            yield component
+            pos += 4 + (4 if flags & ARG_1_AND_2_ARE_WORDS else 2)
+            if flags & WE_HAVE_A_SCALE:
+                pos += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                pos += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                pos += 8
+            if not flags & MORE_COMPONENTS:
+                return
+
+    def subset(self, glyphs) -> bytes:
+        """A FontFile2 holding only ``glyphs`` (plus .notdef and components);
+        every other glyph keeps its id but has no outline"""
+        keep = {0}
+        pending = list(glyphs)
+        while pending:
+            glyph = pending.pop()
+            if glyph not in keep and glyph < self.glyph_count:
+                keep.add(glyph)
+                pending.extend(self._components(glyph))
+
+        glyf = bytearray()
+        loca = []
+        for glyph in range(self.glyph_count):
+            loca.append(len(glyf))
+            if glyph in keep:
+                glyf += self._glyph_data(glyph)
+                glyf += b"\0" * (-len(glyf) % 4)
+        loca.append(len(glyf))
+
+        head = bytearray(self.table(b"head"))
+        head[8:12] = b"\0\0\0\0"  # checkSumAdjustment
+        head[50:52] = struct.pack(">h", 1)  # long loca offsets
+        tables = {
+            b"head": bytes(head),
+            b"loca": struct.pack(f">{len(loca)}I", *loca),
+            b"glyf": bytes(glyf),
+        }
+        for tag in EMBEDDED_TABLES:
+            if tag not in tables and tag in self.tables:
+                tables[tag] = self.table(tag)
+        return _sfnt(tables)
+
+
+def _sfnt(tables: dict) -> bytes:
+    tags = sorted(tables)
+    power = 1
+    while power * 2 <= len(tags):
+        power *= 2
+    header = struct.pack(">IHHHH", 0x00010000, len(tags), power * 16, power.bit_length() - 1, len(tags) * 16 - power * 16)
+    offset = len(header) + 16 * len(tags)
+    directory = b""
+    body = b""
+    for tag in tags:
+        data = tables[tag]
+        directory += struct.pack(">4sIII", tag, _checksum(data), offset + len(body), len(data))
+        body += data + b"\0" * (-len(data) % 4)
+    return header + directory + body
+
+
+def load_font(path: str) -> TrueTypeFont:
+    with open(path, "rb") as handle:
+        return TrueTypeFont(handle.read())
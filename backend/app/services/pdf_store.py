@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from app.core.config import settings
+
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class PdfStore:
+    """Content-addressed PDF files on local disk: ``<root>/<ab>/<abcdef...>.pdf``.
+
+    A file's name is the SHA-256 of its bytes, so writes are idempotent and
+    files never change once written. That lets them be served with
+    long-lived caching and range requests straight from disk. Files are
+    written to a temp file and renamed into place, so readers never see a
+    partial PDF. A digest is not a secret (anyone with the PDF can compute
+    it), so files are only served to the agreement's realtor.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.pdf")
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest
+
+
+def pdf_url(agreement_id: str, digest: str) -> str:
+    """The agreement's PDF endpoint; ``v`` changes when the PDF does"""
+    return f"/api/agreements/{agreement_id}/pdf?v={digest}"
+
+
+def pdf_digest(url: str):
+    """The file behind a stored ``pdf_url``, or None"""
+    match = DIGEST_PATTERN.search(url or "")
+    return match.group(0) if match else None
+
+
+pdf_store = PdfStore(settings.PDF_STORAGE_DIR)
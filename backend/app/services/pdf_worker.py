@@ -0,0 +1,218 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.core.config import settings
+from app.core.metrics import span
+from app.database import AsyncSessionLocal, Agreement
+from app.services.pdf import render_agreement_pdf, UnrenderableText
+from app.services.pdf_fonts import load_font
+from app.services.events import event_hub, agreement_event
+from app.services.pdf_store import pdf_store, pdf_url
+from app.services.templates import template_store
+from app.services.view_buffer import view_buffer
+from app.services.audit_log import agreement_timeline
+
+
+def agreement_pdf_input(agreement, agreement_text: str, audit_trail: list) -> dict:
+    """The plain-data snapshot of an agreement that render_agreement_pdf takes"""
+    return {
+        "id": str(agreement.id),
+        "client_name": agreement.client_name,
+        "client_phone": agreement.client_phone,
+        "client_email": agreement.client_email,
+        "meeting_type": agreement.meeting_type,
+        "state": agreement.state,
+        "agreement_text": agreement_text,
+        "signature_data": agreement.signature_data,
+        "signature_blob": agreement.signature_blob,
+        "audit_trail": audit_trail,
+        "signed_at": agreement.signed_at,
+        "client_ip": agreement.client_ip,
+        "user_agent": agreement.user_agent,
+        "created_at": agreement.created_at,
+    }
+
+
+def pdf_due(now: datetime):
+    """Signed agreements without a PDF that the worker should render now:
+    never failed, or failed fewer than PDF_MAX_ATTEMPTS times and past their retry time"""
+    return and_(
+        Agreement.signed_at.is_not(None),
+        Agreement.pdf_url.is_(None),
+        func.coalesce(Agreement.pdf_attempts, 0) < settings.PDF_MAX_ATTEMPTS,
+        or_(Agreement.pdf_retry_at.is_(None), Agreement.pdf_retry_at <= now),
+    )
+
+
+def pdf_batch_query(now: datetime, limit: int):
+    """The next agreements to render, oldest signature first"""
+    return (
+        select(Agreement)
+        .options(undefer(Agreement.signature_blob))
+        .where(pdf_due(now))
+        .order_by(Agreement.signed_at)
+        .limit(limit)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def unicode_font():
+    """PDF_UNICODE_FONT, parsed once per process; None when it isn't set"""
+    return load_font(settings.PDF_UNICODE_FONT) if settings.PDF_UNICODE_FONT else None
+
+
+def render_and_store(pdf_input: dict) -> str:
+    return pdf_store.put(render_agreement_pdf(pdf_input, unicode_font()))
+
+
+class PdfRenderWorker:
+    """Renders PDFs for signed agreements whose ``pdf_url`` is still empty.
+
+    The agreements table is the queue: ``notify()`` after a signature wakes
+    the worker immediately, and the PDF_POLL_INTERVAL poll picks up anything
+    missed (a restart, another worker's signature). Rendering is CPU-bound
+    and runs on a small thread pool, off the event loop. Two workers
+    rendering the same agreement produce the same file, so the race is
+    harmless. A failed render is recorded on the row (pdf_attempts,
+    pdf_error) and retried after PDF_RETRY_BASE_SECONDS, doubling, until
+    PDF_MAX_ATTEMPTS; after that only scripts/render_pdfs.py retries it.
+    Text no font can draw (UnrenderableText) fails at once, with no
+    retries: the agreement keeps its pdf_error until PDF_UNICODE_FONT
+    covers it and scripts/render_pdfs.py is run.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=settings.PDF_RENDER_CONCURRENCY, thread_name_prefix="pdf-render")
+        self._wakeup = None
+        self._task = None
+        self.rendered_count = 0
+        self.failed_count = 0
+
+    def start(self):
+        if not settings.PDF_RENDER_ENABLED or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                print(f"❌ PDF render pass failed: {e}")
+                processed = 0
+            if processed >= settings.PDF_RENDER_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.PDF_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def snapshot(self, db: AsyncSession, agreement) -> dict:
+        """Read what render_agreement_pdf needs for one agreement"""
+        agreement_text = await template_store.render_agreement_text(db, agreement)
+        audit_trail = await agreement_timeline(db, agreement)
+        return agreement_pdf_input(agreement, agreement_text, audit_trail)
+
+    async def render_snapshot(self, pdf_input: dict) -> str:
+        """Render and store a snapshot's PDF off the event loop; returns its digest"""
+        loop = asyncio.get_running_loop()
+        with span("pdf_render"):
+            return await loop.run_in_executor(self._executor, render_and_store, pdf_input)
+
+    async def _failed_render(self, agreement, error):
+        self.failed_count += 1
+        attempts = (agreement.pdf_attempts or 0) + 1
+        if isinstance(error, UnrenderableText):
+            # Retrying can't help, and printing '?' for a name is not an option
+            attempts = max(attempts, settings.PDF_MAX_ATTEMPTS)
+        backoff = min(settings.PDF_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 86400)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Agreement)
+                .where(Agreement.id == agreement.id, Agreement.pdf_url.is_(None))
+                .values(
+                    pdf_attempts=attempts,
+                    pdf_error=str(error)[:1000],
+                    pdf_retry_at=datetime.utcnow() + timedelta(seconds=backoff),
+                )
+            )
+            await db.commit()
+        if attempts >= settings.PDF_MAX_ATTEMPTS:
+            print(f"❌ PDF render failed for agreement {agreement.id} {attempts} times, giving up: {error}")
+        else:
+            print(f"❌ PDF render failed for agreement {agreement.id} (attempt {attempts}): {error}")
+
+    async def process_batch(self) -> int:
+        """Render PDFs for one batch of signed agreements without one.
+
+        Everything is read up front and that session is closed before the
+        first render, and each ``pdf_url`` is then written in its own short
+        transaction: on SQLite a transaction holds the write lock from its
+        first write to its commit, and requests must not wait on renders.
+        """
+        # Views buffered before the signature belong in the PDF's audit trail
+        await view_buffer.flush()
+        snapshots = []
+        failed = []
+        async with AsyncSessionLocal() as db:
+            query = pdf_batch_query(datetime.utcnow(), settings.PDF_RENDER_BATCH_SIZE)
+            agreements = (await db.execute(query)).scalars().all()
+            for agreement in agreements:
+                try:
+                    snapshots.append((agreement, await self.snapshot(db, agreement)))
+                except Exception as e:
+                    failed.append((agreement, e))
+        for agreement, error in failed:
+            await self._failed_render(agreement, error)
+        for agreement, pdf_input in snapshots:
+            try:
+                digest = await self.render_snapshot(pdf_input)
+            except Exception as e:
+                await self._failed_render(agreement, e)
+                continue
+            url = pdf_url(agreement.id, digest)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Agreement)
+                    .where(Agreement.id == agreement.id, Agreement.pdf_url.is_(None))
+                    .values(pdf_url=url, pdf_error=None, pdf_retry_at=None)
+                )
+                await db.commit()
+            self.rendered_count += 1
+            await event_hub.publish(
+                agreement.user_id,
+                agreement_event("agreement.pdf_ready", agreement.id, agreement.status, datetime.utcnow(), pdf_url=url),
+            )
+        return len(agreements)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.PDF_RENDER_ENABLED,
+            "rendered": self.rendered_count,
+            "failed": self.failed_count,
+        }
+
+
+pdf_worker = PdfRenderWorker()
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select, CompoundSelect
+
+from app.core.cache import TTLCache, create_shared_cache
+from app.core.config import settings
+from app.database import async_engine, replica_engines, pool_stats
+
+# Seconds a Postgres standby is behind: 0 while it has replayed all it has
+# received, so an idle primary doesn't make its standbys look stale. NULL
+# on a server that isn't a standby.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replica_unavailable(error) -> bool:
+    """Whether a query that failed on a replica should be retried on the
+    primary: the replica refused or dropped the connection, or can't run it
+    (e.g. a SQLite copy without a table added since)"""
+    if isinstance(error, OSError):
+        return True
+    return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+
+
+class Replica:
+    """A replica engine and what the last probe or query saw of it.
+
+    ``error`` is logged when the replica goes down and kept out of
+    ``stats()``: driver errors can name hosts and users.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True  # until a probe or a query says otherwise
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+        self.sessions = 0
+        self.failures = 0
+
+    def down(self, error: str):
+        if self.healthy or error != self.error:
+            url = self.engine.url.render_as_string(hide_password=True)
+            print(f"❌ Read replica {url} unavailable: {error}")
+        self.healthy = False
+        self.error = error
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "checked_at": self.checked_at,
+            "sessions": self.sessions,
+            "failures": self.failures,
+            "pool": pool_stats(self.engine),
+        }
+
+
+class RoutingSession(Session):
+    """Session whose SELECTs go to ``info["replica"]`` when one is set.
+
+    Everything else, flushes and INSERT/UPDATE/DELETE included, goes to the
+    primary, so a handler given a read session still writes correctly. A
+    SELECT the replica fails at the connection level marks it down and is
+    retried on the primary, as is the rest of the session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and isinstance(clause, (Select, CompoundSelect)):
+            return replica.engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def execute(self, statement, *args, **kw):
+        replica = self.info.get("replica")
+        try:
+            return super().execute(statement, *args, **kw)
+        except (DBAPIError, OSError) as e:
+            if replica is None or not isinstance(statement, (Select, CompoundSelect)) or not replica_unavailable(e):
+                raise
+            replica_router.mark_down(replica, e)
+            self.info["replica"] = None
+            return super().execute(statement, *args, **kw)
+
+
+ReadSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
+
+def read_from_primary(db: AsyncSession) -> bool:
+    """Send the session's remaining reads to the primary; True if it was
+    reading from a replica, i.e. a miss there is worth asking again"""
+    return db.sync_session.info.pop("replica", None) is not None
+
+
+class ReplicaRouter:
+    """Routes read-only handlers to the read replicas (DATABASE_REPLICA_URLS).
+
+    Every REPLICA_HEALTH_INTERVAL seconds each replica gets ``SELECT 1`` and,
+    on Postgres, a replay lag check against REPLICA_MAX_LAG_SECONDS. One
+    that fails a probe, or a query, is skipped until a probe passes again;
+    with none healthy, reads go to the primary. Read sessions take the
+    healthy replicas in turn.
+
+    Read-your-writes: after a write, handlers call ``mark_write`` with the
+    realtor ids and link tokens whose reads it changes, and for
+    REPLICA_STICKY_SECONDS reads for those keys go to the primary. Marks
+    are kept per worker and, with CACHE_REDIS_URL, in the shared tier, so
+    they hold whichever worker the next request lands on. Without
+    replicas, read sessions are plain primary sessions.
+    """
+
+    def __init__(self, engines):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.recent_writes = TTLCache(maxsize=settings.REPLICA_STICKY_CACHE_SIZE, ttl=settings.REPLICA_STICKY_SECONDS)
+        self.shared = create_shared_cache(settings.CACHE_REDIS_URL)
+        self._turn = itertools.count()
+        self._task = None
+        self.probes = 0
+        self.fallback_sessions = 0
+        self.sticky_sessions = 0
+        self.failovers = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def _key(self, key: str) -> str:
+        return f"recent-write:{key}"
+
+    async def mark_write(self, *keys):
+        """Read these keys from the primary for the next REPLICA_STICKY_SECONDS"""
+        if not self.enabled or not self.recent_writes.enabled:
+            return
+        for key in keys:
+            self.recent_writes.set(str(key), True)
+            if self.shared is not None:
+                await self.shared.set(self._key(str(key)), True, ttl=settings.REPLICA_STICKY_SECONDS)
+
+    async def wrote_recently(self, *keys) -> bool:
+        for key in keys:
+            if key is None:
+                continue
+            if self.recent_writes.get(str(key)) is not None:
+                return True
+            if self.shared is not None and await self.shared.get(self._key(str(key))) is not None:
+                return True
+        return False
+
+    def choose(self):
+        """The next healthy replica, or None for the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.fallback_sessions += 1
+            return None
+        replica = healthy[next(self._turn) % len(healthy)]
+        replica.sessions += 1
+        return replica
+
+    def mark_down(self, replica: Replica, error):
+        replica.down(str(error))
+        replica.failures += 1
+        self.failovers += 1
+
+    @asynccontextmanager
+    async def session(self, *keys):
+        """A read session: on a replica, unless one of ``keys`` (realtor
+        ids, link tokens; None is skipped) was written recently"""
+        replica = None
+        if self.enabled:
+            if await self.wrote_recently(*keys):
+                self.sticky_sessions += 1
+            else:
+                replica = self.choose()
+        async with ReadSessionLocal(info={"replica": replica}) as db:
+            yield db
+
+    async def probe(self):
+        """Check every replica now"""
+        await asyncio.gather(*(self._probe(replica) for replica in self.replicas))
+        self.probes += 1
+
+    async def _probe(self, replica: Replica):
+        try:
+            lag = await asyncio.wait_for(self._check(replica), timeout=max(settings.REPLICA_HEALTH_INTERVAL, 1.0))
+            lag = round(float(lag), 3) if lag is not None else None
+            replica.lag = lag
+            if lag is not None and 0 < settings.REPLICA_MAX_LAG_SECONDS < lag:
+                replica.down(f"{lag}s behind the primary")
+            else:
+                replica.healthy = True
+                replica.error = None
+        except Exception as e:
+            replica.down(str(e) or type(e).__name__)
+        replica.checked_at = datetime.utcnow().isoformat()
+
+    async def _check(self, replica: Replica):
+        async with replica.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            if connection.dialect.name == "postgresql":
+                return await connection.scalar(LAG_QUERY)
+        return None
+
+    def start(self):
+        if self.enabled and settings.REPLICA_HEALTH_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.probe()
+            except Exception as e:
+                print(f"❌ Replica probe failed: {e}")
+            await asyncio.sleep(max(settings.REPLICA_HEALTH_INTERVAL - (time.monotonic() - started), 0))
+
+    def healthy_count(self) -> int:
+        return sum(replica.healthy for replica in self.replicas)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "probes": self.probes,
+            "fallback_sessions": self.fallback_sessions,
+            "sticky_sessions": self.sticky_sessions,
+            "failovers": self.failovers,
+            "recent_writes": self.recent_writes.stats(),
+        }
+
+
+replica_router = ReplicaRouter(replica_engines)
@@ -0,0 +1,151 @@
+import re
+import unicodedata
+
+from sqlalchemy import select, insert, and_, or_, case, literal, literal_column, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Agreement, AgreementArchive, agreement_search
+
+# More terms than this are ignored; each one is another index lookup
+MAX_TERMS = 8
+
+# A query made only of these characters is a phone number
+PHONE_QUERY = re.compile(r"[\d\s().+-]+")
+
+# Words: runs of letters and digits
+TERM = re.compile(r"[^\W_]+")
+
+# Also indexed on their own: the local number and the line number
+PHONE_SUFFIXES = (7, 4)
+
+REBUILD_BATCH_SIZE = 5000
+
+SEARCH_COLUMNS = ("id", "user_id", "created_at", "client_name", "client_phone", "client_email", "meeting_type")
+
+
+def fold(text: str) -> str:
+    """Lowercase with accents stripped, so "José" is found by "jose" on either database"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize(text) -> str:
+    """The words of a field, folded and space-separated"""
+    return " ".join(TERM.findall(fold(text or "")))
+
+
+def digits(text) -> str:
+    return "".join(char for char in (text or "") if char.isdigit())
+
+
+def phone_terms(phone) -> str:
+    """The number's digits, then its last seven and last four, so a prefix
+    index finds it by the local number or the line number too"""
+    number = digits(phone)
+    suffixes = [number[-length:] for length in PHONE_SUFFIXES if len(number) > length]
+    return " ".join([number] + suffixes)
+
+
+def owner_key(user_id) -> str:
+    """The owner's id as the index stores it: without dashes, so FTS5 keeps
+    it one token instead of a five-word phrase to match on every search"""
+    return str(user_id).replace("-", "")
+
+
+def search_entry(agreement) -> dict:
+    """The agreement_search row for an agreement (ORM object, row or dict)"""
+    get = agreement.get if isinstance(agreement, dict) else lambda name: getattr(agreement, name)
+    return {
+        "agreement_id": str(get("id")),
+        "user_id": owner_key(get("user_id")),
+        "created_at": get("created_at"),
+        "client_name": normalize(get("client_name")),
+        "client_phone": phone_terms(get("client_phone")),
+        "client_email": normalize(get("client_email")),
+        "meeting_type": normalize(get("meeting_type")),
+    }
+
+
+async def index_agreements(db: AsyncSession, agreements):
+    """Add agreements to the search index, in the caller's transaction"""
+    entries = [search_entry(agreement) for agreement in agreements]
+    if entries:
+        await db.execute(insert(agreement_search), entries)
+
+
+def search_terms(query: str) -> list:
+    """The prefixes to look for: a phone number's digits as one term, otherwise its words"""
+    if PHONE_QUERY.fullmatch(query) and digits(query):
+        return [digits(query)]
+    return TERM.findall(fold(query))[:MAX_TERMS]
+
+
+def ranked_queries(dialect: str, user_id: str, terms: list, limit: int) -> list:
+    """Statements for agreement ids matching every term; their results,
+    concatenated without repeats, are the matches best first.
+
+    Results where the client's name, phone or email starts with the whole
+    query come first, then the rest; newest first within each. SQLite's FTS5
+    index matches terms at the start of a word, and each tier is its own
+    query in rowid order: entries are added as agreements are created (and
+    rebuilt oldest first), so that is creation order, and FTS5 stops after
+    ``limit`` matches instead of sorting all of them. Postgres' trigram
+    index also matches terms inside words ("mith" finds Smith), ranked
+    after word starts, in one query.
+    """
+    search = agreement_search.c
+    if dialect == "sqlite":
+        owner = f'user_id : "{owner_key(user_id)}"'
+        starts_with_query = f'{{client_name client_phone client_email}} : ^ "{" ".join(terms)}" *'
+        fields = "{client_name client_phone client_email meeting_type}"
+        every_term = " AND ".join(f'{fields} : "{term}" *' for term in terms)
+        return [
+            select(search.agreement_id)
+            .where(literal_column("agreement_search").op("MATCH")(f"{owner} AND {match}"))
+            .order_by(literal_column("rowid").desc())
+            .limit(limit)
+            for match in (starts_with_query, every_term)
+        ]
+    prefix = " ".join(terms) + "%"
+    starts_with_query = or_(
+        search.client_name.like(prefix),
+        search.client_phone.like(prefix),
+        search.client_email.like(prefix),
+    )
+    starts_a_word = and_(*((literal(" ") + search.document).like(f"% {term}%") for term in terms))
+    return [
+        select(search.agreement_id)
+        .where(search.user_id == owner_key(user_id), *(search.document.like(f"%{term}%") for term in terms))
+        .order_by(case((starts_with_query, 0), (starts_a_word, 1), else_=2), search.created_at.desc())
+        .limit(limit)
+    ]
+
+
+async def search_agreement_ids(db: AsyncSession, user_id: str, query: str, limit: int) -> list:
+    """Ids of the user's agreements (live or archived) matching ``query``, best first"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    ids = {}
+    for statement in ranked_queries(db.bind.dialect.name, user_id, terms, limit):
+        for agreement_id in (await db.execute(statement)).scalars():
+            ids.setdefault(agreement_id)
+        if len(ids) >= limit:
+            break
+    return list(ids)[:limit]
+
+
+def rebuild_search_index(connection, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Re-create every entry from agreements and agreements_archive on a
+    sync connection (migrations, scripts); returns the number indexed"""
+    connection.execute(agreement_search.delete())
+    # Oldest first, so entries are in creation order as if indexed on create
+    sources = union_all(*(
+        select(*(getattr(model, name) for name in SEARCH_COLUMNS)) for model in (Agreement, AgreementArchive)
+    )).order_by(literal_column("created_at"), literal_column("id"))
+    indexed = 0
+    result = connection.execution_options(yield_per=batch_size).execute(sources)
+    for rows in result.partitions():
+        connection.execute(insert(agreement_search), [search_entry(row) for row in rows])
+        indexed += len(rows)
+    return indexed
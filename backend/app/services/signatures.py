@@ -0,0 +1,146 @@
+"""Compact storage for agreement signatures.
+
+Signatures arrive as stroke point arrays (mobile clients) or canvas PNG
+data URLs (the web form), often hundreds of KB of JSON. They are stored
+in ``agreements.signature_blob``:
+
+- strokes: a format byte, then zlib-compressed little-endian data: uint32
+  stroke count, uint32 points per stroke, and int16 x/y deltas from the
+  previous point in tenths of a canvas unit
+- PNG: a format byte, then the PNG bytes (no base64, no JSON escaping)
+
+``signature_data`` keeps only a small summary (format, counts, consent,
+timestamp). The blob column is deferred, so loading an agreement never
+reads it; it is decoded when a PDF is rendered or the signature is viewed.
+"""
+import base64
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from operator import sub
+
+STROKES = 1
+PNG = 2
+
+# Coordinates are stored in tenths of a canvas unit, from 0 to MAX_COORDINATE,
+# which keeps every delta within int16. SignaturePayload rejects points
+# outside that; pack_strokes pins them to the edge for any other caller
+PRECISION = 10
+MAX_QUANTIZED = 32767
+MAX_COORDINATE = MAX_QUANTIZED / PRECISION
+
+PNG_DATA_URL_PREFIX = "data:image/png;base64,"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+class InvalidSignature(ValueError):
+    pass
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def pack_strokes(strokes) -> bytes:
+    """Blob for a list of strokes, each a list of (x, y) points"""
+    counts = [len(stroke) for stroke in strokes]
+    flat = [round(value * PRECISION) for stroke in strokes for point in stroke for value in point[:2]]
+    if flat and (min(flat) < 0 or max(flat) > MAX_QUANTIZED):
+        flat = [min(max(value, 0), MAX_QUANTIZED) for value in flat]
+    # First point against the origin, then each coordinate against the previous point's
+    deltas = array("h", flat[:2])
+    deltas.extend(map(sub, flat[2:], flat))
+    header = struct.pack(f"<I{len(counts)}I", len(counts), *counts)
+    return bytes([STROKES]) + zlib.compress(header + _little_endian(deltas).tobytes())
+
+
+def unpack_strokes(blob: bytes):
+    """The strokes in a STROKES blob, as lists of (x, y) floats"""
+    raw = zlib.decompress(blob[1:])
+    (count,) = struct.unpack_from("<I", raw)
+    counts = struct.unpack_from(f"<{count}I", raw, 4)
+    deltas = array("h")
+    deltas.frombytes(raw[4 + 4 * count:])
+    _little_endian(deltas)
+    points = [
+        (x / PRECISION, y / PRECISION)
+        for x, y in zip(accumulate(deltas[0::2]), accumulate(deltas[1::2]))
+    ]
+    strokes = []
+    start = 0
+    for n in counts:
+        strokes.append(points[start:start + n])
+        start += n
+    return strokes
+
+
+def png_from_data_url(data_url: str) -> bytes:
+    if not data_url.startswith(PNG_DATA_URL_PREFIX):
+        raise InvalidSignature("signature must be a data:image/png;base64 URL")
+    try:
+        png = base64.b64decode(data_url[len(PNG_DATA_URL_PREFIX):], validate=True)
+    except ValueError:
+        raise InvalidSignature("signature is not valid base64")
+    if not png.startswith(PNG_MAGIC):
+        raise InvalidSignature("signature is not a PNG image")
+    return png
+
+
+def png_header(png: bytes) -> tuple:
+    """(width, height, bit depth, colour type, interlace) from a PNG's IHDR,
+    which the format requires to be the first chunk"""
+    if len(png) < 33 or png[12:16] != b"IHDR":
+        raise InvalidSignature("signature PNG has no header")
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", png[16:29])
+    return width, height, bit_depth, color_type, interlace
+
+
+def pack_png(png: bytes) -> bytes:
+    return bytes([PNG]) + png
+
+
+def signature_format(blob: bytes) -> str:
+    return {STROKES: "strokes", PNG: "png"}.get(blob[0], "unknown") if blob else "none"
+
+
+def compact_signature(payload) -> tuple:
+    """(blob, summary) for a validated ``SignaturePayload``"""
+    summary = {
+        "timestamp": payload.timestamp,
+        "clientConsent": payload.client_consent,
+    }
+    if payload.strokes is not None:
+        blob = pack_strokes(payload.strokes)
+        summary.update(
+            format="strokes",
+            strokes=len(payload.strokes),
+            points=sum(len(stroke) for stroke in payload.strokes),
+            width=payload.width,
+            height=payload.height,
+        )
+    else:
+        # The schema already decoded it while validating
+        png = payload._png if payload._png is not None else png_from_data_url(payload.signature)
+        blob = pack_png(png)
+        summary["format"] = "png"
+    summary["bytes"] = len(blob)
+    return blob, {key: value for key, value in summary.items() if value is not None}
+
+
+def decode_signature(blob, summary) -> dict:
+    """The stored signature in the shape the client sent it (summary fields included)"""
+    if blob is None:
+        # Signed before compact storage: signature_data is the request body as sent
+        legacy = summary or {}
+        nested = legacy.get("signature_data")
+        return dict(nested if isinstance(nested, dict) else legacy)
+    decoded = {key: value for key, value in (summary or {}).items() if key != "bytes"}
+    if blob[0] == STROKES:
+        decoded["strokes"] = [[list(point) for point in stroke] for stroke in unpack_strokes(blob)]
+    elif blob[0] == PNG:
+        decoded["signature"] = PNG_DATA_URL_PREFIX + base64.b64encode(blob[1:]).decode()
+    return decoded
@@ -1,37 +1,65 @@
-from twilio.rest import Client
 from app.core.config import settings
 
-async def send_agreement_sms(phone_number: str, client_name: str, token: str, realtor_name: str):
-    """Send SMS notification for agreement"""
-    if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
-        print("⚠️ Twilio not configured, skipping SMS")
-        return {"success": False, "error": "Twilio not configured"}
-    
-    try:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        
-        # Create agreement URL
-        frontend_url = settings.FRONTEND_URL or "http://localhost:3000"
-        agreement_url = f"{frontend_url}?token={token}"
-        
-        message = f"Hi {client_name}, {realtor_name} has sent you a meeting agreement to review and sign. Please click this secure link to access it: {agreement_url} - HomeShow"
+def build_agreement_message(client_name: str, token: str, realtor_name: str) -> str:
+    # Create agreement URL
+    frontend_url = settings.FRONTEND_URL or "http://localhost:3000"
+    agreement_url = f"{frontend_url}?token={token}"
+
+    return f"Hi {client_name}, {realtor_name} has sent you a meeting agreement to review and sign. Please click this secure link to access it: {agreement_url} - HomeShow"
+
+class TwilioTransport:
+    """Sends through Twilio's REST API with one client and a pooled HTTP session.
+
+    ``send`` blocks on the HTTP round trip; the outbox worker calls it from
+    a thread pool. SMS_SEND_TIMEOUT bounds it, so a send finishes within the
+    claim's lease and no other worker re-claims the message meanwhile.
+    """
+
+    def __init__(self):
+        # Imported here so processes without Twilio configured don't pay for it at startup
+        from twilio.rest import Client
+        from twilio.http.http_client import TwilioHttpClient
         
-        # Send SMS
-        message_obj = client.messages.create(
-            body=message,
+        http_client = TwilioHttpClient(pool_connections=True, max_retries=0, timeout=settings.SMS_SEND_TIMEOUT)
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+
+    def send(self, to_phone: str, body: str) -> str:
+        message_obj = self.client.messages.create(
+            body=body,
             from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
+            to=to_phone
         )
-        
-        return {
-            "success": True,
-            "message_id": message_obj.sid,
-            "status": message_obj.status
-        }
-        
-    except Exception as e:
-        print(f"❌ SMS sending failed: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        } 
\ No newline at end of file
+        return message_obj.sid
+
+class FakeSmsTransport:
+    """Records messages instead of sending them (SMS_TRANSPORT=fake).
+
+    ``fail_next`` makes the next N sends raise, to exercise retry/backoff.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.fail_next = 0
+
+    def send(self, to_phone: str, body: str) -> str:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RuntimeError("fake transport failure")
+        self.sent.append({"to": to_phone, "body": body})
+        return f"FAKE{len(self.sent):06d}"
+
+def twilio_configured() -> bool:
+    return all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER])
+
+def sms_configured() -> bool:
+    """Whether agreements should queue SMS at all"""
+    return settings.SMS_TRANSPORT == "fake" or twilio_configured()
+
+def create_sms_transport():
+    """The configured transport, or None when SMS is not set up"""
+    if settings.SMS_TRANSPORT == "fake":
+        return FakeSmsTransport()
+    if not twilio_configured():
+        print("⚠️ Twilio not configured, skipping SMS")
+        return None
+    return TwilioTransport()
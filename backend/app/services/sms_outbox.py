@@ -0,0 +1,269 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import span
+from app.database import AsyncSessionLocal, SmsOutbox, AgreementEvent
+from app.services.sms import build_agreement_message, create_sms_transport, sms_configured
+from app.services.audit_log import audit_event
+
+
+def build_outbox_row(agreement, realtor_name: str) -> dict:
+    return {
+        "agreement_id": str(agreement.id),
+        "to_phone": agreement.client_phone,
+        "body": build_agreement_message(agreement.client_name, agreement.security_token, realtor_name),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": datetime.utcnow(),
+    }
+
+
+def enqueue_agreement_sms(db: AsyncSession, agreement, realtor_name: str) -> SmsOutbox:
+    """Add the agreement's SMS to the outbox; it is sent once the caller commits"""
+    message = SmsOutbox(**build_outbox_row(agreement, realtor_name))
+    db.add(message)
+    return message
+
+
+async def enqueue_agreement_sms_bulk(db: AsyncSession, agreements, realtor_name: str):
+    """Queue SMS for many agreements with one multi-row INSERT"""
+    rows = [build_outbox_row(agreement, realtor_name) for agreement in agreements]
+    if rows:
+        await db.execute(insert(SmsOutbox), rows)
+
+
+class SmsOutboxWorker:
+    """Drains sms_outbox in batches.
+
+    Each pass claims up to SMS_OUTBOX_BATCH_SIZE due rows by moving them to
+    ``sending`` with a lease, one compare-and-set UPDATE per row, so of
+    several workers that read the same due row only one sends it. The lease
+    covers the whole batch with every send timing out (SMS_SEND_TIMEOUT);
+    if a worker dies mid-send, the row becomes due again once it runs out.
+    Sends run on a small thread pool (the Twilio client blocks), spaced to
+    SMS_RATE_PER_SECOND. Failures retry
+    with exponential backoff until SMS_MAX_ATTEMPTS, then the row is marked
+    ``failed``. Sent and failed rows are deleted SMS_OUTBOX_RETENTION_HOURS
+    after their last attempt: the body carries the agreement's signing link.
+    """
+
+    # Shortest lease; also slack on top of the batch's worst-case send time
+    LEASE_SECONDS = 60
+    PURGE_INTERVAL = 3600
+    PURGE_BATCH_SIZE = 1000
+
+    def __init__(self, transport=None):
+        # Created by start() unless given: with preload_app the module is
+        # imported once in the master, and forked workers must not share
+        # its HTTP connection pool
+        self.transport = transport
+        self._executor = ThreadPoolExecutor(max_workers=settings.SMS_SEND_CONCURRENCY, thread_name_prefix="sms-send")
+        self._wakeup = None
+        self._task = None
+        self._next_send_at = 0.0
+        self._rate_lock = None
+        self.sent_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+        self.purged_count = 0
+        self._next_purge_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether messages are queued; a process need not run the sender itself"""
+        return self.transport is not None or sms_configured()
+
+    def start(self):
+        if self._task is not None:
+            return
+        if self.transport is None:
+            self.transport = create_sms_transport()
+            if self.transport is None:
+                return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        """Wake the worker after new rows are committed instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                print(f"❌ SMS outbox pass failed: {e}")
+                processed = 0
+            if processed >= settings.SMS_OUTBOX_BATCH_SIZE:
+                continue  # more work is probably waiting
+            if time.monotonic() >= self._next_purge_at:
+                self._next_purge_at = time.monotonic() + self.PURGE_INTERVAL
+                try:
+                    await self.purge()
+                except Exception as e:
+                    print(f"❌ SMS outbox purge failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.SMS_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def lease_seconds(self, count: int) -> float:
+        """How long ``count`` claimed messages may take: the rate limit's
+        spacing plus, per round of concurrent sends, a timed-out connect and read"""
+        rounds = math.ceil(count / max(settings.SMS_SEND_CONCURRENCY, 1))
+        worst_case = count / settings.SMS_RATE_PER_SECOND + rounds * 2 * settings.SMS_SEND_TIMEOUT
+        return max(self.LEASE_SECONDS, worst_case + self.LEASE_SECONDS)
+
+    async def _claim(self, db: AsyncSession):
+        now = datetime.utcnow()
+        query = (
+            select(SmsOutbox.id, SmsOutbox.status, SmsOutbox.next_attempt_at)
+            .where(
+                # "sending" rows whose lease ran out belong to a worker that died
+                SmsOutbox.status.in_(("pending", "sending")),
+                SmsOutbox.next_attempt_at <= now,
+            )
+            .order_by(SmsOutbox.next_attempt_at)
+            .limit(settings.SMS_OUTBOX_BATCH_SIZE)
+        )
+        if db.bind.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        candidates = (await db.execute(query)).all()
+        if not candidates:
+            return []
+        lease_until = now + timedelta(seconds=self.lease_seconds(len(candidates)))
+        claimed = []
+        for candidate in candidates:
+            # Compare-and-set on what was read: another worker that read the
+            # row too (SQLite has no SKIP LOCKED) finds it changed and skips it
+            result = await db.execute(
+                update(SmsOutbox)
+                .where(
+                    SmsOutbox.id == candidate.id,
+                    SmsOutbox.status == candidate.status,
+                    SmsOutbox.next_attempt_at == candidate.next_attempt_at,
+                )
+                .values(status="sending", next_attempt_at=lease_until)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(candidate.id)
+        await db.commit()
+        if not claimed:
+            return []
+        result = await db.execute(select(SmsOutbox).where(SmsOutbox.id.in_(claimed)))
+        return result.scalars().all()
+
+    async def _throttle(self):
+        if self._rate_lock is None:
+            self._rate_lock = asyncio.Lock()
+        async with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_send_at - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_send_at = max(now, self._next_send_at) + 1 / settings.SMS_RATE_PER_SECOND
+
+    async def _send(self, message: SmsOutbox):
+        await self._throttle()
+        loop = asyncio.get_running_loop()
+        try:
+            with span("sms_send"):
+                sid = await loop.run_in_executor(self._executor, self.transport.send, message.to_phone, message.body)
+        except Exception as e:
+            message.attempts += 1
+            message.last_error = str(e)[:1000]
+            if message.attempts >= settings.SMS_MAX_ATTEMPTS:
+                message.status = "failed"
+                self.failed_count += 1
+                print(f"❌ SMS {message.id} failed permanently: {e}")
+            else:
+                backoff = min(settings.SMS_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1), 3600)
+                message.status = "pending"
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+                self.retry_count += 1
+            return
+        message.attempts += 1
+        message.status = "sent"
+        message.provider_message_id = sid
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        self.sent_count += 1
+
+    async def process_batch(self) -> int:
+        """Claim and send one batch; returns how many messages were attempted"""
+        async with AsyncSessionLocal() as db:
+            messages = await self._claim(db)
+            if not messages:
+                return 0
+            await asyncio.gather(*(self._send(message) for message in messages))
+            # Final outcomes go on the agreements' timelines, in the same commit
+            events = [
+                audit_event(
+                    message.agreement_id,
+                    "sms_sent" if message.status == "sent" else "sms_failed",
+                    message.sent_at or datetime.utcnow(),
+                    attempts=message.attempts,
+                )
+                for message in messages
+                if message.agreement_id and message.status in ("sent", "failed")
+            ]
+            if events:
+                await db.execute(insert(AgreementEvent), events)
+            await db.commit()
+            return len(messages)
+
+    async def purge(self, now: datetime = None) -> int:
+        """Delete sent and failed messages past retention; returns how many"""
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.SMS_OUTBOX_RETENTION_HOURS)
+        # next_attempt_at is the last claim's lease, so about when the last
+        # attempt was made; (status, next_attempt_at) is indexed
+        expired = (
+            select(SmsOutbox.id)
+            .where(SmsOutbox.status.in_(("sent", "failed")), SmsOutbox.next_attempt_at < cutoff)
+            .limit(self.PURGE_BATCH_SIZE)
+        )
+        purged = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                ids = (await db.execute(expired)).scalars().all()
+                if not ids:
+                    break
+                await db.execute(delete(SmsOutbox).where(SmsOutbox.id.in_(ids)).execution_options(synchronize_session=False))
+                await db.commit()
+                purged += len(ids)
+                if len(ids) < self.PURGE_BATCH_SIZE:
+                    break
+        self.purged_count += purged
+        return purged
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sent": self.sent_count,
+            "retried": self.retry_count,
+            "failed": self.failed_count,
+            "purged": self.purged_count,
+        }
+
+
+sms_worker = SmsOutboxWorker()
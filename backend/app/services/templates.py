@@ -0,0 +1,125 @@
+import hashlib
+import json
+import re
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database import AgreementTemplate
+
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# Values shorter than this are left in the body: swapping out "Al" or "CA"
+# everywhere would only fragment the templates
+MIN_VARIABLE_LENGTH = 3
+
+
+def template_hash(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def render_template(body: str, variables: dict) -> str:
+    # One pass, so substituted values are never re-scanned for placeholders
+    return PLACEHOLDER.sub(lambda match: variables.get(match.group(1), match.group(0)), body)
+
+
+def extract_template(text: str, variables: dict):
+    """Split ``text`` into (template body, substitution map).
+
+    Each variable value found in the text is replaced by ``{{name}}``;
+    longer values go first so a name is not split by a shorter one. When the
+    text already contains placeholder syntax, or the result would not render
+    back to exactly ``text``, the text is kept verbatim as its own template.
+    """
+    if PLACEHOLDER.search(text):
+        return text, {}
+    body = text
+    used = {}
+    for name, value in sorted(variables.items(), key=lambda item: -len(item[1] or "")):
+        if not value or len(value) < MIN_VARIABLE_LENGTH or value not in body:
+            continue
+        body = body.replace(value, "{{" + name + "}}")
+        used[name] = value
+    if render_template(body, used) != text:
+        return text, {}
+    return body, used
+
+
+def agreement_variables(client_name: str, client_phone: str, client_email, realtor) -> dict:
+    """The per-agreement values that are lifted out of the agreement text"""
+    return {
+        "client_name": client_name,
+        "client_phone": client_phone,
+        "client_email": client_email,
+        "realtor_name": f"{realtor.first_name} {realtor.last_name}",
+        "realtor_phone": realtor.phone,
+        "realtor_company": realtor.company_name,
+    }
+
+
+class TemplateStore:
+    """Content-addressed agreement bodies.
+
+    Each distinct template body is stored once in agreement_templates, keyed
+    by its SHA-256. Bodies never change once written, so ``bodies`` caches
+    them without invalidation; ``rendered`` memoizes the rendered text per
+    (template, substitution map), which is what the public endpoint needs.
+    """
+
+    def __init__(self):
+        self.bodies = TTLCache(maxsize=settings.TEMPLATE_CACHE_SIZE, ttl=86400)
+        self.rendered = TTLCache(maxsize=settings.TEMPLATE_RENDER_CACHE_SIZE, ttl=86400)
+
+    async def intern_many(self, db: AsyncSession, bodies) -> list:
+        """Store any bodies not stored yet (in the caller's transaction) and return their hashes"""
+        hashes = [template_hash(body) for body in bodies]
+        missing = {h: body for h, body in zip(hashes, bodies) if self.bodies.get(h) is None}
+        if missing:
+            result = await db.execute(
+                select(AgreementTemplate.hash).where(AgreementTemplate.hash.in_(list(missing)))
+            )
+            for h in result.scalars():
+                self.bodies.set(h, missing.pop(h))
+        if missing:
+            insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+            # A concurrent request may be storing the same body
+            await db.execute(
+                insert(AgreementTemplate).on_conflict_do_nothing(index_elements=["hash"]),
+                [{"hash": h, "body": body} for h, body in missing.items()],
+            )
+            # Not cached yet: the caller's transaction could still roll back.
+            # The next intern or get_body finds the committed row and caches it
+        return hashes
+
+    async def intern(self, db: AsyncSession, body: str) -> str:
+        return (await self.intern_many(db, [body]))[0]
+
+    async def get_body(self, db: AsyncSession, hash: str) -> str:
+        body = self.bodies.get(hash)
+        if body is None:
+            result = await db.execute(select(AgreementTemplate.body).where(AgreementTemplate.hash == hash))
+            body = result.scalar_one()
+            self.bodies.set(hash, body)
+        return body
+
+    async def render_agreement_text(self, db: AsyncSession, agreement) -> str:
+        """The agreement's full text, rendered from its template on first use"""
+        if agreement.template_hash is None:
+            return agreement.agreement_text
+        variables = agreement.template_vars or {}
+        key = (agreement.template_hash, json.dumps(variables, sort_keys=True))
+        text = self.rendered.get(key)
+        if text is None:
+            text = render_template(await self.get_body(db, agreement.template_hash), variables)
+            self.rendered.set(key, text)
+        return text
+
+    def stats(self) -> dict:
+        return {"bodies": self.bodies.stats(), "rendered": self.rendered.stats()}
+
+
+template_store = TemplateStore()
@@ -0,0 +1,130 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database import AsyncSessionLocal, AgreementEvent
+
+
+class ViewEventBuffer:
+    """Coalesces repeat /view calls into periodic bulk agreement_events inserts.
+
+    The first view of an agreement is written by the handler straight away,
+    because it changes viewed_at and status. Every later view only adds an
+    audit event, so it is buffered here and flushed every
+    VIEW_FLUSH_INTERVAL seconds as one multi-row INSERT, however many views
+    arrived. ``viewed`` remembers token -> (agreement id, expiry) for
+    agreements already viewed, so repeat views skip the lookup as well.
+    While the database is unreachable views keep buffering, up to
+    VIEW_BUFFER_MAX_PENDING; past that the oldest are dropped and counted.
+    """
+
+    def __init__(self):
+        # Expiry is checked on every lookup; the TTL only bounds memory
+        self.viewed = TTLCache(maxsize=settings.VIEW_BUFFER_TOKEN_CACHE_SIZE, ttl=3600)
+        self._pending = deque()
+        self._task = None
+        self._lock = None
+        self.buffered_count = 0
+        self.flushed_count = 0
+        self.flush_count = 0
+        self.dropped_count = 0
+
+    def remember(self, token: str, agreement_id: str, expires_at: datetime):
+        self.viewed.set(token, (agreement_id, expires_at))
+
+    def lookup(self, token: str):
+        """Agreement id for a token that was already viewed and has not expired"""
+        entry = self.viewed.get(token)
+        if entry is None:
+            return None
+        agreement_id, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            self.viewed.invalidate(token)
+            return None
+        return agreement_id
+
+    def forget(self, token: str):
+        self.viewed.invalidate(token)
+
+    def record(self, agreement_id: str, client_ip: str, user_agent: str):
+        # Same row as audit_log.audit_event(agreement_id, "view", ...)
+        self._pending.append({
+            "agreement_id": str(agreement_id),
+            "event": "view",
+            "at": datetime.utcnow(),
+            "client_ip": client_ip,
+            "user_agent": user_agent,
+            "data": None,
+        })
+        self.buffered_count += 1
+        self._trim()
+
+    def _trim(self):
+        while len(self._pending) > settings.VIEW_BUFFER_MAX_PENDING:
+            self._pending.popleft()
+            self.dropped_count += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Insert all buffered views into agreement_events in one transaction"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = list(self._pending), deque()
+            try:
+                async with AsyncSessionLocal() as db:
+                    # Append-only: no read of the agreement rows, nothing to lock
+                    await db.execute(insert(AgreementEvent), pending)
+                    await db.commit()
+            except Exception:
+                # Put the events back, ahead of newer ones, so the next flush retries them
+                self._pending.extendleft(reversed(pending))
+                self._trim()
+                raise
+            flushed = len(pending)
+            self.flushed_count += flushed
+            self.flush_count += 1
+            return flushed
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.VIEW_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ View buffer flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "buffered": self.buffered_count,
+            "flushed": self.flushed_count,
+            "flushes": self.flush_count,
+            "dropped": self.dropped_count,
+        }
+
+
+view_buffer = ViewEventBuffer()
@@ -0,0 +1,97 @@
+"""Authenticated requests per second with and without the principal cache
+
+Drives GET /api/auth/profile in-process in three modes: every request
+loads the user row (cache disabled), the TTL/LRU principal cache, and
+signed profile claims in the JWT.
+
+    python -m benchmarks.bench_auth_cache --requests 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+import httpx
+
+from app.core.config import settings
+from app.database import engine, Base, SessionLocal, User
+from app.routers import auth
+from main import app
+
+
+def seed() -> User:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(
+        email="bench@example.com",
+        password_hash="x",
+        first_name="Bench",
+        last_name="Realtor",
+        phone="5550000000",
+        state="CA",
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)
+    db.close()
+    return user
+
+
+async def run(token: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        counter = iter(range(total))
+
+        async def worker():
+            for _ in counter:
+                response = await client.get("/api/auth/profile")
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    user = seed()
+    ttl = auth.principal_cache.ttl
+
+    async def compare():
+        results = {}
+
+        settings.JWT_PROFILE_CLAIMS = False
+        token = auth.create_access_token(data=auth.build_token_claims(user))
+
+        auth.principal_cache.ttl = 0
+        results["no cache"] = await run(token, args.requests, args.concurrency)
+
+        auth.principal_cache.ttl = ttl
+        auth.principal_cache.clear()
+        results["principal cache"] = await run(token, args.requests, args.concurrency)
+
+        settings.JWT_PROFILE_CLAIMS = True
+        token = auth.create_access_token(data=auth.build_token_claims(user))
+        results["profile claims"] = await run(token, args.requests, args.concurrency)
+        return results
+
+    for mode, rps in asyncio.run(compare()).items():
+        print(f"{mode:16s} {rps:8.1f} req/s")
+    print(f"cache stats: {auth.principal_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""One bulk create vs N single creates
+
+Creates N agreements through POST /api/agreements/ one at a time, then the
+same N through a single POST /api/agreements/bulk, and reports wall time,
+SQL statements and commits for each. SMS goes to the fake transport so
+outbox rows are written but nothing leaves the process.
+
+    python -m benchmarks.bench_bulk_create --items 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["SMS_TRANSPORT"] = "fake"
+
+import httpx
+from sqlalchemy import event
+
+from app.database import engine, async_engine, Base
+from main import app
+
+counters = {"statements": 0, "commits": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters["statements"] += 1
+
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def count_commit(conn):
+    counters["commits"] += 1
+
+
+def agreement_item(i: int) -> dict:
+    return {
+        "client_name": f"Client {i}",
+        "client_phone": f"555{i:07d}",
+        "client_email": f"client{i}@example.com",
+        "meeting_type": "showing",
+        "state": "CA",
+        "agreement_text": "Lorem ipsum dolor sit amet. " * 40,
+    }
+
+
+async def measure(label: str, work):
+    counters["statements"] = counters["commits"] = 0
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    return {
+        "run": label,
+        "seconds": round(elapsed, 3),
+        "statements": counters["statements"],
+        "commits": counters["commits"],
+    }
+
+
+async def compare(items: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/auth/register", json={
+            "email": "bench@example.com", "password": "bench-password",
+            "first_name": "Bench", "last_name": "Realtor", "phone": "5550000000", "state": "CA",
+        })
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def singles():
+            for i in range(items):
+                response = await client.post("/api/agreements/", headers=headers, json=agreement_item(i))
+                assert response.status_code == 200, response.text
+
+        async def bulk():
+            response = await client.post(
+                "/api/agreements/bulk", headers=headers,
+                json={"items": [agreement_item(i) for i in range(items)]}
+            )
+            assert response.status_code == 200, response.text
+            assert response.json()["created"] == items
+
+        return await measure(f"{items} single creates", singles), await measure("1 bulk create", bulk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    for result in asyncio.run(compare(args.items)):
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
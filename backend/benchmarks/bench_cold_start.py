@@ -0,0 +1,90 @@
+"""Time from process launch to the first successful request
+
+Launches the server as a subprocess, polls GET / until it answers, and
+reports the median over several runs for:
+
+- uvicorn, one process, schema created at import (the development setup)
+- gunicorn with preloaded uvicorn workers and AUTO_CREATE_SCHEMA off
+  (the production setup; the schema is migrated beforehand)
+
+    python -m benchmarks.bench_cold_start --runs 5 --workers 2
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(command, env, port: int, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{command[0]} exited with {process.returncode}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='homeshow-bench-'), 'bench.db')}"
+    base_env = {**os.environ, "DATABASE_URL": database_url, "ARCHIVE_SWEEP_INTERVAL": "0"}
+    # Migrate once up front, as a production deploy would
+    subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=base_env, check=True, capture_output=True)
+
+    def modes(port):
+        return {
+            "uvicorn, 1 process, create_all at import": (
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                {"NODE_ENV": "development"},
+            ),
+            f"gunicorn, {args.workers} preloaded workers": (
+                ["gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                {"NODE_ENV": "production", "PORT": str(port), "WEB_CONCURRENCY": str(args.workers)},
+            ),
+        }
+
+    for name in modes(0):
+        timings = []
+        for _ in range(args.runs):
+            port = free_port()
+            command, env = modes(port)[name]
+            timings.append(time_to_first_request(command, {**base_env, **env}, port))
+        print(f"{name}: median {statistics.median(timings):.3f}s (min {min(timings):.3f}s, max {max(timings):.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
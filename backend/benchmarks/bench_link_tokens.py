@@ -0,0 +1,155 @@
+"""Cost of serving and rejecting agreement links, signed vs opaque
+
+First times ``link_tokens.verify`` on its own for valid, forged and
+malformed tokens. Then sends GET /api/agreements/public/{token} for four
+kinds of link and counts the database statements each one costs:
+
+* valid signed and valid opaque links, each one new so the public cache
+  doesn't answer (lookup by primary key vs by the token index)
+* guessed links, each one new as a scanner's would be: opaque guesses go
+  to the database before the unknown-token cache can remember them, while
+  forged signed ones are refused before any lookup
+
+    python -m benchmarks.bench_link_tokens --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+# Measure the handler, not the limiter
+os.environ["RATE_LIMIT_IP_PER_MINUTE"] = "0"
+os.environ["RATE_LIMIT_TOKEN_PER_MINUTE"] = "0"
+
+import httpx
+from sqlalchemy import event, insert
+
+from app.core.link_tokens import link_tokens, LinkTokenSigner, InvalidLinkToken
+from app.database import engine, async_engine, Base, Agreement
+from main import app
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def seed(count: int):
+    """``count`` agreements with signed links and ``count`` with opaque ones"""
+    Base.metadata.create_all(bind=engine)
+    expires_at = datetime.utcnow() + timedelta(hours=48)
+    signed, opaque, rows = [], [], []
+    for kind, tokens in (("signed", signed), ("opaque", opaque)):
+        for i in range(count):
+            agreement_id = str(uuid.uuid4())
+            token = link_tokens.issue(agreement_id, expires_at) if kind == "signed" else secrets.token_urlsafe(32)
+            tokens.append(token)
+            rows.append({
+                "id": agreement_id,
+                "user_id": "bench-user",
+                "client_name": f"Client {i}",
+                "client_phone": "5551234567",
+                "meeting_type": "showing",
+                "state": "CA",
+                "agreement_text": "Lorem ipsum dolor sit amet. " * 200,
+                "status": "draft",
+                "security_token": token,
+                "expires_at": expires_at,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
+            })
+    with engine.begin() as conn:
+        conn.execute(insert(Agreement), rows)
+    return signed, opaque
+
+
+def time_verify(number: int):
+    """Microseconds per ``verify`` call for each kind of token"""
+    expires_at = datetime.utcnow() + timedelta(hours=48)
+    valid = link_tokens.issue(str(uuid.uuid4()), expires_at)
+    forged = LinkTokenSigner("not-the-secret").issue(str(uuid.uuid4()), expires_at)
+    malformed = valid[:-4] + "."
+
+    def rejecting(token):
+        def call():
+            try:
+                link_tokens.verify(token)
+            except InvalidLinkToken:
+                pass
+        return call
+
+    results = {}
+    for name, call in (
+        ("valid", lambda: link_tokens.verify(valid)),
+        ("forged", rejecting(forged)),
+        ("malformed", rejecting(malformed)),
+    ):
+        results[name] = round(timeit.timeit(call, number=number) / number * 1e6, 2)
+    return results
+
+
+async def run(tokens, expected: int, concurrency: int):
+    global statements
+    statements = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(tokens)
+
+        async def worker():
+            for token in queue:
+                response = await client.get(f"/api/agreements/public/{token}")
+                assert response.status_code == expected, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(tokens),
+        "rps": round(len(tokens) / elapsed, 1),
+        "statements_per_request": round(statements / len(tokens), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--verify-calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"verify (µs/call): {time_verify(args.verify_calls)}")
+
+    signed, opaque = seed(args.requests)
+    expires_at = datetime.utcnow() + timedelta(hours=48)
+    forger = LinkTokenSigner(secrets.token_urlsafe(32))
+    forged = [forger.issue(str(uuid.uuid4()), expires_at) for _ in range(args.requests)]
+    guessed = [secrets.token_urlsafe(32) for _ in range(args.requests)]
+
+    async def compare():
+        return [
+            ("valid opaque   ", await run(opaque, 200, args.concurrency)),
+            ("valid signed   ", await run(signed, 200, args.concurrency)),
+            ("guessed opaque ", await run(guessed, 404, args.concurrency)),
+            ("forged signed  ", await run(forged, 404, args.concurrency)),
+        ]
+
+    for name, result in asyncio.run(compare()):
+        print(f"{name}: {result}")
+
+
+if __name__ == "__main__":
+    main()
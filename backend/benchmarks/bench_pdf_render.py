@@ -0,0 +1,101 @@
+"""PDFs per second for signed-agreement rendering
+
+Renders synthetic signed agreements (about two pages of text, a canvas-style
+signature PNG and an audit trail) and reports throughput for rendering
+alone and for rendering plus writing to a temporary PDF store.
+
+    python -m benchmarks.bench_pdf_render --count 200 --signature rgba
+"""
+import argparse
+import base64
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pdf import render_agreement_pdf
+from app.services.pdf_store import PdfStore
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def signature_png(width: int, height: int, alpha: bool) -> bytes:
+    """A pen stroke across a transparent (or white) canvas, as a signature pad would export"""
+    channels = 4 if alpha else 3
+    background = b"\x00\x00\x00\x00" if alpha else b"\xff\xff\xff"
+    ink = b"\x10\x10\x60\xff" if alpha else b"\x10\x10\x60"
+    rows = []
+    previous = bytes(width * channels)
+    for y in range(height):
+        row = bytearray(background * width)
+        for x in range(width):
+            if abs(y - (height / 2 + (height / 3) * ((x % 97) / 97 - 0.5))) < 2:
+                row[x * channels:(x + 1) * channels] = ink
+        # "Up" filter on every row, so decoding exercises the unfilter path like a browser-encoded PNG
+        rows.append(b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, previous)))
+        previous = bytes(row)
+    header = struct.pack(">IIBBBBB", width, height, 8, 6 if alpha else 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header) + png_chunk(b"IDAT", zlib.compress(b"".join(rows))) + png_chunk(b"IEND", b"")
+
+
+def sample_agreement(i: int, signature) -> dict:
+    return {
+        "id": f"00000000-0000-0000-0000-{i:012d}",
+        "client_name": f"Client {i}",
+        "client_phone": "5551234567",
+        "client_email": f"client{i}@example.com",
+        "meeting_type": "showing",
+        "state": "CA",
+        "agreement_text": ("BUYER CONSULTATION AGREEMENT\n\n" + "The client agrees to the terms of this showing. " * 12 + "\n\n") * 12,
+        "signature_data": signature,
+        "audit_trail": [
+            {"event": "view", "at": "2026-10-17T10:00:00", "client_ip": "203.0.113.7", "user_agent": "Mozilla/5.0 (iPhone)"}
+        ] * 6,
+        "signed_at": datetime(2026, 10, 17, 12, 0, i % 60),
+        "client_ip": "203.0.113.7",
+        "user_agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)",
+        "created_at": datetime(2026, 10, 17, 9, 0),
+    }
+
+
+def run(label: str, count: int, work):
+    started = time.perf_counter()
+    total_bytes = 0
+    for i in range(count):
+        total_bytes += work(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {count / elapsed:.1f} PDFs/s ({elapsed / count * 1000:.2f} ms each, {total_bytes // count} bytes avg)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--signature", choices=["rgba", "rgb", "none"], default="rgba")
+    args = parser.parse_args()
+
+    signature = None
+    if args.signature != "none":
+        png = signature_png(600, 200, alpha=args.signature == "rgba")
+        signature = {"signature_data": "data:image/png;base64," + base64.b64encode(png).decode()}
+    agreements = [sample_agreement(i, signature) for i in range(args.count)]
+    store = PdfStore(tempfile.mkdtemp(prefix="homeshow-pdfs-"))
+
+    run("render", args.count, lambda i: len(render_agreement_pdf(agreements[i])))
+
+    def render_and_store(i):
+        data = render_agreement_pdf(agreements[i])
+        store.put(data)
+        return len(data)
+
+    run("render + store", args.count, render_and_store)
+
+
+if __name__ == "__main__":
+    main()
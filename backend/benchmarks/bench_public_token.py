@@ -0,0 +1,197 @@
+"""Load benchmark for GET /api/agreements/public/{token}
+
+Compares the async session path used by the routers against the old
+pattern (a blocking sync Session inside an ``async def`` handler) under
+concurrent traffic, and prints p50/p99 latency for both. The app is served
+by uvicorn in a child process so that a blocked event loop shows up in the
+client's measurements the way it would in production.
+
+    python -m benchmarks.bench_public_token --requests 2000 --concurrency 50 --db-latency-ms 2
+
+``--db-latency-ms`` adds a fixed delay to every statement to stand in for
+the network round trip to Postgres; without it SQLite answers too quickly
+for event-loop blocking to show up.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import multiprocessing
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+# The benchmark is one client hammering a handful of tokens; measure the handler, not the limiter
+os.environ["RATE_LIMIT_IP_PER_MINUTE"] = "0"
+os.environ["RATE_LIMIT_TOKEN_PER_MINUTE"] = "0"
+
+import httpx
+import uvicorn
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import engine, async_engine, Base, SessionLocal, User, Agreement
+from main import app
+
+
+def seed(agreement_count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(
+        email="bench@example.com",
+        password_hash="x",
+        first_name="Bench",
+        last_name="Realtor",
+        phone="5550000000",
+        state="CA",
+    )
+    db.add(user)
+    db.flush()
+    tokens = []
+    expires_at = datetime.utcnow() + timedelta(hours=48)
+    for i in range(agreement_count):
+        token = f"bench-token-{i}"
+        tokens.append(token)
+        db.add(Agreement(
+            user_id=user.id,
+            client_name=f"Client {i}",
+            client_phone="5551234567",
+            meeting_type="showing",
+            state="CA",
+            agreement_text="Lorem ipsum dolor sit amet. " * 200,
+            security_token=token,
+            expires_at=expires_at,
+        ))
+    db.commit()
+    db.close()
+    return tokens
+
+
+def add_db_latency(latency_ms: float):
+    """Delay every statement on the thread that executes it (the event loop
+    for the sync engine, aiosqlite's worker thread for the async engine)"""
+    def _delay(statement):
+        time.sleep(latency_ms / 1000)
+
+    def _on_connect(dbapi_connection, connection_record):
+        raw = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+        raw = getattr(raw, "_conn", raw)
+        raw.set_trace_callback(_delay)
+
+    event.listen(engine, "connect", _on_connect)
+    event.listen(async_engine.sync_engine, "connect", _on_connect)
+    engine.dispose()
+
+
+# The pre-async handler, kept here only as the "before" baseline. The session
+# is closed inline: with the old sync ``get_db`` generator the teardown runs
+# on the threadpool while the handler blocks the loop, so at this concurrency
+# the pool deadlocks until its checkout timeout instead of finishing.
+@app.get("/bench/sync-public/{token}")
+async def sync_public(token: str):
+    db: Session = SessionLocal()
+    try:
+        agreement = db.query(Agreement).filter(
+            Agreement.security_token == token,
+            Agreement.expires_at > datetime.utcnow()
+        ).first()
+    finally:
+        db.close()
+    if not agreement:
+        raise HTTPException(status_code=404, detail="Agreement not found or expired")
+    return {
+        "id": str(agreement.id),
+        "client_name": agreement.client_name,
+        "meeting_type": agreement.meeting_type,
+        "state": agreement.state,
+        "agreement_text": agreement.agreement_text,
+        "status": agreement.status,
+        "expires_at": agreement.expires_at,
+    }
+
+
+def serve(port: int, latency_ms: float):
+    if latency_ms:
+        add_db_latency(latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+
+
+def start_server(latency_ms: float):
+    """Serve the app from a child process so the client does not share its GIL or event loop"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.get_context("fork").Process(target=serve, args=(port, latency_ms), daemon=True)
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.get(f"{base_url}/api/test")
+            break
+        except httpx.TransportError:
+            time.sleep(0.05)
+    return process, base_url
+
+
+async def run(base_url: str, path_template: str, tokens, total: int, concurrency: int):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        counter = iter(range(total))
+
+        async def worker():
+            for i in counter:
+                token = tokens[i % len(tokens)]
+                start = time.perf_counter()
+                response = await client.get(path_template.format(token=token))
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--agreements", type=int, default=500)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    tokens = seed(args.agreements)
+    process, base_url = start_server(args.db_latency_ms)
+
+    async def compare():
+        before = await run(base_url, "/bench/sync-public/{token}", tokens, args.requests, args.concurrency)
+        after = await run(base_url, "/api/agreements/public/{token}", tokens, args.requests, args.concurrency)
+        return before, after
+
+    try:
+        before, after = asyncio.run(compare())
+    finally:
+        process.terminate()
+        process.join()
+
+    print(f"sync session  (before): {before}")
+    print(f"async session (after):  {after}")
+
+
+if __name__ == "__main__":
+    main()
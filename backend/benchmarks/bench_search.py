@@ -0,0 +1,161 @@
+"""Client search for a realtor with 100k agreements
+
+Seeds one realtor with ``--agreements`` rows (plus ``--other`` rows spread
+over other realtors, so the index is shared as in production), then times
+GET /api/agreements/search for a few typical queries against the only
+option before it: downloading GET /api/agreements/user and filtering the
+list on the client.
+
+    python -m benchmarks.bench_search --agreements 100000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import engine, Base, SessionLocal, User, Agreement
+from app.routers.auth import create_access_token, build_token_claims
+from app.services.search import rebuild_search_index
+from benchmarks.loadtest.seed import FIRST_NAMES, LAST_NAMES, MEETING_TYPES
+from main import app
+
+BATCH_SIZE = 5000
+
+
+def agreement_rows(rng: random.Random, user_id: str, count: int, now: datetime):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+        yield {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "client_name": f"{first} {last}",
+            "client_phone": f"({rng.randrange(200, 999)}) {rng.randrange(200, 999)}-{rng.randrange(10 ** 4):04d}",
+            "client_email": f"{first.lower()}.{last.lower()}{rng.randrange(1000)}@example.com" if rng.random() < 0.6 else None,
+            "meeting_type": rng.choice(MEETING_TYPES),
+            "state": "CA",
+            "agreement_text": "Lorem ipsum dolor sit amet.",
+            "status": "signed",
+            "security_token": uuid.uuid4().hex,
+            "expires_at": created_at + timedelta(hours=48),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def seed(count: int, other: int):
+    """One busy realtor and a crowd of others; returns the busy one's token and a sample row"""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    users = [
+        User(email=f"realtor{i}@example.com", password_hash="x", first_name="Bench", last_name=str(i), phone="5550000000", state="CA")
+        for i in range(1 + max(other // 1000, 1))
+    ]
+    db.add_all(users)
+    db.commit()
+    token = create_access_token(build_token_claims(users[0]))
+    busy, others = users[0].id, [user.id for user in users[1:]]
+    db.close()
+
+    started = time.perf_counter()
+    sample = None
+    with engine.begin() as conn:
+        for owner, rows in [(busy, count)] + [(user, other // len(others)) for user in others]:
+            batch = []
+            for row in agreement_rows(rng, owner, rows, now):
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    conn.execute(insert(Agreement), batch)
+                    batch = []
+                if sample is None and row["client_email"]:
+                    sample = row
+            if batch:
+                conn.execute(insert(Agreement), batch)
+        # Oldest first, as the create endpoints would have indexed them
+        rebuild_search_index(conn)
+    elapsed = time.perf_counter() - started
+    print(f"seeded and indexed {count + other} agreements in {elapsed:.1f}s ({(count + other) / elapsed:.0f} rows/s)")
+    return token, sample
+
+
+def client_side_filter(agreements, query: str):
+    # What the app had to do before: every agreement, filtered in memory
+    query = query.lower()
+    return [
+        agreement for agreement in agreements
+        if query in agreement["client_name"].lower() or query in agreement["client_phone"] or query in agreement["meeting_type"]
+    ]
+
+
+async def run(token: str, queries: dict, repeat: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, query in queries.items():
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get("/api/agreements/search", params={"q": query, "limit": 20}, headers=headers)
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+            latencies = sorted(samples)
+            results[name] = {
+                "query": query,
+                "hits": len(response.json()),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 2),
+            }
+
+        # The whole list once per search, as the client used to fetch it
+        samples = []
+        for _ in range(max(repeat // 10, 2)):
+            started = time.perf_counter()
+            response = await client.get("/api/agreements/user", headers=headers)
+            client_side_filter(response.json(), "smith")
+            samples.append((time.perf_counter() - started) * 1000)
+        results["download all + filter"] = {"query": "smith", "rows": len(response.json()), "p50_ms": round(statistics.median(samples), 2)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agreements", type=int, default=100_000)
+    parser.add_argument("--other", type=int, default=100_000, help="agreements of other realtors")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    token, sample = seed(args.agreements, args.other)
+    first, last = sample["client_name"].split()
+    phone = "".join(char for char in sample["client_phone"] if char.isdigit())
+    queries = {
+        "last name": last,
+        "first name prefix": first[:3],
+        "first + last prefix": f"{first} {last[:3]}",
+        "full phone": sample["client_phone"],
+        "last 4 digits": phone[-4:],
+        "email": sample["client_email"].split("@")[0],
+        "meeting type": "open house",
+    }
+    for name, result in asyncio.run(run(token, queries, args.repeat)).items():
+        print(f"{name:<22} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Serialization cost of GET /api/agreements/user for a large list
+
+Seeds one realtor with ``--agreements`` rows, then times turning the rows
+into the response body three ways:
+
+* before: a dict per row, validated against ``List[AgreementResponse]``
+  and dumped by FastAPI, as the handler used to return them
+* validated: the rows validated with ``from_attributes`` and dumped by
+  pydantic (TRUSTED_RESPONSES=false)
+* trusted: the rows encoded with orjson, no validation (the default)
+
+and then the whole request, in-process, for the old handler (kept below
+as a bench-only route) and the current one with TRUSTED_RESPONSES off and
+on. All the bodies are checked to be byte-identical.
+
+    python -m benchmarks.bench_serialization --agreements 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from typing import List
+
+import httpx
+from fastapi import Depends
+from fastapi.routing import serialize_response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import engine, Base, SessionLocal, User, Agreement, get_async_db
+from app.routers.agreements import AGREEMENT_LIST_COLUMNS, agreement_list_json, agreement_list_query, router
+from app.routers.auth import create_access_token, build_token_claims, get_current_user
+from app.schemas.agreements import AgreementResponse
+from main import app
+
+
+def seed(count: int) -> str:
+    """One realtor with ``count`` agreements; returns their bearer token"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(
+        email="bench@example.com",
+        password_hash="x",
+        first_name="Bench",
+        last_name="Realtor",
+        phone="5550000000",
+        state="CA",
+    )
+    db.add(user)
+    db.commit()
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        created_at = now - timedelta(minutes=i)
+        signed = i % 3 == 0
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user.id,
+            "client_name": f"Client {i}",
+            "client_phone": "5551234567",
+            "meeting_type": "showing",
+            "state": "CA",
+            "agreement_text": "Lorem ipsum dolor sit amet.",
+            "status": "signed" if signed else "draft",
+            "security_token": uuid.uuid4().hex,
+            "expires_at": created_at + timedelta(hours=48),
+            "signed_at": created_at + timedelta(minutes=5) if signed else None,
+            "pdf_url": f"/api/agreements/{uuid.uuid4()}/pdf?v={uuid.uuid4().hex * 2}" if signed else None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    with engine.begin() as conn:
+        conn.execute(insert(Agreement), rows)
+    token = create_access_token(build_token_claims(user))
+    db.close()
+    return token
+
+
+def legacy_dicts(agreements):
+    # The pre-change handler body, kept here only as the "before" baseline
+    return [
+        {
+            "id": str(agreement.id),
+            "client_name": agreement.client_name,
+            "client_phone": agreement.client_phone,
+            "meeting_type": agreement.meeting_type,
+            "state": agreement.state,
+            "status": agreement.status,
+            "created_at": agreement.created_at,
+            "expires_at": agreement.expires_at,
+            "signed_at": agreement.signed_at,
+            "pdf_url": agreement.pdf_url
+        }
+        for agreement in agreements
+    ]
+
+
+@app.get("/bench/legacy-user-agreements", response_model=List[AgreementResponse])
+async def legacy_user_agreements(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(agreement_list_query(Agreement, current_user.id, None, None, None, None, None))
+    return legacy_dicts(result.all())
+
+
+def timed(repeat: int, call):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+async def serialization(rows, repeat: int):
+    field = next(route for route in router.routes if route.path == "/user").response_field
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        before = await serialize_response(field=field, response_content=legacy_dicts(rows), dump_json=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    results = {"before": (round(statistics.median(samples), 2), before)}
+    for name, trusted in (("validated", False), ("trusted", True)):
+        settings.TRUSTED_RESPONSES = trusted
+        results[name] = timed(repeat, lambda: agreement_list_json.response(rows).body)
+    return results
+
+
+async def requests(token: str, repeat: int):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path, trusted in (
+            ("before", "/bench/legacy-user-agreements", True),
+            ("validated", "/api/agreements/user", False),
+            ("trusted", "/api/agreements/user", True),
+        ):
+            settings.TRUSTED_RESPONSES = trusted
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(
+                    path,
+                    params={"include_archived": "false"},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+            results[name] = (round(statistics.median(samples), 2), response.content)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agreements", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    token = seed(args.agreements)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(*AGREEMENT_LIST_COLUMNS).order_by(Agreement.created_at.desc(), Agreement.id.desc())
+        ).all()
+
+    encode = asyncio.run(serialization(rows, args.repeat))
+    end_to_end = asyncio.run(requests(token, args.repeat))
+    bodies = {body for _, body in encode.values()} | {body for _, body in end_to_end.values()}
+    assert len(bodies) == 1, "response bodies differ"
+
+    print(f"serialize {len(rows)} rows (median ms): " + ", ".join(f"{name} {ms}" for name, (ms, _) in encode.items()))
+    print(f"GET /api/agreements/user (median ms):  " + ", ".join(f"{name} {ms}" for name, (ms, _) in end_to_end.items()))
+    print(f"body: {len(bodies.pop())} bytes, identical in every mode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Signature row size and sign latency
+
+Builds signature_pad-style stroke payloads (x/y/time/pressure floats per
+point) and a canvas PNG data URL, and reports the bytes stored per row as
+verbatim JSON vs the compact blob + summary, the encode/decode cost, and
+end-to-end POST /sign latency through the app.
+
+    python -m benchmarks.bench_signature_storage --points 3000 --signs 100
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["SMS_TRANSPORT"] = "fake"
+os.environ["PDF_RENDER_ENABLED"] = "false"
+
+import httpx
+
+from app.schemas.agreements import SignaturePayload
+from app.services.signatures import compact_signature, decode_signature
+from benchmarks.bench_pdf_render import signature_png
+from main import app
+
+
+def stroke_payload(points: int, strokes: int = 8) -> dict:
+    """Smooth pen strokes sampled every ~16ms, as signature_pad's toData() emits them"""
+    per_stroke = points // strokes
+    groups = []
+    t = 1760000000000.0
+    for s in range(strokes):
+        stroke = []
+        for i in range(per_stroke):
+            phase = i / per_stroke
+            stroke.append({
+                "x": 40 + s * 60 + 50 * phase + 12 * math.sin(phase * 9 + s),
+                "y": 100 + 45 * math.sin(phase * 6.3 + s * 1.7) + 7 * math.cos(phase * 23),
+                "time": t,
+                "pressure": 0.5,
+            })
+            t += 16.7
+        groups.append({"points": stroke, "penColor": "black", "dotSize": 0, "minWidth": 0.5, "maxWidth": 2.5})
+    return {"strokes": groups, "width": 600, "height": 200, "timestamp": "2026-10-17T12:00:00Z", "clientConsent": True}
+
+
+def png_payload() -> dict:
+    png = signature_png(600, 200, alpha=True)
+    return {"signature": "data:image/png;base64," + base64.b64encode(png).decode(), "timestamp": "2026-10-17T12:00:00Z", "clientConsent": True}
+
+
+def row_size(label: str, payload: dict, repeat: int = 50):
+    verbatim = len(json.dumps({"signature_data": payload}).encode())
+    model = SignaturePayload.model_validate(payload)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        blob, summary = compact_signature(model)
+    encode_ms = (time.perf_counter() - started) / repeat * 1000
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode_signature(blob, summary)
+    decode_ms = (time.perf_counter() - started) / repeat * 1000
+    compact = len(blob) + len(json.dumps(summary).encode())
+    print(
+        f"{label}: {verbatim} bytes verbatim -> {compact} bytes compact "
+        f"({compact / verbatim:.1%}); encode {encode_ms:.2f} ms, decode {decode_ms:.2f} ms"
+    )
+
+
+async def sign_latency(label: str, payload: dict, signs: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/auth/register", json={
+            "email": f"{label}@example.com", "password": "bench-password",
+            "first_name": "Bench", "last_name": "Realtor", "phone": "5550000000", "state": "CA",
+        })
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.post("/api/agreements/bulk", headers=headers, json={"items": [
+            {"client_name": f"Client {i}", "client_phone": "5551234567", "meeting_type": "showing",
+             "state": "CA", "agreement_text": "Agreement text"}
+            for i in range(signs)
+        ]})
+        assert response.status_code == 200, response.text
+        tokens = [result["agreement"]["security_token"] for result in response.json()["results"]]
+
+        timings = []
+        body = {"signature_data": payload}
+        for token in tokens:
+            started = time.perf_counter()
+            response = await client.post(f"/api/agreements/public/{token}/sign", json=body)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+    timings.sort()
+    print(
+        f"{label} sign: p50 {statistics.median(timings):.2f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms over {signs} signs"
+    )
+
+
+async def main(points: int, signs: int):
+    async with app.router.lifespan_context(app):
+        strokes = stroke_payload(points)
+        png = png_payload()
+        row_size(f"strokes ({points} points)", strokes)
+        row_size("png (600x200 RGBA)", png)
+        await sign_latency("strokes", strokes, signs)
+        await sign_latency("png", png, signs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=3000)
+    parser.add_argument("--signs", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.points, args.signs))
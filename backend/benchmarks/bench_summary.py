@@ -0,0 +1,163 @@
+"""Dashboard counts for a realtor with 100k agreements
+
+Seeds one realtor with ``--agreements`` rows in every status, reconciles
+the counters, then times three ways of getting the counts by status:
+
+* summary: GET /api/agreements/summary, one agreement_counters row
+* group by: ``GROUP BY status`` over agreements and agreements_archive,
+  as the endpoint would have to without the counters
+* download all: GET /api/agreements/user, counted on the client
+
+and checks that all three agree. Signing and expiring a few agreements
+afterwards checks that the counters follow.
+
+    python -m benchmarks.bench_summary --agreements 100000 --repeat 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["RATE_LIMIT_IP_PER_MINUTE"] = "0"
+os.environ["RATE_LIMIT_TOKEN_PER_MINUTE"] = "0"
+
+import httpx
+from sqlalchemy import func, insert, select, union_all, update
+
+from app.database import engine, Base, SessionLocal, AsyncSessionLocal, User, Agreement, AgreementArchive
+from app.routers.auth import create_access_token, build_token_claims
+from app.services.counters import STATUSES, expiry_sweeper, reconcile_counters
+from main import app
+
+BATCH_SIZE = 5000
+
+
+def seed(count: int):
+    """One realtor with ``count`` agreements; returns their id, token and a few open links"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="bench@example.com", password_hash="x", first_name="Bench", last_name="Realtor", phone="5550000000", state="CA")
+    db.add(user)
+    db.commit()
+    user_id, token = user.id, create_access_token(build_token_claims(user))
+    db.close()
+
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    links = []
+    with engine.begin() as conn:
+        batch = []
+        for i in range(count):
+            created_at = now - timedelta(hours=rng.uniform(0, 24 * 180))
+            open_link = created_at > now - timedelta(hours=48)
+            status = rng.choice(("draft", "viewed", "signed")) if open_link else rng.choice(("draft", "viewed", "signed", "signed"))
+            row = {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "client_name": f"Client {i}",
+                "client_phone": "5551234567",
+                "meeting_type": "showing",
+                "state": "CA",
+                "agreement_text": "Lorem ipsum dolor sit amet.",
+                "status": status,
+                "security_token": uuid.uuid4().hex,
+                "expires_at": created_at + timedelta(hours=48),
+                "signed_at": created_at + timedelta(minutes=5) if status == "signed" else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            if open_link and status != "signed" and len(links) < 20:
+                links.append(row["security_token"])
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                conn.execute(insert(Agreement), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Agreement), batch)
+        reconcile_counters(conn)
+    return user_id, token, links
+
+
+async def group_by_counts(user_id: str) -> dict:
+    statuses = union_all(*(
+        select(model.status).where(model.user_id == user_id) for model in (Agreement, AgreementArchive)
+    )).subquery()
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(statuses.c.status, func.count()).group_by(statuses.c.status))).all()
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(rows)
+    counts["total"] = sum(counts[status] for status in STATUSES)
+    return counts
+
+
+async def timed(repeat: int, call):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+async def run(user_id: str, token: str, links: list, repeat: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def summary():
+            response = await client.get("/api/agreements/summary", headers=headers)
+            assert response.status_code == 200, response.text
+            return response.json()
+
+        async def download_all():
+            response = await client.get("/api/agreements/user", headers=headers)
+            counts = dict.fromkeys(STATUSES, 0)
+            counts.update(Counter(agreement["status"] for agreement in response.json()))
+            counts["total"] = sum(counts[status] for status in STATUSES)
+            return counts
+
+        results = {
+            "summary": await timed(repeat, summary),
+            "group by": await timed(repeat, lambda: group_by_counts(user_id)),
+            "download all": await timed(max(repeat // 10, 2), download_all),
+        }
+        assert len({tuple(sorted(counts.items())) for _, counts in results.values()}) == 1, results
+
+        # The counters follow the transitions
+        signature = {"signature_data": {"strokes": [[[0, 0], [10, 10]]]}}
+        for token_ in links[:5]:
+            assert (await client.post(f"/api/agreements/public/{token_}/sign", json=signature)).status_code == 200
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Agreement).where(Agreement.security_token.in_(links[5:10])).values(expires_at=datetime.utcnow())
+            )
+            await db.commit()
+        await expiry_sweeper.sweep()
+        assert await summary() == await group_by_counts(user_id)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agreements", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    user_id, token, links = seed(args.agreements)
+    for name, (ms, counts) in asyncio.run(run(user_id, token, links, args.repeat)).items():
+        print(f"{name:<13} {ms:>9} ms  {counts}")
+    print("counters match GROUP BY after signing and expiring agreements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Commits per second for bursts of /view on one hot agreement
+
+Fires concurrent POST /public/{token}/view calls at a single agreement and
+counts database commits, first with the old handler (SELECT + UPDATE +
+commit on every call) and then with the buffered one. The buffer is
+flushed once at the end, as the periodic task would.
+
+    python -m benchmarks.bench_view_coalescing --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="homeshow-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+# The benchmark is one client hammering a handful of tokens; measure the handler, not the limiter
+os.environ["RATE_LIMIT_IP_PER_MINUTE"] = "0"
+os.environ["RATE_LIMIT_TOKEN_PER_MINUTE"] = "0"
+
+import httpx
+from fastapi import Depends, Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine, async_engine, Base, SessionLocal, get_async_db, Agreement
+from app.routers.agreements import get_active_agreement
+from app.services.view_buffer import view_buffer
+from main import app
+
+commits = 0
+
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def count_commit(conn):
+    global commits
+    commits += 1
+
+
+# The pre-buffer handler, kept here only as the "before" baseline
+@app.post("/bench/legacy-view/{token}")
+async def legacy_view(token: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    agreement = await get_active_agreement(db, token)
+    agreement.viewed_at = datetime.utcnow()
+    agreement.client_ip = request.client.host
+    agreement.user_agent = request.headers.get("user-agent")
+    agreement.status = "viewed"
+    await db.commit()
+    return {"message": "Agreement marked as viewed"}
+
+
+def seed(token: str):
+    db = SessionLocal()
+    db.add(Agreement(
+        user_id="bench-user",
+        client_name="Hot Client",
+        client_phone="5551234567",
+        meeting_type="showing",
+        state="CA",
+        agreement_text="Lorem ipsum dolor sit amet. " * 200,
+        security_token=token,
+        expires_at=datetime.utcnow() + timedelta(hours=48),
+    ))
+    db.commit()
+    db.close()
+
+
+async def run(path: str, total: int, concurrency: int, flush: bool):
+    global commits
+    commits = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(total))
+
+        async def worker():
+            for i in counter:
+                response = await client.post(path, headers={"user-agent": f"phone-{i % 7}"})
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if flush:
+            await view_buffer.flush()
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "commits": commits,
+        "commits_per_s": round(commits / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    seed("legacy-token")
+    seed("buffered-token")
+
+    async def compare():
+        before = await run("/bench/legacy-view/legacy-token", args.requests, args.concurrency, flush=False)
+        after = await run("/api/agreements/public/buffered-token/view", args.requests, args.concurrency, flush=True)
+        return before, after
+
+    before, after = asyncio.run(compare())
+    print(f"commit per view (before): {before}")
+    print(f"buffered views  (after):  {after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""Load-test suite: seed a database, drive mixed API traffic, compare runs
+
+    python -m benchmarks.loadtest.seed --database-url sqlite:////tmp/load.db --realtors 2000 --agreements 1000000
+    python -m benchmarks.loadtest.run --database-url sqlite:////tmp/load.db --duration 60 --output after.json
+    python -m benchmarks.loadtest.compare before.json after.json
+
+See the module docstrings for the options.
+"""
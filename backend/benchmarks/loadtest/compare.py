@@ -0,0 +1,115 @@
+"""Compare two load-test results route by route
+
+Prints throughput and p50/p95/p99 for each route in both runs with the
+relative change, and exits non-zero when any route regressed by more
+than ``--threshold`` percent: p95 or p99 latency up, throughput down, or
+an error rate up by more than a point. Routes missing from either run are listed but not
+counted as regressions. Only compare runs with the same dataset, server
+and concurrency; the meta section of each result says what those were.
+
+    python -m benchmarks.loadtest.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# (metric, path into the route stats, True if bigger is better)
+METRICS = (
+    ("req/s", ("throughput_rps",), True),
+    ("p50", ("latency_ms", "p50"), False),
+    ("p95", ("latency_ms", "p95"), False),
+    ("p99", ("latency_ms", "p99"), False),
+)
+
+# Only these gate a comparison; p50 is reported but moves with noise
+GATED = {"req/s", "p95", "p99"}
+
+# An error rate may rise by this much (absolute) before it counts
+ERROR_RATE_SLACK = 0.01
+
+# Ignore routes with too few requests in either run to say anything
+MIN_REQUESTS = 50
+
+
+def metric(stats: dict, path: tuple) -> float:
+    for key in path:
+        stats = stats[key]
+    return stats
+
+
+def change(before: float, after: float) -> float:
+    if before == 0:
+        return 0.0 if after == 0 else float("inf")
+    return (after - before) / before * 100
+
+
+def error_rate(stats: dict) -> float:
+    return stats["errors"] / stats["requests"] if stats["requests"] else 0.0
+
+
+def compare(baseline: dict, candidate: dict, threshold: float = 10) -> dict:
+    """Per-route changes and the list of regressions beyond ``threshold`` percent"""
+    routes = {}
+    regressions = []
+    before_routes = {**baseline["routes"], "total": baseline["total"]}
+    after_routes = {**candidate["routes"], "total": candidate["total"]}
+    for route in sorted(set(before_routes) | set(after_routes), key=lambda name: (name == "total", name)):
+        before, after = before_routes.get(route), after_routes.get(route)
+        if before is None or after is None:
+            routes[route] = {"missing": "baseline" if before is None else "candidate"}
+            continue
+        rows = {}
+        for name, path, higher_is_better in METRICS:
+            old, new = metric(before, path), metric(after, path)
+            delta = change(old, new)
+            worse = -delta if higher_is_better else delta
+            rows[name] = {"before": old, "after": new, "change_pct": round(delta, 1)}
+            if name in GATED and worse > threshold and min(before["requests"], after["requests"]) >= MIN_REQUESTS:
+                regressions.append(f"{route}: {name} {old:g} -> {new:g} ({delta:+.1f}%)")
+        old_errors, new_errors = error_rate(before), error_rate(after)
+        rows["errors"] = {"before": round(old_errors, 4), "after": round(new_errors, 4)}
+        if new_errors > old_errors + ERROR_RATE_SLACK:
+            regressions.append(f"{route}: error rate {old_errors:.2%} -> {new_errors:.2%}")
+        routes[route] = rows
+    return {"threshold_pct": threshold, "routes": routes, "regressions": regressions}
+
+
+def print_comparison(comparison: dict):
+    print(f"{'route':<42} {'metric':>7} {'before':>10} {'after':>10} {'change':>8}")
+    for route, rows in comparison["routes"].items():
+        if "missing" in rows:
+            print(f"{route:<42} (missing from {rows['missing']})")
+            continue
+        for name, row in rows.items():
+            if name == "errors":
+                if row["before"] or row["after"]:
+                    print(f"{route:<42} {'errors':>7} {row['before']:>10.2%} {row['after']:>10.2%}")
+                continue
+            print(f"{route:<42} {name:>7} {row['before']:>10.2f} {row['after']:>10.2f} {row['change_pct']:>+7.1f}%")
+            route = ""
+    if comparison["regressions"]:
+        print(f"\n{len(comparison['regressions'])} regression(s) beyond {comparison['threshold_pct']:g}%:")
+        for regression in comparison["regressions"]:
+            print(f"  {regression}")
+    else:
+        print(f"\nNo regressions beyond {comparison['threshold_pct']:g}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="percent")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+    with open(args.baseline) as baseline, open(args.candidate) as candidate:
+        comparison = compare(json.load(baseline), json.load(candidate), args.threshold)
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print_comparison(comparison)
+    sys.exit(1 if comparison["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""Drive mixed API traffic at a seeded database and report per-route latency
+
+Virtual users loop over weighted operations (register, login, create,
+list, public page, view, sign) with no think time, for ``--duration``
+seconds after a ``--warmup``. Realtor sessions and open agreement links
+are sampled from the database seeded by ``benchmarks.loadtest.seed``;
+links created during the run join the pool and signed ones leave it.
+
+The server is one of:
+
+- ``--server inprocess`` (default): the app on an httpx ASGI transport in
+  this process. Cheapest to run, but client and server share one core.
+- ``--server uvicorn``: uvicorn subprocess(es) on a free port, closer to
+  production; ``--workers`` sets the process count.
+- ``--url``: a server that is already running on the seeded database
+  (start it with RATE_LIMIT_IP_PER_MINUTE=0 RATE_LIMIT_TOKEN_PER_MINUTE=0,
+  or the public routes get 429s from a single client address).
+
+Results are printed and, with ``--output``, written as JSON: per route
+the request and error counts, throughput and latency percentiles.
+``--baseline`` compares against an earlier result (see
+``benchmarks.loadtest.compare``) and exits non-zero on a regression.
+
+    python -m benchmarks.loadtest.run --database-url sqlite:////tmp/load.db --duration 60 --output run.json
+    python -m benchmarks.loadtest.run --database-url sqlite:////tmp/load.db --server uvicorn --workers 4 --baseline run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+
+from benchmarks.bench_cold_start import BACKEND_DIR, free_port
+from benchmarks.loadtest.compare import compare, print_comparison
+from benchmarks.loadtest.seed import EMAIL_DOMAIN, SEED_PASSWORD
+
+# Login and register each cost a bcrypt hash (about 0.25s of CPU at cost
+# 12), so even a few percent of them would drown out every other route;
+# use --mix to load-test auth on its own
+DEFAULT_MIX = "register=0.2,login=0.5,create=10,list=25,public=35,view=17,sign=10"
+
+# The server's environment for a load test: no rate limits (every request
+# comes from one address), no SMS provider, no archive sweeps mid-run
+SERVER_ENV = {
+    "RATE_LIMIT_IP_PER_MINUTE": "0",
+    "RATE_LIMIT_TOKEN_PER_MINUTE": "0",
+    "SMS_TRANSPORT": "fake",
+    "ARCHIVE_SWEEP_INTERVAL": "0",
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+SIGNATURE = {
+    "strokes": [[[40 + i, 100 + (i * 7) % 40] for i in range(60)] for _ in range(3)],
+    "width": 600,
+    "height": 200,
+    "clientConsent": True,
+}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name] = float(weight)
+    return weights
+
+
+def percentile(ordered: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class Recorder:
+    """Latencies and status codes per route; only recorded while ``measuring``"""
+
+    def __init__(self):
+        self.measuring = False
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, route: str, status, seconds: float):
+        if not self.measuring:
+            return
+        self.latencies.setdefault(route, []).append(seconds * 1000)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def summary(self, duration: float) -> dict:
+        routes = {}
+        everything = []
+        for route in sorted(self.latencies):
+            timings = sorted(self.latencies[route])
+            everything += timings
+            routes[route] = route_summary(timings, self.statuses[route], duration)
+        statuses = {}
+        for counts in self.statuses.values():
+            for status, count in counts.items():
+                statuses[status] = statuses.get(status, 0) + count
+        return {"routes": routes, "total": route_summary(sorted(everything), statuses, duration)}
+
+
+def route_summary(timings: list, statuses: dict, duration: float) -> dict:
+    errors = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 400)
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "status": {str(status): count for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "throughput_rps": round(len(timings) / duration, 2),
+        "latency_ms": {
+            "mean": round(sum(timings) / len(timings), 3) if timings else 0.0,
+            **{f"p{p}": round(percentile(timings, p), 3) for p in PERCENTILES},
+            "max": round(timings[-1], 3) if timings else 0.0,
+        },
+    }
+
+
+class Workload:
+    """Shared state of one run: sessions, open links and the recorder"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, realtor_count: int, tokens: list, run_id: str):
+        self.client = client
+        self.recorder = recorder
+        self.realtor_count = realtor_count
+        self.tokens = tokens
+        self.run_id = run_id
+        self.sessions = []
+        self.registered = 0
+
+    async def request(self, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(route, "error", time.perf_counter() - started)
+            return None
+        self.recorder.record(route, response.status_code, time.perf_counter() - started)
+        return response
+
+    async def login(self, rng: random.Random):
+        email = f"realtor{rng.randrange(self.realtor_count)}@{EMAIL_DOMAIN}"
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login", json={
+            "email": email, "password": SEED_PASSWORD,
+        })
+        if response is not None and response.status_code == 200:
+            self.sessions.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+    async def register(self, rng: random.Random):
+        self.registered += 1
+        response = await self.request("POST /api/auth/register", "POST", "/api/auth/register", json={
+            "email": f"new-{self.run_id}-{self.registered}@{EMAIL_DOMAIN}",
+            "password": SEED_PASSWORD,
+            "first_name": "Load", "last_name": "Test", "phone": "5550000000", "state": "CA",
+        })
+        if response is not None and response.status_code == 200:
+            self.sessions.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+    async def create(self, rng: random.Random):
+        client_name = f"Client {rng.randrange(10 ** 6)}"
+        response = await self.request("POST /api/agreements/", "POST", "/api/agreements/", headers=rng.choice(self.sessions), json={
+            "client_name": client_name,
+            "client_phone": f"555{rng.randrange(10 ** 7):07d}",
+            "meeting_type": "showing",
+            "state": "CA",
+            "agreement_text": f"CA BUYER REPRESENTATION AGREEMENT (showing)\n\nThis agreement is made with {client_name}.",
+        })
+        if response is not None and response.status_code == 200:
+            self.tokens.append(response.json()["security_token"])
+
+    async def list(self, rng: random.Random):
+        await self.request("GET /api/agreements/user", "GET", "/api/agreements/user", headers=rng.choice(self.sessions), params={"limit": 50})
+
+    async def public(self, rng: random.Random):
+        if not self.tokens:
+            return await self.create(rng)
+        await self.request("GET /api/agreements/public/{token}", "GET", f"/api/agreements/public/{rng.choice(self.tokens)}")
+
+    async def view(self, rng: random.Random):
+        if not self.tokens:
+            return await self.create(rng)
+        await self.request("POST /api/agreements/public/{token}/view", "POST", f"/api/agreements/public/{rng.choice(self.tokens)}/view")
+
+    async def sign(self, rng: random.Random):
+        if not self.tokens:
+            return await self.create(rng)
+        # Take the link out of the pool; swap-remove keeps it O(1)
+        index = rng.randrange(len(self.tokens))
+        self.tokens[index], self.tokens[-1] = self.tokens[-1], self.tokens[index]
+        token = self.tokens.pop()
+        await self.request("POST /api/agreements/public/{token}/sign", "POST", f"/api/agreements/public/{token}/sign", json={
+            "signature_data": SIGNATURE,
+        })
+
+
+OPERATIONS = {
+    "register": Workload.register,
+    "login": Workload.login,
+    "create": Workload.create,
+    "list": Workload.list,
+    "public": Workload.public,
+    "view": Workload.view,
+    "sign": Workload.sign,
+}
+
+
+async def virtual_user(workload: Workload, rng: random.Random, weights: dict, stop_at: float):
+    names = list(weights)
+    operations = [OPERATIONS[name] for name in names]
+    cumulative = [sum(list(weights.values())[:i + 1]) for i in range(len(names))]
+    loop = asyncio.get_running_loop()
+    while loop.time() < stop_at:
+        operation = rng.choices(operations, cum_weights=cumulative)[0]
+        await operation(workload, rng)
+
+
+def sample_dataset(database_url: str, tokens: int, open_for: float) -> dict:
+    """Row counts and a sample of unsigned links from the seeded database that
+    stay open for at least ``open_for`` seconds"""
+    from sqlalchemy import func, select
+
+    from app.database import Agreement, User, engine
+
+    with engine.connect() as conn:
+        realtors = conn.execute(
+            select(func.count()).select_from(User).where(User.email.like(f"realtor%@{EMAIL_DOMAIN}"))
+        ).scalar_one()
+        agreements = conn.execute(select(func.count()).select_from(Agreement)).scalar_one()
+        open_tokens = list(conn.execute(
+            select(Agreement.security_token)
+            .where(Agreement.signed_at.is_(None), Agreement.expires_at > datetime.utcnow() + timedelta(seconds=open_for))
+            .order_by(Agreement.expires_at.desc())
+            .limit(tokens)
+        ).scalars())
+    engine.dispose()
+    if not realtors:
+        raise SystemExit(f"no load-test realtors in {database_url}; run benchmarks.loadtest.seed first")
+    return {"realtors": realtors, "agreements": agreements, "tokens": open_tokens}
+
+
+async def drive(client: httpx.AsyncClient, args, dataset: dict) -> dict:
+    weights = parse_mix(args.mix)
+    recorder = Recorder()
+    workload = Workload(client, recorder, dataset["realtors"], list(dataset["tokens"]), datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+    rng = random.Random(args.seed)
+
+    # Sessions for the authenticated routes; logging in costs a bcrypt verify
+    # each, so this happens before the clock starts
+    await asyncio.gather(*(workload.login(random.Random(rng.random())) for _ in range(args.sessions)))
+    if not workload.sessions:
+        raise SystemExit("could not log in any seeded realtor")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+    users = [
+        asyncio.create_task(virtual_user(workload, random.Random(rng.random()), weights, stop_at))
+        for _ in range(args.concurrency)
+    ]
+    await asyncio.sleep(args.warmup)
+    recorder.measuring = True
+    measured_from = loop.time()
+    await asyncio.gather(*users)
+    recorder.measuring = False
+    return recorder.summary(loop.time() - measured_from)
+
+
+async def run_inprocess(args, dataset: dict) -> dict:
+    from main import app
+
+    # Unhandled errors count as 500s, as they would behind a real server
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await drive(client, args, dataset)
+
+
+async def run_remote(args, dataset: dict, url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await drive(client, args, dataset)
+
+
+def start_uvicorn(args, env: dict):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, start_new_session=True,
+    )
+    url = f"http://127.0.0.1:{port}"
+    with httpx.Client(timeout=1) as client:
+        deadline = time.perf_counter() + 60
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with {process.returncode}")
+            try:
+                if client.get(f"{url}/").status_code == 200:
+                    return process, url
+            except httpx.TransportError:
+                if time.perf_counter() > deadline:
+                    raise
+            time.sleep(0.05)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="the seeded database (default: a fresh SQLite file seeded with --seed-realtors/--seed-agreements)")
+    parser.add_argument("--seed-realtors", type=int, default=200)
+    parser.add_argument("--seed-agreements", type=int, default=20000)
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", help="an already running server on --database-url")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--sessions", type=int, default=20, help="realtors logged in before the run")
+    parser.add_argument("--tokens", type=int, default=20000, help="open links sampled from the database")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="write the result JSON here")
+    parser.add_argument("--baseline", help="earlier result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold in percent")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='homeshow-load-'), 'load.db')}"
+    # The app reads its settings at import, so this comes before importing it
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.update({key: value for key, value in SERVER_ENV.items() if key not in os.environ})
+    if not args.database_url:
+        from benchmarks.loadtest.seed import seed
+        seed(database_url, args.seed_realtors, args.seed_agreements)
+
+    # Links that would expire mid-run would only add 404s
+    dataset = sample_dataset(database_url, args.tokens, args.warmup + args.duration + 300)
+    print(
+        f"{dataset['realtors']} realtors, {dataset['agreements']} agreements, {len(dataset['tokens'])} open links; "
+        f"{args.concurrency} users for {args.duration:g}s ({args.server if not args.url else args.url})"
+    )
+
+    process = None
+    try:
+        if args.url:
+            summary = asyncio.run(run_remote(args, dataset, args.url))
+        elif args.server == "uvicorn":
+            process, url = start_uvicorn(args, dict(os.environ))
+            summary = asyncio.run(run_remote(args, dataset, url))
+        else:
+            summary = asyncio.run(run_inprocess(args, dataset))
+    finally:
+        if process is not None:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+
+    result = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": database_url.split(":", 1)[0],
+            "realtors": dataset["realtors"],
+            "agreements": dataset["agreements"],
+            "server": "url" if args.url else args.server,
+            "workers": args.workers if args.server == "uvicorn" and not args.url else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": parse_mix(args.mix),
+            "seed": args.seed,
+        },
+        **summary,
+    }
+
+    print(f"{'route':<42} {'req/s':>8} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in {**result["routes"], "total": result["total"]}.items():
+        latency = stats["latency_ms"]
+        print(
+            f"{route:<42} {stats['throughput_rps']:>8.1f} {stats['errors']:>7} "
+            f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            comparison = compare(json.load(baseline), result, args.threshold)
+        print_comparison(comparison)
+        if comparison["regressions"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
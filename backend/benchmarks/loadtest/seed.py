@@ -0,0 +1,240 @@
+"""Seed a database with load-test realtors and agreements
+
+Creates the schema if needed (``create_all``; on Postgres run ``alembic
+upgrade head`` first to get the partitioned archive), then bulk-inserts
+realtors and agreements in batches with SQLAlchemy Core. Every realtor
+shares SEED_PASSWORD, hashed once at the configured bcrypt cost, so logins
+during a run cost what real ones do.
+
+Agreements are spread over the last ``--days`` days, skewed towards
+recent ones and towards a few busy realtors: rows from the last 48 hours are still open (drafts and viewed
+links the run can sign), older ones are mostly signed, with a PDF already
+recorded so the PDF worker does not start rendering the backlog. The
+client search index is rebuilt once they are in, oldest first as the app
+would have indexed them, and the dashboard counters are reconciled. Rows are
+generated from ``--seed``, so two databases seeded with the same options
+have the same shape. Run ``scripts/sweep_archive.py`` afterwards to move
+the old rows into the archive as production would.
+
+    python -m benchmarks.loadtest.seed --database-url sqlite:////tmp/load.db --realtors 2000 --agreements 1000000
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+SEED_PASSWORD = "loadtest-password"
+EMAIL_DOMAIN = "loadtest.example"
+
+# Matches the create endpoint
+LINK_LIFETIME = timedelta(hours=48)
+
+STATES = ("CA", "TX", "FL", "NY", "WA", "IL", "AZ", "CO", "GA", "NC")
+MEETING_TYPES = ("showing", "open_house", "listing_consultation", "buyer_consultation")
+FIRST_NAMES = ("Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn", "Drew")
+LAST_NAMES = ("Garcia", "Smith", "Nguyen", "Johnson", "Patel", "Brown", "Kim", "Lopez", "Miller", "Davis")
+COMPANIES = ("Keystone Realty", "Harbor Homes", "Summit Properties", "Oak & Main", None)
+
+AGREEMENT_TEMPLATE = (
+    "{state} BUYER REPRESENTATION AGREEMENT ({meeting_type})\n\n"
+    "This agreement is made between {{{{client_name}}}} ({{{{client_phone}}}}) and "
+    "{{{{realtor_name}}}} of {{{{realtor_company}}}} ({{{{realtor_phone}}}}).\n\n"
+    "1. The client agrees to view properties with the realtor named above.\n"
+    "2. Compensation is due only under a separate written agreement.\n"
+    "3. This agreement ends when the showing is over unless both parties extend it.\n"
+)
+
+
+def template_bodies() -> dict:
+    """(state, meeting type) -> template body, one per combination as realtors' texts tend to be"""
+    return {
+        (state, meeting_type): AGREEMENT_TEMPLATE.format(state=state, meeting_type=meeting_type)
+        for state in STATES
+        for meeting_type in MEETING_TYPES
+    }
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def seeded_token(rng: random.Random) -> str:
+    # Same shape as secrets.token_urlsafe(32)
+    return base64.urlsafe_b64encode(rng.randbytes(32)).decode().rstrip("=")
+
+
+def realtor_rows(rng: random.Random, count: int, password_hash: str, now: datetime):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = now - timedelta(days=rng.uniform(30, 720))
+        yield {
+            "id": seeded_uuid(rng),
+            "email": f"realtor{i}@{EMAIL_DOMAIN}",
+            "password_hash": password_hash,
+            "first_name": first,
+            "last_name": last,
+            "phone": f"555{rng.randrange(10 ** 7):07d}",
+            "company_name": rng.choice(COMPANIES),
+            "license_number": f"LIC{rng.randrange(10 ** 8):08d}",
+            "state": rng.choice(STATES),
+            "is_verified": rng.random() < 0.9,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def agreement_rows(rng: random.Random, count: int, realtors: list, hashes: dict, now: datetime, days: int):
+    # A few busy realtors hold most agreements, as in production
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(realtors))]
+    owners = rng.choices(realtors, weights=weights, k=count)
+    for realtor in owners:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        state = realtor["state"] if rng.random() < 0.95 else rng.choice(STATES)
+        meeting_type = rng.choice(MEETING_TYPES)
+        # Skewed towards recent days, so the newest pages are the busy ones
+        created_at = now - timedelta(seconds=days * 86400 * rng.random() ** 1.5)
+        expires_at = created_at + LINK_LIFETIME
+        client_name = f"{first} {last}"
+        client_phone = f"555{rng.randrange(10 ** 7):07d}"
+        row = {
+            "id": seeded_uuid(rng),
+            "user_id": realtor["id"],
+            "client_name": client_name,
+            "client_phone": client_phone,
+            "client_email": f"{first.lower()}.{last.lower()}{rng.randrange(1000)}@example.com" if rng.random() < 0.6 else None,
+            "meeting_type": meeting_type,
+            "state": state,
+            "template_hash": hashes[state, meeting_type],
+            "template_vars": {
+                "client_name": client_name,
+                "client_phone": client_phone,
+                "realtor_name": f"{realtor['first_name']} {realtor['last_name']}",
+                "realtor_phone": realtor["phone"],
+                "realtor_company": realtor["company_name"] or "",
+            },
+            "status": "draft",
+            "security_token": seeded_token(rng),
+            "expires_at": expires_at,
+            "viewed_at": None,
+            "signed_at": None,
+            "client_ip": None,
+            "user_agent": None,
+            "signature_data": None,
+            "pdf_url": None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        open_link = expires_at > now
+        if rng.random() < (0.3 if open_link else 0.85):
+            row["viewed_at"] = created_at + timedelta(minutes=rng.uniform(1, 30))
+            row["status"] = "viewed"
+            row["client_ip"] = f"203.0.113.{rng.randrange(1, 255)}"
+            row["user_agent"] = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)"
+            if rng.random() < (0.3 if open_link else 0.8):
+                signed_at = row["viewed_at"] + timedelta(minutes=rng.uniform(1, 60))
+                if signed_at < now:
+                    row["signed_at"] = signed_at
+                    row["status"] = "signed"
+                    row["signature_data"] = {"format": "strokes", "strokes": 3, "points": 180, "width": 600, "height": 200}
+                    digest = hashlib.sha256(row["id"].encode()).hexdigest()
+                    row["pdf_url"] = f"/api/agreements/{row['id']}/pdf?v={digest}"
+        row["updated_at"] = row["signed_at"] or row["viewed_at"] or created_at
+        yield row
+
+
+def batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(database_url: str, realtors: int, agreements: int, days: int = 180, batch_size: int = 5000, rng_seed: int = 1):
+    """Create the schema on ``database_url`` if needed and insert the rows; returns the counts inserted"""
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import func, insert, select, text
+
+    from app.database import Agreement, AgreementTemplate, Base, User, engine
+    from app.services.passwords import password_hasher
+    from app.services.counters import reconcile_counters
+    from app.services.search import rebuild_search_index
+    from app.services.templates import template_hash
+
+    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "sqlite":
+        # WAL is stored in the file, so the server opened on it later gets
+        # it too; in rollback-journal mode a steady stream of readers
+        # starves writers into "database is locked" long before the app
+        # itself is the bottleneck
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode = WAL")
+    with engine.connect() as conn:
+        existing = conn.execute(
+            select(func.count()).select_from(User).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+        ).scalar_one()
+    if existing:
+        raise SystemExit(f"{database_url} already has {existing} load-test realtors; seed a fresh database")
+
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow()
+    password_hash = asyncio.run(password_hasher.hash(SEED_PASSWORD))
+    bodies = template_bodies()
+    hashes = {key: template_hash(body) for key, body in bodies.items()}
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # Durability doesn't matter for a throwaway dataset
+            conn.execute(text("PRAGMA synchronous = OFF"))
+        present = set(conn.execute(select(AgreementTemplate.hash)).scalars())
+        missing = [
+            {"hash": hashes[key], "body": body, "created_at": now}
+            for key, body in bodies.items() if hashes[key] not in present
+        ]
+        if missing:
+            conn.execute(insert(AgreementTemplate), missing)
+
+        users = list(realtor_rows(rng, realtors, password_hash, now))
+        for batch in batches(users, batch_size):
+            conn.execute(insert(User), batch)
+
+        inserted = 0
+        for batch in batches(agreement_rows(rng, agreements, users, hashes, now, days), batch_size):
+            conn.execute(insert(Agreement), batch)
+            inserted += len(batch)
+            if inserted % (batch_size * 20) == 0:
+                elapsed = time.perf_counter() - started
+                print(f"  {inserted}/{agreements} agreements ({inserted / elapsed:.0f} rows/s)")
+        print(f"  indexed {rebuild_search_index(conn, batch_size)} agreements for search")
+        print(f"  counted agreements for {reconcile_counters(conn)} realtors")
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {realtors} realtors and {agreements} agreements in {elapsed:.1f}s (password: {SEED_PASSWORD})")
+    return {"realtors": realtors, "agreements": agreements}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), required="DATABASE_URL" not in os.environ)
+    parser.add_argument("--realtors", type=int, default=2000)
+    parser.add_argument("--agreements", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=180, help="spread agreements over this many days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    seed(args.database_url, args.realtors, args.agreements, args.days, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,13 @@ CREATE TABLE users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Agreement templates: each distinct agreement body stored once, keyed by SHA-256
+CREATE TABLE agreement_templates (
+    hash VARCHAR(64) PRIMARY KEY,
+    body TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Agreements table
 CREATE TABLE agreements (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -24,7 +31,9 @@ CREATE TABLE agreements (
     client_email VARCHAR(255),
     meeting_type VARCHAR(100) NOT NULL,
     state VARCHAR(2) NOT NULL,
-    agreement_text TEXT NOT NULL,
+    agreement_text TEXT,
+    template_hash VARCHAR(64) REFERENCES agreement_templates(hash),
+    template_vars JSONB,
     status VARCHAR(50) DEFAULT 'draft',
     security_token VARCHAR(255) UNIQUE NOT NULL,
     expires_at TIMESTAMP NOT NULL,
@@ -33,13 +42,91 @@ CREATE TABLE agreements (
     client_ip VARCHAR(45),
     user_agent TEXT,
     signature_data JSONB,
+    signature_blob BYTEA,
     pdf_url VARCHAR(500),
+    pdf_attempts INTEGER,
+    pdf_error VARCHAR(1000),
+    pdf_retry_at TIMESTAMP,
     audit_trail JSONB,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Indexes
-CREATE INDEX idx_agreements_user_id ON agreements(user_id);
-CREATE INDEX idx_agreements_security_token ON agreements(security_token);
+-- Expired and finished agreements moved out by the archive sweeper.
+-- Partitioned by month of created_at; the sweeper creates partitions as needed.
+CREATE TABLE agreements_archive (
+    id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    client_name VARCHAR(255) NOT NULL,
+    client_phone VARCHAR(20) NOT NULL,
+    client_email VARCHAR(255),
+    meeting_type VARCHAR(100) NOT NULL,
+    state VARCHAR(2) NOT NULL,
+    agreement_text TEXT,
+    template_hash VARCHAR(64),
+    template_vars JSONB,
+    status VARCHAR(50),
+    security_token VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    viewed_at TIMESTAMP,
+    signed_at TIMESTAMP,
+    client_ip VARCHAR(45),
+    user_agent TEXT,
+    signature_data JSONB,
+    signature_blob BYTEA,
+    pdf_url VARCHAR(500),
+    pdf_attempts INTEGER,
+    pdf_error VARCHAR(1000),
+    pdf_retry_at TIMESTAMP,
+    audit_trail JSONB,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Append-only audit events; a final agreement's events are compacted into its audit_trail
+CREATE TABLE agreement_events (
+    id BIGSERIAL PRIMARY KEY,
+    agreement_id UUID NOT NULL,
+    event VARCHAR(30) NOT NULL,
+    at TIMESTAMP NOT NULL,
+    client_ip VARCHAR(45),
+    user_agent TEXT,
+    data JSONB
+);
+
+-- Client search index: normalized copies of the searchable fields of every
+-- agreement, live or archived (see app/services/search.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+CREATE TABLE agreement_search (
+    agreement_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    client_name TEXT NOT NULL,
+    client_phone TEXT NOT NULL,
+    client_email TEXT NOT NULL,
+    meeting_type TEXT NOT NULL,
+    document TEXT GENERATED ALWAYS AS (client_name || ' ' || client_phone || ' ' || client_email || ' ' || meeting_type) STORED
+);
+
+-- Per-realtor agreement counts by status (see app/services/counters.py)
+CREATE TABLE agreement_counters (
+    user_id UUID PRIMARY KEY,
+    draft INTEGER NOT NULL DEFAULT 0,
+    viewed INTEGER NOT NULL DEFAULT 0,
+    signed INTEGER NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes (kept in sync with the models; see migrations/ for upgrades)
+CREATE INDEX idx_agreements_user_id_created_at ON agreements(user_id, created_at, id);
 CREATE INDEX idx_agreements_status ON agreements(status);
+CREATE INDEX idx_agreements_open_expires_at ON agreements(expires_at) WHERE signed_at IS NULL;
+CREATE INDEX idx_agreements_pdf_pending ON agreements(signed_at) WHERE signed_at IS NOT NULL AND pdf_url IS NULL;
+CREATE INDEX idx_agreements_signed_at ON agreements(signed_at) WHERE signed_at IS NOT NULL;
+CREATE INDEX idx_agreements_archive_user_id_created_at ON agreements_archive(user_id, created_at, id);
+CREATE INDEX idx_agreement_events_agreement_id_at ON agreement_events(agreement_id, at);
+CREATE INDEX idx_agreement_search_user_id_document ON agreement_search USING gin (user_id, document gin_trgm_ops);
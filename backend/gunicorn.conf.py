@@ -0,0 +1,41 @@
+"""Production server: gunicorn supervising uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app) and workers are forked
+from it, so each worker starts without re-importing anything. Nothing
+mutable is shared across the fork: the database pools are replaced in
+post_fork, and the per-process loops (view buffer, replica health, event
+hub) start in each worker's lifespan, on that worker's event loop. So do
+the scheduled jobs (SMS outbox, sweepers, PDF renders) unless
+BACKGROUND_WORKERS=false, which leaves them to one
+scripts/run_background_workers.py process instead of one copy per worker.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+
+bind = f"0.0.0.0:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY or os.cpu_count() or 1
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# Requests are async; a worker that stops answering for this long is stuck
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# request.client (rate limits, signature audit) is the X-Forwarded-For
+# address only for requests from these proxies; others can't spoof it
+forwarded_allow_ips = settings.FORWARDED_ALLOW_IPS
+
+accesslog = None
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    from app.database import dispose_engines_after_fork
+    dispose_engines_after_fork()
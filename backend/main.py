@@ -1,21 +1,45 @@
+from dotenv import load_dotenv
+
+# Load environment variables before anything reads them
+load_dotenv()
+
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
-import uvicorn
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 
-from app.database import engine, Base
-from app.routers import auth, agreements
+from app.database import engine, async_engine, replica_engines, Base, pool_stats
+from app.routers import auth, agreements, events
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, instrument_engine, registry as metrics_registry
+from app.core.rate_limit import public_rate_limiter
+from app.core.ops_access import require_ops_access
+from app.core.link_tokens import link_tokens
+from app.services.passwords import password_hasher
+from app.services.agreement_cache import public_agreement_cache, unknown_tokens
+from app.services.sms_outbox import sms_worker
+from app.services.view_buffer import view_buffer
+from app.services.templates import template_store
+from app.services.archive import archive_sweeper
+from app.services.audit_log import audit_compactor
+from app.services.counters import expiry_sweeper
+from app.services.health import database_health
+from app.services.replicas import replica_router
+from app.services.pdf_worker import pdf_worker
+from app.services.events import event_hub
+from app.services.background import start_background_jobs, stop_background_jobs
 
-# Load environment variables
-load_dotenv()
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables. Production schemas come from Alembic
+# (alembic upgrade head), so this is skipped there unless AUTO_CREATE_SCHEMA
+# says otherwise. Under gunicorn's preload it runs once, in the master.
+auto_create_schema = settings.AUTO_CREATE_SCHEMA
+if auto_create_schema is None:
+    auto_create_schema = settings.NODE_ENV != "production"
+if auto_create_schema:
+    Base.metadata.create_all(bind=engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -24,8 +48,19 @@ async def lifespan(app: FastAPI):
     print(f"📊 Environment: {os.getenv('NODE_ENV', 'development')}")
     print(f"🔗 Database URL: {'set' if os.getenv('DATABASE_URL') else 'not set'}")
     print(f"🔐 JWT Secret: {'set' if os.getenv('JWT_SECRET') else 'not set'}")
+    replica_router.start()
+    view_buffer.start()
+    event_hub.start()
+    if settings.BACKGROUND_WORKERS:
+        start_background_jobs()
+    else:
+        print("⏸️ Background jobs disabled in this process (BACKGROUND_WORKERS=false)")
     yield
     # Shutdown
+    await stop_background_jobs()
+    await event_hub.stop()
+    await view_buffer.stop()
+    await replica_router.stop()
     print("🛑 Shutting down HomeShow Backend...")
 
 # Create FastAPI app
@@ -45,9 +80,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    for replica in replica_engines:
+        instrument_engine(replica.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(agreements.router, prefix="/api/agreements", tags=["agreements"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
 
 # Health check endpoint
 @app.get("/")
@@ -61,25 +104,96 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    try:
-        # Test database connection
-        from app.database import get_db
-        db = next(get_db())
-        db.execute("SELECT 1")
-        return {
-            "status": "OK",
-            "timestamp": datetime.utcnow().isoformat(),
-            "database": "connected",
-            "environment": os.getenv("NODE_ENV", "development")
-        }
-    except Exception as e:
+    # Cached for HEALTH_CACHE_SECONDS and run on one pooled connection.
+    # Unauthenticated, so status, latency and pool figures only; the
+    # failure itself is logged by the probe
+    check = await database_health.check()
+    if check["database"] != "connected":
         return {
             "status": "WARNING",
             "timestamp": datetime.utcnow().isoformat(),
             "database": "disconnected",
-            "error": str(e),
+            "checked_at": check["checked_at"],
+            "pool": pool_stats(async_engine),
             "environment": os.getenv("NODE_ENV", "development")
         }
+    return {
+        "status": "OK",
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": "connected",
+        "database_latency_ms": check["latency_ms"],
+        "checked_at": check["checked_at"],
+        "pool": pool_stats(async_engine),
+        "environment": os.getenv("NODE_ENV", "development")
+    }
+
+@app.get("/health/details", dependencies=[Depends(require_ops_access)])
+async def health_details():
+    """This worker's subsystem stats; internal network or OPS_TOKEN only"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": database_health.stats(),
+        "read_replicas": replica_router.stats(),
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": auth.principal_stats(),
+        "public_agreement_cache": public_agreement_cache.stats(),
+        "unknown_tokens": unknown_tokens.stats(),
+        "public_rate_limit": public_rate_limiter.stats(),
+        "link_tokens": link_tokens.stats(),
+        "sms_outbox": sms_worker.stats(),
+        "agreement_templates": template_store.stats(),
+        "view_buffer": view_buffer.stats(),
+        "expiry_sweeper": expiry_sweeper.stats(),
+        "archive_sweeper": archive_sweeper.stats(),
+        "audit_compactor": audit_compactor.stats(),
+        "pdf_render": pdf_worker.stats(),
+        "events": event_hub.stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_ops_access)])
+async def metrics():
+    """Prometheus text format; counters are per worker process. Internal
+    network or OPS_TOKEN only"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+def service_gauges():
+    hashing = password_hasher.stats()
+    sms = sms_worker.stats()
+    cache = public_agreement_cache.stats()
+    views = view_buffer.stats()
+    limits = public_rate_limiter.stats()
+    return [
+        ("read_replicas_healthy", "Read replicas currently taking reads", replica_router.healthy_count()),
+        ("read_replica_failovers", "Replica queries retried on the primary by this process", replica_router.failovers),
+        ("read_replica_sticky_sessions", "Read sessions kept on the primary after a recent write", replica_router.sticky_sessions),
+        ("password_hash_in_flight", "bcrypt operations running", hashing["in_flight"]),
+        ("password_hash_queue_depth", "bcrypt operations waiting for a worker thread", hashing["queue_depth"]),
+        ("public_agreement_cache_hits", "Public agreement cache hits (local tier)", cache["hits"]),
+        ("public_agreement_cache_misses", "Public agreement cache misses (local tier)", cache["misses"]),
+        ("unknown_token_cache_hits", "Public requests for unknown tokens answered without a query", unknown_tokens.hits),
+        ("public_rate_limited_ip", "Public requests rejected by the per-IP limit", limits["limited_ip"]),
+        ("public_rate_limited_token", "Public requests rejected by the per-token limit", limits["limited_token"]),
+        ("link_tokens_rejected", "Forged, malformed or expired signed links rejected without a query", sum(link_tokens.rejected.values())),
+        ("link_tokens_opaque", "Public requests using a pre-signing opaque token", link_tokens.opaque),
+        ("sms_outbox_sent", "SMS sent by this process", sms["sent"]),
+        ("sms_outbox_retried", "SMS sends scheduled for retry by this process", sms["retried"]),
+        ("sms_outbox_failed", "SMS given up on by this process", sms["failed"]),
+        ("sms_outbox_purged", "Sent and failed SMS deleted after retention by this process", sms["purged"]),
+        ("view_buffer_pending", "Buffered /view events awaiting flush", views["pending"]),
+        ("view_buffer_dropped", "Buffered /view events dropped because the buffer was full", views["dropped"]),
+        ("expiry_sweeper_expired", "Agreements marked expired by this process", expiry_sweeper.expired_total),
+        ("archive_sweeper_moved", "Agreements archived by this process", archive_sweeper.stats()["moved"]),
+        ("audit_events_compacted", "Audit events folded into audit_trail by this process", audit_compactor.compacted_events),
+        ("pdf_rendered", "Agreement PDFs rendered by this process", pdf_worker.rendered_count),
+        ("pdf_render_failed", "Agreement PDF renders that failed in this process", pdf_worker.failed_count),
+        ("event_stream_connections", "Open /api/events streams in this process", event_hub.connections()),
+        ("events_published", "Agreement events published by this process", event_hub.published),
+        ("events_delivered", "Agreement events delivered to streams in this process", event_hub.delivered),
+    ]
+
+metrics_registry.register_collector(service_gauges)
 
 @app.get("/api/test")
 async def test_endpoint():
@@ -90,10 +204,19 @@ async def test_endpoint():
     }
 
 if __name__ == "__main__":
+    if os.getenv("NODE_ENV") == "production":
+        # Preloaded multi-worker server; see gunicorn.conf.py
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        os.execvp("gunicorn", ["gunicorn", "-c", config, "main:app"])
+    import uvicorn
+    
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
-        reload=True if os.getenv("NODE_ENV") != "production" else False
+        reload=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        # Open /api/events streams would otherwise hold up every reload
+        timeout_graceful_shutdown=5
     ) 
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Initial schema: users and agreements
+
+Matches what ``Base.metadata.create_all`` produced before migrations were
+introduced. Tables are created only when missing, so databases bootstrapped
+by create_all or database/schema.sql can run ``alembic upgrade head`` as is.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("email", sa.String(255), unique=True, nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("phone", sa.String(20), nullable=False),
+        sa.Column("company_name", sa.String(255)),
+        sa.Column("license_number", sa.String(50)),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("profile_image_url", sa.String(500)),
+        sa.Column("is_verified", sa.Boolean),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("updated_at", sa.DateTime),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "agreements",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("client_name", sa.String(255), nullable=False),
+        sa.Column("client_phone", sa.String(20), nullable=False),
+        sa.Column("client_email", sa.String(255)),
+        sa.Column("meeting_type", sa.String(100), nullable=False),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("agreement_text", sa.Text, nullable=False),
+        sa.Column("status", sa.String(50)),
+        sa.Column("security_token", sa.String(255), unique=True, nullable=False),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+        sa.Column("viewed_at", sa.DateTime),
+        sa.Column("signed_at", sa.DateTime),
+        sa.Column("client_ip", sa.String(45)),
+        sa.Column("user_agent", sa.Text),
+        sa.Column("signature_data", sa.JSON),
+        sa.Column("pdf_url", sa.String(500)),
+        sa.Column("audit_trail", sa.JSON),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("updated_at", sa.DateTime),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("agreements")
+    op.drop_table("users")
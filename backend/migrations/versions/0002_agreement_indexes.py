@@ -0,0 +1,53 @@
+"""Indexes for the agreement hot paths
+
+* (user_id, created_at) for listings and keyset pagination; this also
+  covers every plain user_id filter, so the standalone user_id index from
+  database/schema.sql is dropped.
+* status, as declared in database/schema.sql.
+* expires_at for unsigned agreements only (partial). Postgres does not
+  allow now() in an index predicate, so "unexpired" cannot be the
+  predicate itself. Token lookups are served by the unique security_token
+  index; the expiry jobs read this one.
+
+The plain security_token index from schema.sql duplicates the unique
+constraint's index and is dropped as well.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "idx_agreements_user_id_created_at",
+        "agreements",
+        ["user_id", "created_at"],
+        if_not_exists=True,
+    )
+    op.create_index("idx_agreements_status", "agreements", ["status"], if_not_exists=True)
+    op.create_index(
+        "idx_agreements_open_expires_at",
+        "agreements",
+        ["expires_at"],
+        postgresql_where=sa.text("signed_at IS NULL"),
+        sqlite_where=sa.text("signed_at IS NULL"),
+        if_not_exists=True,
+    )
+    op.drop_index("idx_agreements_user_id", table_name="agreements", if_exists=True)
+    op.drop_index("idx_agreements_security_token", table_name="agreements", if_exists=True)
+
+
+def downgrade():
+    op.drop_index("idx_agreements_open_expires_at", table_name="agreements", if_exists=True)
+    op.drop_index("idx_agreements_status", table_name="agreements", if_exists=True)
+    op.drop_index("idx_agreements_user_id_created_at", table_name="agreements", if_exists=True)
+    op.create_index("idx_agreements_user_id", "agreements", ["user_id"], if_not_exists=True)
@@ -0,0 +1,41 @@
+"""SMS outbox table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sms_outbox",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("agreement_id", sa.String(36)),
+        sa.Column("to_phone", sa.String(20), nullable=False),
+        sa.Column("body", sa.Text, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime, nullable=False),
+        sa.Column("last_error", sa.Text),
+        sa.Column("provider_message_id", sa.String(64)),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("sent_at", sa.DateTime),
+    )
+    op.create_index(
+        "idx_sms_outbox_status_next_attempt_at",
+        "sms_outbox",
+        ["status", "next_attempt_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("idx_sms_outbox_status_next_attempt_at", table_name="sms_outbox")
+    op.drop_table("sms_outbox")
@@ -0,0 +1,220 @@
+"""Content-addressed agreement templates
+
+Moves agreement texts into agreement_templates, one row per distinct
+body, and reports how much storage the dedupe saved. A text stays in
+agreement_text when its template would not be smaller: a body no other
+agreement shares, plus the substitution map and the hash, can take more
+room than the text itself.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+import hashlib
+import json
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Templating as of this revision, frozen here rather than imported from
+# app.services.templates, which may have moved on
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+MIN_VARIABLE_LENGTH = 3
+
+agreements = sa.table(
+    "agreements",
+    sa.column("id", sa.String),
+    sa.column("user_id", sa.String),
+    sa.column("client_name", sa.String),
+    sa.column("client_phone", sa.String),
+    sa.column("client_email", sa.String),
+    sa.column("agreement_text", sa.Text),
+    sa.column("template_hash", sa.String),
+    sa.column("template_vars", sa.JSON),
+)
+users = sa.table(
+    "users",
+    sa.column("id", sa.String),
+    sa.column("first_name", sa.String),
+    sa.column("last_name", sa.String),
+    sa.column("phone", sa.String),
+    sa.column("company_name", sa.String),
+)
+templates = sa.table(
+    "agreement_templates",
+    sa.column("hash", sa.String),
+    sa.column("body", sa.Text),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def template_hash(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def render_template(body: str, variables: dict) -> str:
+    return PLACEHOLDER.sub(lambda match: variables.get(match.group(1), match.group(0)), body)
+
+
+def extract_template(text: str, variables: dict):
+    """(template body, substitution map) for ``text``; the text itself and
+    no variables when it has placeholder syntax or wouldn't round-trip"""
+    if PLACEHOLDER.search(text):
+        return text, {}
+    body = text
+    used = {}
+    for name, value in sorted(variables.items(), key=lambda item: -len(item[1] or "")):
+        if not value or len(value) < MIN_VARIABLE_LENGTH or value not in body:
+            continue
+        body = body.replace(value, "{{" + name + "}}")
+        used[name] = value
+    if render_template(body, used) != text:
+        return text, {}
+    return body, used
+
+
+def agreement_variables(row) -> dict:
+    variables = {"client_name": row.client_name, "client_phone": row.client_phone, "client_email": row.client_email}
+    if row.first_name is not None:
+        variables.update(
+            realtor_name=f"{row.first_name} {row.last_name}",
+            realtor_phone=row.phone,
+            realtor_company=row.company_name,
+        )
+    return variables
+
+
+def upgrade():
+    op.create_table(
+        "agreement_templates",
+        sa.Column("hash", sa.String(64), primary_key=True),
+        sa.Column("body", sa.Text, nullable=False),
+        sa.Column("created_at", sa.DateTime),
+    )
+    with op.batch_alter_table("agreements") as batch:
+        batch.add_column(sa.Column("template_hash", sa.String(64)))
+        batch.add_column(sa.Column("template_vars", sa.JSON))
+        batch.alter_column("agreement_text", existing_type=sa.Text, nullable=True)
+
+    dedupe_agreement_texts(op.get_bind())
+
+
+def dedupe_agreement_texts(conn):
+    stored = set(conn.execute(sa.select(templates.c.hash)).scalars())
+    moved = 0
+    kept = 0
+    bytes_before = 0
+    bytes_after = 0
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(
+                agreements.c.id,
+                agreements.c.client_name,
+                agreements.c.client_phone,
+                agreements.c.client_email,
+                agreements.c.agreement_text,
+                users.c.first_name,
+                users.c.last_name,
+                users.c.phone,
+                users.c.company_name,
+            )
+            .select_from(agreements.outerjoin(users, users.c.id == agreements.c.user_id))
+            .where(
+                agreements.c.template_hash.is_(None),
+                agreements.c.agreement_text.is_not(None),
+                agreements.c.id > last_id,
+            )
+            .order_by(agreements.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bodies = {}
+        groups = defaultdict(list)
+        for row in rows:
+            body, template_vars = extract_template(row.agreement_text, agreement_variables(row))
+            body_hash = template_hash(body)
+            bodies[body_hash] = body
+            groups[body_hash].append((row, template_vars))
+
+        new_templates = {}
+        updates = []
+        for body_hash, group in groups.items():
+            text_bytes = sum(len(row.agreement_text.encode()) for row, _ in group)
+            # Each row keeps its substitution map and the hash; a new body is stored once
+            row_bytes = sum(len(json.dumps(template_vars).encode()) + len(body_hash) for _, template_vars in group)
+            body_bytes = 0 if body_hash in stored else len(bodies[body_hash].encode())
+            bytes_before += text_bytes
+            if body_bytes + row_bytes >= text_bytes:
+                bytes_after += text_bytes
+                kept += len(group)
+                continue
+            if body_bytes:
+                new_templates[body_hash] = bodies[body_hash]
+            bytes_after += body_bytes + row_bytes
+            updates.extend(
+                {"row_id": row.id, "template_hash": body_hash, "template_vars": template_vars}
+                for row, template_vars in group
+            )
+
+        if new_templates:
+            now = datetime.utcnow()
+            conn.execute(
+                templates.insert(),
+                [{"hash": h, "body": body, "created_at": now} for h, body in new_templates.items()],
+            )
+            stored.update(new_templates)
+        if updates:
+            conn.execute(
+                agreements.update()
+                .where(agreements.c.id == sa.bindparam("row_id"))
+                .values(template_hash=sa.bindparam("template_hash"), template_vars=sa.bindparam("template_vars"), agreement_text=None),
+                updates,
+            )
+        moved += len(updates)
+        last_id = rows[-1].id
+
+    saved = bytes_before - bytes_after
+    percent = f" ({saved / bytes_before:.0%})" if bytes_before else ""
+    print(
+        f"Deduplicated {moved} agreements into {len(stored)} templates ({kept} kept as text, "
+        f"their template wouldn't be smaller): {bytes_before} -> {bytes_after} bytes of agreement text, "
+        f"saved {saved}{percent}"
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    bodies = dict(conn.execute(sa.select(templates.c.hash, templates.c.body)).all())
+    rows = conn.execute(
+        sa.select(agreements.c.id, agreements.c.template_hash, agreements.c.template_vars)
+        .where(agreements.c.template_hash.is_not(None))
+    ).all()
+    if rows:
+        conn.execute(
+            agreements.update()
+            .where(agreements.c.id == sa.bindparam("row_id"))
+            .values(agreement_text=sa.bindparam("text")),
+            [
+                {"row_id": row.id, "text": render_template(bodies[row.template_hash], row.template_vars or {})}
+                for row in rows
+            ],
+        )
+    with op.batch_alter_table("agreements") as batch:
+        batch.alter_column("agreement_text", existing_type=sa.Text, nullable=False)
+        batch.drop_column("template_vars")
+        batch.drop_column("template_hash")
+    op.drop_table("agreement_templates")
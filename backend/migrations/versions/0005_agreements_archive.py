@@ -0,0 +1,66 @@
+"""Agreements archive table
+
+On Postgres the archive is range-partitioned by created_at; the sweeper
+creates a partition per month as it moves rows in.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "agreements_archive",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("client_name", sa.String(255), nullable=False),
+        sa.Column("client_phone", sa.String(20), nullable=False),
+        sa.Column("client_email", sa.String(255)),
+        sa.Column("meeting_type", sa.String(100), nullable=False),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("agreement_text", sa.Text),
+        sa.Column("template_hash", sa.String(64)),
+        sa.Column("template_vars", sa.JSON),
+        sa.Column("status", sa.String(50)),
+        sa.Column("security_token", sa.String(255), nullable=False),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+        sa.Column("viewed_at", sa.DateTime),
+        sa.Column("signed_at", sa.DateTime),
+        sa.Column("client_ip", sa.String(45)),
+        sa.Column("user_agent", sa.Text),
+        sa.Column("signature_data", sa.JSON),
+        sa.Column("pdf_url", sa.String(500)),
+        sa.Column("audit_trail", sa.JSON),
+        sa.Column("created_at", sa.DateTime, primary_key=True),
+        sa.Column("updated_at", sa.DateTime),
+        sa.Column("archived_at", sa.DateTime, nullable=False),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "idx_agreements_archive_user_id_created_at",
+        "agreements_archive",
+        ["user_id", "created_at"],
+    )
+    op.create_index(
+        "idx_agreements_signed_at",
+        "agreements",
+        ["signed_at"],
+        postgresql_where=sa.text("signed_at IS NOT NULL"),
+        sqlite_where=sa.text("signed_at IS NOT NULL"),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("idx_agreements_signed_at", table_name="agreements")
+    op.drop_index("idx_agreements_archive_user_id_created_at", table_name="agreements_archive")
+    op.drop_table("agreements_archive")
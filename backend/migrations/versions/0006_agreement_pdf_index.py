@@ -0,0 +1,29 @@
+"""Partial index for signed agreements awaiting a PDF
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "idx_agreements_pdf_pending",
+        "agreements",
+        ["signed_at"],
+        postgresql_where=sa.text("signed_at IS NOT NULL AND pdf_url IS NULL"),
+        sqlite_where=sa.text("signed_at IS NOT NULL AND pdf_url IS NULL"),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("idx_agreements_pdf_pending", table_name="agreements")
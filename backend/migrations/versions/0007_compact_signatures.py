@@ -0,0 +1,276 @@
+"""Compact signature storage
+
+Adds signature_blob to agreements and agreements_archive and moves every
+stored signature into it (packed strokes or raw PNG bytes), leaving a small
+summary in signature_data. Signatures that don't validate are left as they
+are. Reports how much storage the conversion saved.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import base64
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from operator import sub
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+TABLES = ("agreements", "agreements_archive")
+
+# The blob format and signature rules as of this revision, frozen here so
+# later changes to app.services.signatures or the request schema don't
+# change what this migration does. Blob: a format byte, then for strokes
+# zlib-compressed little-endian data (uint32 stroke count, uint32 points
+# per stroke, int16 x/y deltas in tenths of a unit), for PNG the PNG bytes.
+STROKES = 1
+PNG = 2
+PRECISION = 10
+MAX_QUANTIZED = 32767
+MAX_POINTS = 20000
+MAX_IMAGE_CHARACTERS = 262144
+PNG_DATA_URL_PREFIX = "data:image/png;base64,"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def pack_strokes(strokes) -> bytes:
+    counts = [len(stroke) for stroke in strokes]
+    flat = [round(value * PRECISION) for stroke in strokes for point in stroke for value in point]
+    if flat and (min(flat) < 0 or max(flat) > MAX_QUANTIZED):
+        flat = [min(max(value, 0), MAX_QUANTIZED) for value in flat]
+    deltas = array("h", flat[:2])
+    deltas.extend(map(sub, flat[2:], flat))
+    header = struct.pack(f"<I{len(counts)}I", len(counts), *counts)
+    return bytes([STROKES]) + zlib.compress(header + _little_endian(deltas).tobytes())
+
+
+def unpack_strokes(blob: bytes):
+    raw = zlib.decompress(blob[1:])
+    (count,) = struct.unpack_from("<I", raw)
+    counts = struct.unpack_from(f"<{count}I", raw, 4)
+    deltas = array("h")
+    deltas.frombytes(raw[4 + 4 * count:])
+    _little_endian(deltas)
+    points = [
+        [x / PRECISION, y / PRECISION]
+        for x, y in zip(accumulate(deltas[0::2]), accumulate(deltas[1::2]))
+    ]
+    strokes = []
+    start = 0
+    for n in counts:
+        strokes.append(points[start:start + n])
+        start += n
+    return strokes
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("not a finite number")
+    return float(value)
+
+
+def _point(value) -> tuple:
+    # [x, y] or signature_pad's {"x", "y", "time", "pressure"}; extra values are dropped
+    if isinstance(value, dict):
+        value = (value.get("x"), value.get("y"))
+    if not isinstance(value, (list, tuple)) or len(value) < 2:
+        raise ValueError("not a point")
+    return _number(value[0]), _number(value[1])
+
+
+def _stroke(value) -> list:
+    # signature_pad's {"points": [...], "penColor": ...} groups
+    if isinstance(value, dict):
+        value = value.get("points")
+    if not isinstance(value, list):
+        raise ValueError("not a stroke")
+    return [_point(point) for point in value]
+
+
+def _optional(data: dict, key: str, check):
+    value = data.get(key)
+    return None if value is None else check(value)
+
+
+def _dimension(value) -> float:
+    value = _number(value)
+    if value <= 0:
+        raise ValueError("not a positive size")
+    return value
+
+
+def _timestamp(value) -> str:
+    if not isinstance(value, str) or len(value) > 64:
+        raise ValueError("not a timestamp")
+    return value
+
+
+def _flag(value) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError("not a boolean")
+    return value
+
+
+def compact_signature(data) -> tuple:
+    """(blob, summary) for a stored signature; ValueError if it isn't one
+    the sign endpoint would have accepted"""
+    if not isinstance(data, dict):
+        raise ValueError("not a signature")
+    signature, strokes = data.get("signature"), data.get("strokes")
+    if (signature is None) == (strokes is None):
+        raise ValueError("provide either signature or strokes")
+    summary = {
+        "timestamp": _optional(data, "timestamp", _timestamp),
+        "clientConsent": _optional(data, "clientConsent", _flag),
+    }
+    if strokes is not None:
+        if not isinstance(strokes, list):
+            raise ValueError("strokes is not a list")
+        strokes = [_stroke(stroke) for stroke in strokes]
+        points = sum(len(stroke) for stroke in strokes)
+        if not 0 < points <= MAX_POINTS:
+            raise ValueError("no points, or too many")
+        blob = pack_strokes(strokes)
+        summary.update(
+            format="strokes",
+            strokes=len(strokes),
+            points=points,
+            width=_optional(data, "width", _dimension),
+            height=_optional(data, "height", _dimension),
+        )
+    else:
+        if not isinstance(signature, str) or len(signature) > MAX_IMAGE_CHARACTERS:
+            raise ValueError("signature image is too large")
+        if not signature.startswith(PNG_DATA_URL_PREFIX):
+            raise ValueError("not a PNG data URL")
+        png = base64.b64decode(signature[len(PNG_DATA_URL_PREFIX):], validate=True)
+        if not png.startswith(PNG_MAGIC):
+            raise ValueError("not a PNG image")
+        blob = bytes([PNG]) + png
+        summary["format"] = "png"
+    summary["bytes"] = len(blob)
+    return blob, {key: value for key, value in summary.items() if value is not None}
+
+
+def decode_signature(blob: bytes, summary) -> dict:
+    """The signature in the shape the client sent it"""
+    decoded = {key: value for key, value in (summary or {}).items() if key != "bytes"}
+    if blob[0] == STROKES:
+        decoded["strokes"] = unpack_strokes(blob)
+    elif blob[0] == PNG:
+        decoded["signature"] = PNG_DATA_URL_PREFIX + base64.b64encode(blob[1:]).decode()
+    return decoded
+
+
+def signatures_table(name: str):
+    return sa.table(
+        name,
+        sa.column("id", sa.String),
+        sa.column("signature_data", sa.JSON),
+        sa.column("signature_blob", sa.LargeBinary),
+    )
+
+
+def upgrade():
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch:
+            batch.add_column(sa.Column("signature_blob", sa.LargeBinary))
+
+    conn = op.get_bind()
+    for name in TABLES:
+        compact_signatures(conn, signatures_table(name))
+
+
+def compact_signatures(conn, table):
+    converted = 0
+    skipped = 0
+    bytes_before = 0
+    bytes_after = 0
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.signature_data)
+            .where(
+                table.c.signature_data.is_not(None),
+                table.c.signature_blob.is_(None),
+                table.c.id > last_id,
+            )
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            data = row.signature_data
+            # The old endpoint stored the whole request body: {"signature_data": {...}}
+            if isinstance(data, dict) and isinstance(data.get("signature_data"), dict):
+                data = data["signature_data"]
+            try:
+                blob, summary = compact_signature(data)
+            except ValueError:
+                skipped += 1
+                continue
+            bytes_before += len(json.dumps(row.signature_data).encode())
+            bytes_after += len(blob) + len(json.dumps(summary).encode())
+            updates.append({"row_id": row.id, "data": summary, "blob": blob})
+
+        if updates:
+            conn.execute(
+                table.update()
+                .where(table.c.id == sa.bindparam("row_id"))
+                .values(signature_data=sa.bindparam("data"), signature_blob=sa.bindparam("blob")),
+                updates,
+            )
+            converted += len(updates)
+
+    saved = bytes_before - bytes_after
+    percent = f" ({saved / bytes_before:.0%})" if bytes_before else ""
+    print(
+        f"Compacted {converted} signatures in {table.name} ({skipped} left as they were): "
+        f"{bytes_before} -> {bytes_after} bytes, saved {saved}{percent}"
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    for name in TABLES:
+        table = signatures_table(name)
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.signature_data, table.c.signature_blob)
+            .where(table.c.signature_blob.is_not(None))
+        ).all()
+        if rows:
+            conn.execute(
+                table.update()
+                .where(table.c.id == sa.bindparam("row_id"))
+                .values(signature_data=sa.bindparam("data")),
+                [
+                    {"row_id": row.id, "data": {"signature_data": decode_signature(row.signature_blob, row.signature_data)}}
+                    for row in rows
+                ],
+            )
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch:
+            batch.drop_column("signature_blob")
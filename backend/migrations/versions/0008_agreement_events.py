@@ -0,0 +1,37 @@
+"""Append-only agreement_events table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "agreement_events",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("agreement_id", sa.String(36), nullable=False),
+        sa.Column("event", sa.String(30), nullable=False),
+        sa.Column("at", sa.DateTime, nullable=False),
+        sa.Column("client_ip", sa.String(45)),
+        sa.Column("user_agent", sa.Text),
+        sa.Column("data", sa.JSON),
+    )
+    op.create_index(
+        "idx_agreement_events_agreement_id_at",
+        "agreement_events",
+        ["agreement_id", "at"],
+    )
+
+
+def downgrade():
+    op.drop_index("idx_agreement_events_agreement_id_at", table_name="agreement_events")
+    op.drop_table("agreement_events")
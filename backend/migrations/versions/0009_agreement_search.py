@@ -0,0 +1,128 @@
+"""Client search index
+
+Creates agreement_search (an FTS5 table on SQLite; a table with a
+pg_trgm GIN index on Postgres, which needs the pg_trgm and btree_gin
+extensions) and indexes every existing agreement, live and archived.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# The index as of this revision, frozen here rather than imported from
+# app.database and app.services.search, which may have moved on
+SEARCH_INDEX_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS agreement_search USING fts5("
+        "agreement_id UNINDEXED, user_id, created_at UNINDEXED, "
+        "client_name, client_phone, client_email, meeting_type, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "CREATE TABLE IF NOT EXISTS agreement_search ("
+        "agreement_id VARCHAR(36) PRIMARY KEY, "
+        "user_id VARCHAR(36) NOT NULL, "
+        "created_at TIMESTAMP NOT NULL, "
+        "client_name TEXT NOT NULL, "
+        "client_phone TEXT NOT NULL, "
+        "client_email TEXT NOT NULL, "
+        "meeting_type TEXT NOT NULL, "
+        "document TEXT GENERATED ALWAYS AS "
+        "(client_name || ' ' || client_phone || ' ' || client_email || ' ' || meeting_type) STORED)",
+        "CREATE INDEX IF NOT EXISTS idx_agreement_search_user_id_document "
+        "ON agreement_search USING gin (user_id, document gin_trgm_ops)",
+    ],
+}
+
+SEARCH_COLUMNS = ("id", "user_id", "created_at", "client_name", "client_phone", "client_email", "meeting_type")
+TERM = re.compile(r"[^\W_]+")
+PHONE_SUFFIXES = (7, 4)
+
+agreement_search = sa.table(
+    "agreement_search",
+    sa.column("agreement_id", sa.String),
+    sa.column("user_id", sa.String),
+    sa.column("created_at", sa.DateTime),
+    sa.column("client_name", sa.Text),
+    sa.column("client_phone", sa.Text),
+    sa.column("client_email", sa.Text),
+    sa.column("meeting_type", sa.Text),
+)
+
+
+def agreements_table(name: str):
+    return sa.table(
+        name,
+        sa.column("id", sa.String),
+        sa.column("user_id", sa.String),
+        sa.column("created_at", sa.DateTime),
+        sa.column("client_name", sa.String),
+        sa.column("client_phone", sa.String),
+        sa.column("client_email", sa.String),
+        sa.column("meeting_type", sa.String),
+    )
+
+
+def normalize(text) -> str:
+    """The words of a field, lowercased with accents stripped"""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(TERM.findall(folded))
+
+
+def phone_terms(phone) -> str:
+    """The number's digits, then its last seven and last four"""
+    number = "".join(char for char in (phone or "") if char.isdigit())
+    suffixes = [number[-length:] for length in PHONE_SUFFIXES if len(number) > length]
+    return " ".join([number] + suffixes)
+
+
+def search_entry(row) -> dict:
+    return {
+        "agreement_id": str(row.id),
+        # Without dashes, so FTS5 keeps the owner one token
+        "user_id": str(row.user_id).replace("-", ""),
+        "created_at": row.created_at,
+        "client_name": normalize(row.client_name),
+        "client_phone": phone_terms(row.client_phone),
+        "client_email": normalize(row.client_email),
+        "meeting_type": normalize(row.meeting_type),
+    }
+
+
+def upgrade():
+    conn = op.get_bind()
+    for statement in SEARCH_INDEX_DDL[conn.dialect.name]:
+        op.execute(statement)
+    conn.execute(agreement_search.delete())
+    # Oldest first, so entries are in creation order as if indexed on create
+    sources = sa.union_all(*(
+        sa.select(*(table.c[name] for name in SEARCH_COLUMNS))
+        for table in (agreements_table("agreements"), agreements_table("agreements_archive"))
+    )).order_by(sa.literal_column("created_at"), sa.literal_column("id"))
+    indexed = 0
+    result = conn.execution_options(yield_per=BATCH_SIZE).execute(sources)
+    for rows in result.partitions():
+        conn.execute(agreement_search.insert(), [search_entry(row) for row in rows])
+        indexed += len(rows)
+    print(f"Indexed {indexed} agreements for search")
+
+
+def downgrade():
+    # The extensions stay; other objects may use them
+    op.execute("DROP TABLE IF EXISTS agreement_search")
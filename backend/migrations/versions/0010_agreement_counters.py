@@ -0,0 +1,78 @@
+"""Per-realtor agreement counters
+
+Creates agreement_counters, marks unsigned agreements already past expiry
+as expired, and counts every realtor's agreements, live and archived.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+# As of this revision; app.services.counters may have moved on
+STATUSES = ("draft", "viewed", "signed", "expired")
+OPEN_STATUSES = ("draft", "viewed")
+
+counters_table = sa.table(
+    "agreement_counters",
+    sa.column("user_id", sa.String),
+    *(sa.column(status, sa.Integer) for status in STATUSES),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def agreements_table(name: str):
+    return sa.table(
+        name,
+        sa.column("user_id", sa.String),
+        sa.column("status", sa.String),
+        sa.column("signed_at", sa.DateTime),
+        sa.column("expires_at", sa.DateTime),
+    )
+
+
+def upgrade():
+    op.create_table(
+        "agreement_counters",
+        sa.Column("user_id", sa.String(36), primary_key=True),
+        sa.Column("draft", sa.Integer, nullable=False),
+        sa.Column("viewed", sa.Integer, nullable=False),
+        sa.Column("signed", sa.Integer, nullable=False),
+        sa.Column("expired", sa.Integer, nullable=False),
+        sa.Column("updated_at", sa.DateTime),
+    )
+    conn = op.get_bind()
+    now = datetime.utcnow()
+    tables = [agreements_table("agreements"), agreements_table("agreements_archive")]
+    for table in tables:
+        conn.execute(
+            table.update()
+            .where(table.c.signed_at.is_(None), table.c.expires_at <= now, table.c.status.in_(OPEN_STATUSES))
+            .values(status="expired")
+        )
+    statuses = sa.union_all(*(sa.select(table.c.user_id, table.c.status) for table in tables)).subquery()
+    counters = {}
+    for user_id, status, count in conn.execute(
+        sa.select(statuses.c.user_id, statuses.c.status, sa.func.count()).group_by(statuses.c.user_id, statuses.c.status)
+    ):
+        if status in STATUSES:
+            counters.setdefault(user_id, dict.fromkeys(STATUSES, 0))[status] = count
+    if counters:
+        conn.execute(counters_table.insert(), [
+            {"user_id": user_id, "updated_at": now, **counts} for user_id, counts in counters.items()
+        ])
+    print(f"Counted agreements for {len(counters)} realtors")
+
+
+def downgrade():
+    # Agreements marked expired keep that status; it is what they are
+    op.drop_table("agreement_counters")
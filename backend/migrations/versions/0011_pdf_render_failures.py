@@ -0,0 +1,36 @@
+"""PDF render failures on the agreement
+
+Adds pdf_attempts, pdf_error and pdf_retry_at to agreements and
+agreements_archive, so the PDF worker backs off from an agreement that
+fails to render, across restarts and workers.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+TABLES = ("agreements", "agreements_archive")
+
+
+def upgrade():
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch:
+            batch.add_column(sa.Column("pdf_attempts", sa.Integer))
+            batch.add_column(sa.Column("pdf_error", sa.String(1000)))
+            batch.add_column(sa.Column("pdf_retry_at", sa.DateTime))
+
+
+def downgrade():
+    for name in TABLES:
+        with op.batch_alter_table(name) as batch:
+            batch.drop_column("pdf_retry_at")
+            batch.drop_column("pdf_error")
+            batch.drop_column("pdf_attempts")
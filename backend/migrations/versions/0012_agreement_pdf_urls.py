@@ -0,0 +1,36 @@
+"""Agreement PDFs behind the authenticated endpoint
+
+Rewrites pdf_url from the public content-addressed path
+(/api/agreements/pdfs/<digest>.pdf) to the realtor-only
+/api/agreements/<id>/pdf?v=<digest>. The files themselves don't move.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+TABLES = ("agreements", "agreements_archive")
+OLD_PREFIX = "/api/agreements/pdfs/"
+
+
+def upgrade():
+    for name in TABLES:
+        op.execute(
+            f"UPDATE {name} SET pdf_url = '/api/agreements/' || id || '/pdf?v=' || "
+            f"substr(pdf_url, {len(OLD_PREFIX) + 1}, 64) WHERE pdf_url LIKE '{OLD_PREFIX}%'"
+        )
+
+
+def downgrade():
+    for name in TABLES:
+        op.execute(
+            f"UPDATE {name} SET pdf_url = '{OLD_PREFIX}' || "
+            f"substr(pdf_url, length(pdf_url) - 63, 64) || '.pdf' WHERE pdf_url LIKE '/api/agreements/%/pdf?v=%'"
+        )
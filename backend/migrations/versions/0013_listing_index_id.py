@@ -0,0 +1,35 @@
+"""Agreement listing indexes end in id
+
+Keyset pages are ordered by (created_at, id). With (user_id, created_at)
+alone, SQLite sorts each page's ties on id in a temp B-tree; with id in
+the index the page is read in order and stops at the limit. Same names,
+so nothing that refers to them changes.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("idx_agreements_user_id_created_at", "agreements"),
+    ("idx_agreements_archive_user_id_created_at", "agreements_archive"),
+)
+
+
+def upgrade():
+    for name, table_name in INDEXES:
+        op.drop_index(name, table_name=table_name, if_exists=True)
+        op.create_index(name, table_name, ["user_id", "created_at", "id"])
+
+
+def downgrade():
+    for name, table_name in INDEXES:
+        op.drop_index(name, table_name=table_name, if_exists=True)
+        op.create_index(name, table_name, ["user_id", "created_at"])
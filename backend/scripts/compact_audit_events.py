@@ -0,0 +1,23 @@
+"""Run one audit compaction pass against DATABASE_URL and print what it folded.
+
+For deployments that schedule compaction externally (cron, a Railway job)
+with AUDIT_COMPACT_INTERVAL=0 on the web workers:
+
+    python scripts/compact_audit_events.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.audit_log import audit_compactor
+
+
+def main():
+    result = asyncio.run(audit_compactor.compact())
+    print(f"Compacted {result['events']} events of {result['agreements']} agreements ({result['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Rebuild the client search index from agreements and agreements_archive.
+
+Migration 0009 builds the index once and the create endpoints keep it
+current. Run this after loading agreements some other way (a restore,
+a bulk import), or if the index is suspected to have drifted:
+
+    python scripts/rebuild_search_index.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.search import rebuild_search_index
+
+
+def main():
+    started = time.perf_counter()
+    # One transaction: searches see the old index until the new one is complete
+    with engine.begin() as connection:
+        indexed = rebuild_search_index(connection)
+    print(f"Indexed {indexed} agreements in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Rebuild the dashboard counters (agreement_counters) from the agreements.
+
+The create, view and sign endpoints and the expiry sweeper move the
+counters in the same transaction as each status change, so they only
+drift if agreements are changed some other way (a restore, a manual fix
+in SQL). This also marks unsigned agreements past expiry as expired:
+
+    python scripts/reconcile_counters.py
+
+It runs in one transaction that counts every agreement; on Postgres,
+counter updates from requests wait for it.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.counters import reconcile_counters
+
+
+def main():
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        counted = reconcile_counters(connection)
+    print(f"Counted agreements for {counted} realtors in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
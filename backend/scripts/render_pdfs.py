@@ -0,0 +1,86 @@
+"""Render signed-agreement PDFs in bulk against DATABASE_URL.
+
+By default only agreements without a PDF are rendered, including those
+the worker gave up on after PDF_MAX_ATTEMPTS failures. ``--all`` re-renders
+every signed agreement and repoints ``pdf_url``, e.g. after a layout
+change. Old files stay in the store, since other rows may still reference
+them.
+
+    python scripts/render_pdfs.py
+    python scripts/render_pdfs.py --all --batch-size 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer
+
+from app.database import AsyncSessionLocal, Agreement
+from app.services.pdf_store import pdf_url
+from app.services.pdf_worker import pdf_worker
+
+
+async def render_all(rerender: bool, batch_size: int):
+    rendered = 0
+    failed = 0
+    last_id = ""
+    started = time.perf_counter()
+    while True:
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(Agreement)
+                .options(undefer(Agreement.signature_blob))
+                .where(Agreement.signed_at.is_not(None), Agreement.id > last_id)
+                .order_by(Agreement.id)
+                .limit(batch_size)
+            )
+            if not rerender:
+                query = query.where(Agreement.pdf_url.is_(None))
+            agreements = (await db.execute(query)).scalars().all()
+            if not agreements:
+                break
+            snapshots = []
+            for agreement in agreements:
+                try:
+                    snapshots.append((agreement, await pdf_worker.snapshot(db, agreement)))
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {agreement.id}: {e}")
+        # Rendered with no transaction open, so requests don't wait on the
+        # batch; each pdf_url is its own short write
+        for agreement, pdf_input in snapshots:
+            try:
+                digest = await pdf_worker.render_snapshot(pdf_input)
+            except Exception as e:
+                failed += 1
+                print(f"❌ {agreement.id}: {e}")
+                continue
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Agreement)
+                    .where(Agreement.id == agreement.id)
+                    .values(pdf_url=pdf_url(agreement.id, digest), pdf_error=None, pdf_retry_at=None)
+                )
+                await db.commit()
+            rendered += 1
+        last_id = agreements[-1].id
+    elapsed = time.perf_counter() - started
+    rate = rendered / elapsed if elapsed else 0.0
+    print(f"Rendered {rendered} PDFs ({failed} failed) in {elapsed:.2f}s, {rate:.1f} PDFs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--all", action="store_true", help="re-render agreements that already have a PDF")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(render_all(args.all, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
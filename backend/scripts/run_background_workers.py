@@ -0,0 +1,39 @@
+"""Run the scheduled jobs (SMS outbox, expiry and archive sweepers, audit
+compaction, PDF renders) against DATABASE_URL until SIGTERM or SIGINT.
+
+For deployments with more than one web worker, which then run with
+BACKGROUND_WORKERS=false so the jobs have exactly one copy:
+
+    python scripts/run_background_workers.py
+
+Set the same EVENTS_REDIS_URL as the web workers so the events these jobs
+publish (agreement.expired, agreement.pdf_ready) reach realtors' streams.
+"""
+import asyncio
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.background import start_background_jobs, stop_background_jobs
+
+
+async def run():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+    start_background_jobs()
+    print("⚙️ Background jobs running")
+    await stopping.wait()
+    await stop_background_jobs()
+    print("🛑 Background jobs stopped")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Keep a SQLite file following the SQLite primary, as a local read replica.
+
+SQLite has no replication, so this copies the primary into the replica
+file with SQLite's online backup every ``--interval`` seconds; the copy
+lags by up to that long, like a real replica under load. To try read
+replicas locally:
+
+    python scripts/sqlite_replica.py ./replica.db --interval 2
+    DATABASE_REPLICA_URLS=sqlite:///./replica.db python main.py
+
+Stop it, or delete the file, to see reads fail over to the primary.
+With ``--once`` it copies once and exits.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+
+def copy_database(source: str, target: str) -> float:
+    """Copy ``source`` into ``target`` page by page; returns the seconds taken.
+    Readers of ``target`` see the old or the new copy, never a mix."""
+    started = time.perf_counter()
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(target)
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("replica", help="path of the replica file")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between copies")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "sqlite":
+        sys.exit("DATABASE_URL is not SQLite; use the database's own replication")
+    source = engine.url.database
+    if os.path.abspath(source) == os.path.abspath(args.replica):
+        sys.exit("The replica must be a different file from the primary")
+
+    while True:
+        elapsed = copy_database(source, args.replica)
+        print(f"Copied {source} to {args.replica} in {elapsed * 1000:.0f} ms")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Run one archive sweep against DATABASE_URL and print what it moved.
+
+For deployments that schedule the sweep externally (cron, a Railway job)
+with ARCHIVE_SWEEP_INTERVAL=0 on the web workers:
+
+    python scripts/sweep_archive.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.archive import archive_sweeper
+
+
+def main():
+    result = asyncio.run(archive_sweeper.sweep())
+    print(f"Moved {result['moved']} agreements in {result['batches']} batches ({result['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
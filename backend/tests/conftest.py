@@ -0,0 +1,83 @@
+"""Shared fixtures. The app reads its settings at import, so the test
+database, PDF store and transports are chosen here, before anything
+imports it."""
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="homeshow-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{TEST_DIR}/app.db",
+    PDF_STORAGE_DIR=os.path.join(TEST_DIR, "pdfs"),
+    BCRYPT_ROUNDS="4",
+    SMS_TRANSPORT="fake",
+    NODE_ENV="test",
+)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def alembic(*args, url: str):
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True,
+    )
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def migrated_url():
+    """A database built by ``alembic upgrade head`` rather than create_all"""
+    url = f"sqlite:///{TEST_DIR}/migrated.db"
+    result = alembic("upgrade", "head", url=url)
+    assert result.returncode == 0, result.stderr
+    return url
+
+
+@pytest.fixture
+def client(app):
+    """Requests without the lifespan: background workers don't run, tests
+    drive them directly"""
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+
+def register(client, **fields) -> dict:
+    """A new realtor; returns ``{"id", "headers"}``"""
+    data = dict(email=f"{uuid.uuid4().hex}@example.com", password="pw", first_name="Ana",
+                last_name="Realtor", phone="5550100", state="CA")
+    data.update(fields)
+    response = client.post("/api/auth/register", json=data)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return {"id": body["user"]["id"], "headers": {"Authorization": f"Bearer {body['access_token']}"}}
+
+
+@pytest.fixture
+def realtor(client):
+    return register(client)
+
+
+def create_agreement(client, realtor, **fields) -> dict:
+    data = dict(client_name="Jane Doe", client_phone="5550199", meeting_type="showing", state="CA",
+                agreement_text="I, Jane Doe, agree to meet Ana Realtor.")
+    data.update(fields)
+    response = client.post("/api/agreements/", headers=realtor["headers"], json=data)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+SIGNATURE = {"signature_data": {"strokes": [[[10, 10], [20, 25], [30, 12]]], "clientConsent": True}}
+
+
+def sign(client, token: str, payload: dict = SIGNATURE):
+    return client.post(f"/api/agreements/public/{token}/sign", json=payload)
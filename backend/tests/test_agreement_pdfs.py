@@ -0,0 +1,50 @@
+import asyncio
+import io
+
+import pytest
+from pypdf import PdfReader
+
+from app.services.pdf_worker import pdf_worker
+from tests.conftest import create_agreement, register, sign
+
+
+@pytest.fixture
+def signed(client, realtor):
+    agreement = create_agreement(client, realtor)
+    assert sign(client, agreement["security_token"]).status_code == 200
+    asyncio.run(pdf_worker.process_batch())
+    listed = client.get("/api/agreements/user", headers=realtor["headers"]).json()
+    return next(item for item in listed if item["id"] == agreement["id"])
+
+
+def test_pdf_url_is_the_authenticated_endpoint(signed):
+    assert signed["pdf_url"].startswith(f"/api/agreements/{signed['id']}/pdf?v=")
+
+
+def test_realtor_gets_the_pdf(client, realtor, signed):
+    response = client.get(signed["pdf_url"], headers=realtor["headers"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["cache-control"] == "private, no-store"
+    text = PdfReader(io.BytesIO(response.content)).pages[0].extract_text()
+    assert "Jane Doe" in text
+
+
+def test_range_requests(client, realtor, signed):
+    response = client.get(signed["pdf_url"], headers={**realtor["headers"], "Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert len(response.content) == 100
+
+
+def test_pdf_needs_auth(client, signed):
+    assert client.get(signed["pdf_url"]).status_code in (401, 403)
+
+
+def test_other_realtor_gets_404(client, signed):
+    other = register(client)
+    assert client.get(signed["pdf_url"], headers=other["headers"]).status_code == 404
+
+
+def test_unsigned_agreement_has_no_pdf(client, realtor):
+    agreement = create_agreement(client, realtor)
+    assert client.get(f"/api/agreements/{agreement['id']}/pdf", headers=realtor["headers"]).status_code == 404
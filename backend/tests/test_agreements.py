@@ -0,0 +1,16 @@
+from tests.conftest import create_agreement
+
+
+def test_security_token_only_in_create_responses(client, realtor):
+    created = create_agreement(client, realtor)
+    assert created["security_token"]
+
+    bulk = client.post("/api/agreements/bulk", headers=realtor["headers"], json={"items": [
+        dict(client_name="John Roe", client_phone="5550198", meeting_type="showing", state="CA",
+             agreement_text="I, John Roe, agree to meet Ana Realtor."),
+    ]}).json()
+    assert bulk["results"][0]["agreement"]["security_token"]
+
+    rows = client.get("/api/agreements/user", headers=realtor["headers"]).json()
+    assert {row["id"] for row in rows} == {created["id"], bulk["results"][0]["agreement"]["id"]}
+    assert all("security_token" not in row for row in rows)
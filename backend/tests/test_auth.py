@@ -0,0 +1,31 @@
+import time
+
+from jose import jwt
+
+from app.core.config import settings
+from tests.conftest import register
+
+
+def token_claims(realtor) -> dict:
+    return jwt.get_unverified_claims(realtor["headers"]["Authorization"].split()[1])
+
+
+def lifetime(claims) -> float:
+    return claims["exp"] - time.time()
+
+
+def test_token_lasts_jwt_expires_in(client):
+    claims = token_claims(register(client))
+    assert "profile" not in claims
+    assert settings.JWT_EXPIRES_IN - 60 < lifetime(claims) <= settings.JWT_EXPIRES_IN
+
+
+def test_profile_claims_cap_the_token_lifetime(client, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_PROFILE_CLAIMS", True)
+    realtor = register(client, first_name="Claire")
+    claims = token_claims(realtor)
+    assert claims["profile"]["first_name"] == "Claire"
+    assert settings.JWT_PROFILE_CLAIMS_EXPIRES_IN - 60 < lifetime(claims) <= settings.JWT_PROFILE_CLAIMS_EXPIRES_IN
+
+    response = client.get("/api/auth/profile", headers=realtor["headers"])
+    assert response.status_code == 200 and response.json()["first_name"] == "Claire"
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.background import BACKGROUND_JOBS
+from app.services.sms_outbox import sms_worker
+from app.services.view_buffer import view_buffer
+
+
+def test_lifespan_leaves_jobs_to_the_background_process(app, monkeypatch):
+    monkeypatch.setattr(settings, "BACKGROUND_WORKERS", False)
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert view_buffer._task is not None
+        assert all(job._task is None for job in BACKGROUND_JOBS)
+
+
+def test_lifespan_runs_jobs_by_default(app, monkeypatch):
+    monkeypatch.setattr(sms_worker, "transport", None)  # start() creates one
+    with TestClient(app):
+        assert all(job._task is not None for job in BACKGROUND_JOBS)
+    assert all(job._task is None for job in BACKGROUND_JOBS)
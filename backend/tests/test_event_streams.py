@@ -0,0 +1,137 @@
+"""The realtor event stream: how it is authenticated, and what idle
+streams cost a running server"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from tests.conftest import BACKEND_DIR, TEST_DIR, create_agreement, register
+
+IDLE_STREAMS = 300
+MAX_KB_PER_STREAM = 64
+
+
+def test_ticket_needs_auth(client):
+    assert client.post("/api/events/ticket").status_code in (401, 403)
+
+
+def test_ticket_opens_streams_only(client, realtor):
+    response = client.post("/api/events/ticket", headers=realtor["headers"])
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert response.json()["expires_in"] == settings.EVENTS_TICKET_SECONDS
+    assert client.get("/api/auth/profile", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+
+
+def test_access_token_is_not_a_ticket(client, realtor):
+    token = realtor["headers"]["Authorization"].split()[1]
+    assert client.get("/api/events", params={"ticket": token}).status_code == 401
+    assert client.get("/api/events", params={"access_token": token}).status_code == 401
+
+
+def test_expired_ticket_is_refused(client, realtor, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_TICKET_SECONDS", -1)
+    ticket = client.post("/api/events/ticket", headers=realtor["headers"]).json()["ticket"]
+    assert client.get("/api/events", params={"ticket": ticket}).status_code == 401
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def resident_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("no VmRSS")
+
+
+@pytest.fixture(scope="module")
+def server():
+    """uvicorn running the app in one process, with its own database"""
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{TEST_DIR}/streams.db",
+        "ARCHIVE_SWEEP_INTERVAL": "0",
+        "PDF_RENDER_ENABLED": "false",
+        # One realtor holds every stream, so every stream gets the event
+        "EVENTS_MAX_STREAMS_PER_USER": str(IDLE_STREAMS + 100),
+        # Closed streams are noticed at the next heartbeat; shutdown waits for them
+        "EVENTS_HEARTBEAT_SECONDS": "1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, start_new_session=True,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise
+            time.sleep(0.05)
+        yield process, port, httpx.Client(base_url=base_url, timeout=30)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+async def open_stream(port: int, ticket: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/events?ticket={ticket} HTTP/1.1\r\nHost: test\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    await reader.readuntil(b": connected\n\n")
+    return reader, writer
+
+
+def test_idle_streams_are_cheap_and_all_get_the_event(server):
+    process, port, client = server
+    realtor = register(client)
+    agreement = create_agreement(client, realtor)
+    ticket = client.post("/api/events/ticket", headers=realtor["headers"]).json()["ticket"]
+
+    async def run():
+        # Warm up allocator pools and lazily imported code with a few streams
+        warmup = [await open_stream(port, ticket) for _ in range(10)]
+        await asyncio.sleep(0.5)
+        before = resident_kb(process.pid)
+        streams = []
+        for batch in range(0, IDLE_STREAMS, 100):
+            streams += await asyncio.gather(*(open_stream(port, ticket) for _ in range(min(100, IDLE_STREAMS - batch))))
+        await asyncio.sleep(0.5)
+        per_stream_kb = (resident_kb(process.pid) - before) / IDLE_STREAMS
+
+        # Open streams hold no database connection
+        pool = (await asyncio.to_thread(client.get, "/health")).json()["pool"]
+        assert pool.get("checkedout", 0) == 0, pool
+
+        waiting = [asyncio.create_task(reader.readuntil(b"event: agreement.signed")) for reader, _ in streams]
+        response = await asyncio.to_thread(
+            client.post, f"/api/agreements/public/{agreement['security_token']}/sign",
+            json={"signature_data": {"strokes": [[[10, 10], [20, 20]]]}},
+        )
+        assert response.status_code == 200, response.text
+        await asyncio.wait_for(asyncio.gather(*waiting), timeout=10)
+        for _, writer in streams + warmup:
+            writer.close()
+        return per_stream_kb
+
+    per_stream_kb = asyncio.run(run())
+    assert per_stream_kb < MAX_KB_PER_STREAM, f"{per_stream_kb:.1f} KB per idle stream"
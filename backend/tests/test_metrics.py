@@ -0,0 +1,11 @@
+from app.core.config import settings
+from tests.conftest import create_agreement
+
+
+def test_slow_request_log_names_the_route_not_the_token(client, realtor, capsys, monkeypatch):
+    token = create_agreement(client, realtor)["security_token"]
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SECONDS", 1e-9)
+    client.post(f"/api/agreements/public/{token}/view")
+    logged = capsys.readouterr().out
+    assert "Slow request: POST /api/agreements/public/{token}/view -> 200" in logged
+    assert token not in logged
@@ -0,0 +1,75 @@
+import json
+import sqlite3
+
+from tests.conftest import TEST_DIR, alembic
+
+BOILERPLATE = "agrees to tour the listed properties with the realtor named below and to " * 4
+
+
+def test_models_match_migrations(migrated_url):
+    """Autogenerate finds nothing to do on a migrated database: the models
+    and migrations agree, and the search index's own tables are left alone"""
+    result = alembic("check", url=migrated_url)
+    assert result.returncode == 0, result.stderr
+
+
+def test_data_migrations_convert_existing_rows():
+    """Rows written before 0004 come out templated (where that is smaller),
+    with compact signatures, indexed for search and counted"""
+    from app.services.signatures import decode_signature
+
+    path = f"{TEST_DIR}/legacy.db"
+    url = f"sqlite:///{path}"
+    result = alembic("upgrade", "0003", url=url)
+    assert result.returncode == 0, result.stderr
+
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "INSERT INTO users (id, email, password_hash, first_name, last_name, phone, state) "
+            "VALUES ('u-1', 'ana@example.com', 'x', 'Ana', 'Realtor', '5550100', 'CA')"
+        )
+        rows = [
+            ("a-1", "Jane Doe", "signed", "2099-01-01", {"signature_data": {"strokes": [[[10, 10], [20, 25]]], "clientConsent": True}}),
+            ("a-2", "John Roe", "signed", "2099-01-01", {"signature_data": {"strokes": "not strokes"}}),
+            ("a-3", "Mary Major", "draft", "2000-01-01", None),
+        ]
+        for agreement_id, name, status, expires_at, signature in rows:
+            db.execute(
+                "INSERT INTO agreements (id, user_id, client_name, client_phone, meeting_type, state, agreement_text, "
+                "status, security_token, expires_at, signed_at, signature_data, created_at) "
+                "VALUES (?, 'u-1', ?, '5550199', 'showing', 'CA', ?, ?, ?, ?, ?, ?, '2026-01-01 00:00:00')",
+                (agreement_id, name, f"{name} {BOILERPLATE}Ana Realtor", status, f"token-{agreement_id}", expires_at,
+                 "2026-01-02 00:00:00" if status == "signed" else None, json.dumps(signature) if signature else None),
+            )
+        # A body no other agreement shares: its template would be larger than the text
+        db.execute(
+            "INSERT INTO agreements (id, user_id, client_name, client_phone, meeting_type, state, agreement_text, "
+            "status, security_token, expires_at, created_at) "
+            "VALUES ('a-4', 'u-1', 'Zed Zee', '5550188', 'showing', 'CA', 'Zed Zee meets Ana Realtor.', 'draft', "
+            "'token-a-4', '2099-01-01', '2026-01-01 00:00:00')"
+        )
+
+    result = alembic("upgrade", "head", url=url)
+    assert result.returncode == 0, result.stderr
+
+    with sqlite3.connect(path) as db:
+        db.row_factory = sqlite3.Row
+        agreements = {row["id"]: row for row in db.execute("SELECT * FROM agreements")}
+        assert db.execute("SELECT count(*) FROM agreement_templates").fetchone()[0] == 1
+        for agreement_id in ("a-1", "a-2", "a-3"):
+            assert agreements[agreement_id]["agreement_text"] is None
+            assert agreements[agreement_id]["template_hash"] is not None
+        assert json.loads(agreements["a-1"]["template_vars"])["client_name"] == "Jane Doe"
+        assert agreements["a-4"]["agreement_text"] == "Zed Zee meets Ana Realtor."
+        assert agreements["a-4"]["template_hash"] is None
+
+        summary = json.loads(agreements["a-1"]["signature_data"])
+        assert summary["format"] == "strokes" and summary["points"] == 2
+        assert decode_signature(agreements["a-1"]["signature_blob"], summary)["strokes"] == [[[10.0, 10.0], [20.0, 25.0]]]
+        assert agreements["a-2"]["signature_blob"] is None
+
+        assert agreements["a-3"]["status"] == "expired"
+        counters = db.execute("SELECT draft, viewed, signed, expired FROM agreement_counters WHERE user_id = 'u-1'").fetchone()
+        assert tuple(counters) == (1, 0, 2, 1)
+        matches = db.execute("SELECT count(*) FROM agreement_search WHERE agreement_search MATCH 'client_name : jane'")
+        assert matches.fetchone()[0] == 1
@@ -0,0 +1,19 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/health/details"])
+def test_ops_endpoints_need_internal_network_or_token(client, realtor, monkeypatch, path):
+    monkeypatch.setattr(settings, "OPS_TOKEN", "ops-secret")
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers=realtor["headers"]).status_code == 404
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 404
+    assert client.get(path, headers={"Authorization": "Bearer ops-secret"}).status_code == 200
+
+    monkeypatch.setattr(settings, "OPS_TOKEN", None)
+    assert client.get(path, headers={"Authorization": "Bearer "}).status_code == 404
+    monkeypatch.setattr(settings, "OPS_ALLOW_IPS", "10.0.0.0/8, 127.0.0.1")
+    internal = TestClient(client.app, client=("10.1.2.3", 50000))
+    assert internal.get(path).status_code == 200
@@ -0,0 +1,69 @@
+import base64
+import struct
+import zlib
+
+import pytest
+
+from app.services.pdf import png_image, UnsupportedImage
+from tests.conftest import create_agreement, sign
+
+
+def chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def make_png(width, height, color_type=6, bit_depth=8, idat=None, interlace=0, palette=None) -> bytes:
+    """A PNG with the given header; blank pixels unless ``idat`` is given"""
+    if idat is None:
+        channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+        stride = (width * channels * bit_depth + 7) // 8
+        idat = zlib.compress(b"".join(b"\0" + bytes(stride) for _ in range(height)))
+    png = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, interlace))
+    if palette is not None:
+        png += chunk(b"PLTE", palette)
+    return png + chunk(b"IDAT", idat) + chunk(b"IEND", b"")
+
+
+def data_url(png: bytes) -> dict:
+    return {"signature_data": {"signature": "data:image/png;base64," + base64.b64encode(png).decode()}}
+
+
+@pytest.mark.parametrize("width,height", [(2001, 10), (10, 1001), (0, 10), (40000, 40000)])
+def test_sign_rejects_oversized_png(client, realtor, width, height):
+    agreement = create_agreement(client, realtor)
+    response = sign(client, agreement["security_token"], data_url(make_png(width, height, idat=b"")))
+    assert response.status_code == 422
+
+
+def test_sign_rejects_interlaced_png(client, realtor):
+    agreement = create_agreement(client, realtor)
+    response = sign(client, agreement["security_token"], data_url(make_png(10, 10, interlace=1)))
+    assert response.status_code == 422
+
+
+def test_sign_accepts_largest_png(client, realtor):
+    agreement = create_agreement(client, realtor)
+    assert sign(client, agreement["security_token"], data_url(make_png(2000, 1000))).status_code == 200
+
+
+def test_renderer_rejects_oversized_png():
+    # A row stored before /sign checked the size
+    with pytest.raises(UnsupportedImage):
+        png_image(make_png(30000, 30000, idat=b""))
+
+
+def test_renderer_rejects_zlib_bomb():
+    # 100x100 RGBA needs 40,100 bytes; this stream inflates to 50 MB
+    bomb = zlib.compress(bytes(50 * 1024 * 1024), 9)
+    with pytest.raises(UnsupportedImage):
+        png_image(make_png(100, 100, idat=bomb))
+
+
+def test_renderer_rejects_short_image_data():
+    with pytest.raises(UnsupportedImage):
+        png_image(make_png(100, 100, idat=zlib.compress(bytes(1000))))
+
+
+def test_renderer_rejects_corrupt_image_data():
+    with pytest.raises(UnsupportedImage):
+        png_image(make_png(100, 100, idat=b"not zlib at all"))
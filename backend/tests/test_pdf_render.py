@@ -0,0 +1,284 @@
+"""Round trips through the PDF writer, read back with pypdf and fontTools"""
+import io
+import random
+import zlib
+from datetime import datetime
+
+import pytest
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import GlyphComponent
+from pypdf import PdfReader
+
+from app.services.pdf import render_agreement_pdf, png_image, UnrenderableText
+from app.services.pdf_fonts import TrueTypeFont, FontError
+from app.services.signatures import pack_png, pack_strokes
+from tests.test_pdf_png import chunk, make_png
+
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def agreement(**fields) -> dict:
+    data = {
+        "id": "7c0c2b0e-0000-4000-8000-000000000001",
+        "client_name": "Jane Doe",
+        "client_phone": "5550199",
+        "meeting_type": "showing",
+        "state": "CA",
+        "agreement_text": "I, Jane Doe, agree to meet Ana Realtor.",
+        "signature_blob": pack_strokes([[(10, 10), (20, 25), (30, 12)]]),
+        "signed_at": datetime(2026, 1, 2, 3, 4, 5),
+        "audit_trail": [],
+    }
+    data.update(fields)
+    return data
+
+
+def read(pdf: bytes) -> PdfReader:
+    return PdfReader(io.BytesIO(pdf), strict=True)
+
+
+def text(pdf: bytes) -> str:
+    return "\n".join(page.extract_text() for page in read(pdf).pages)
+
+
+# PNG encoding, for images with every row filter the decoder has to undo
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+
+
+def filter_row(kind: int, row: bytes, prev: bytes, bpp: int) -> bytes:
+    out = bytearray()
+    for i, value in enumerate(row):
+        left = row[i - bpp] if i >= bpp else 0
+        up = prev[i]
+        up_left = prev[i - bpp] if i >= bpp else 0
+        predictor = [0, left, up, (left + up) >> 1, _paeth(left, up, up_left)][kind]
+        out.append((value - predictor) & 0xFF)
+    return bytes([kind]) + bytes(out)
+
+
+def encode_png(width, height, color_type, bit_depth, rows, palette=None) -> bytes:
+    stride = (width * CHANNELS[color_type] * bit_depth + 7) // 8
+    bpp = max(CHANNELS[color_type] * bit_depth // 8, 1)
+    prev = bytes(stride)
+    raw = b""
+    for y, row in enumerate(rows):
+        raw += filter_row(y % 5, row, prev, bpp)
+        prev = row
+    return make_png(width, height, color_type, bit_depth, idat=zlib.compress(raw), palette=palette)
+
+
+def random_rows(width, height, color_type, bit_depth, seed=1, blank_rows=()):
+    rng = random.Random(seed)
+    stride = (width * CHANNELS[color_type] * bit_depth + 7) // 8
+    return [bytes(stride) if y in blank_rows else bytes(rng.randrange(256) for _ in range(stride)) for y in range(height)]
+
+
+@pytest.mark.parametrize("color_type", [4, 6])
+def test_alpha_png_is_split_into_colour_and_mask(color_type):
+    # Rows cycle through all five filters; blank rows take the fast paths
+    width, height = 23, 17
+    rows = random_rows(width, height, color_type, 8, blank_rows={3, 4, 9})
+    image = png_image(encode_png(width, height, color_type, 8, rows))
+    pixels = b"".join(rows)
+    channels = CHANNELS[color_type]
+    expected_color = bytes(b for i, b in enumerate(pixels) if i % channels != channels - 1)
+    assert zlib.decompress(image["stream"]) == expected_color
+    assert zlib.decompress(image["smask"]) == pixels[channels - 1::channels]
+
+
+@pytest.mark.parametrize("color_type,bit_depth", [(0, 8), (0, 16), (2, 8), (2, 16), (3, 8), (4, 8), (6, 8)])
+def test_signature_image_round_trips_through_the_pdf(color_type, bit_depth):
+    width, height = 19, 11
+    rows = random_rows(width, height, color_type, bit_depth)
+    palette = bytes(random.Random(2).randrange(256) for _ in range(3 * 2 ** min(bit_depth, 8))) if color_type == 3 else None
+    png = encode_png(width, height, color_type, bit_depth, rows, palette=palette)
+    pdf = render_agreement_pdf(agreement(signature_blob=pack_png(png)))
+
+    xobjects = read(pdf).pages[0]["/Resources"]["/XObject"]
+    (image,) = [xobjects[name].get_object() for name in xobjects]
+    assert (image["/Width"], image["/Height"]) == (width, height)
+    channels = CHANNELS[color_type]
+    pixels = b"".join(rows)
+    if color_type in (4, 6):
+        assert image.get_data() == bytes(b for i, b in enumerate(pixels) if i % channels != channels - 1)
+        assert image["/SMask"].get_object().get_data() == pixels[channels - 1::channels]
+    else:
+        assert image.get_data() == pixels
+        assert "/SMask" not in image
+
+
+@pytest.mark.parametrize("color_type,bit_depth", [(0, 1), (0, 2), (3, 4)])
+def test_sub_byte_images_pass_through(color_type, bit_depth):
+    # pypdf's PNG predictor can't undo sub-byte rows (it takes 0 bytes per
+    # pixel), so check the stream is the PNG's own data with the right parameters
+    width, height = 19, 11
+    rows = random_rows(width, height, color_type, bit_depth)
+    palette = bytes(range(3 * 2 ** bit_depth)) if color_type == 3 else None
+    png = encode_png(width, height, color_type, bit_depth, rows, palette=palette)
+    pdf = render_agreement_pdf(agreement(signature_blob=pack_png(png)))
+
+    xobjects = read(pdf).pages[0]["/Resources"]["/XObject"]
+    (image,) = [xobjects[name].get_object() for name in xobjects]
+    parameters = image["/DecodeParms"]
+    assert (parameters["/Predictor"], parameters["/Colors"]) == (15, 1)
+    assert (parameters["/BitsPerComponent"], parameters["/Columns"]) == (bit_depth, width)
+    assert image["/BitsPerComponent"] == bit_depth
+    assert image._data == png[png.index(b"IDAT") + 4:png.index(b"IEND") - 8]
+
+
+@pytest.mark.parametrize("png", [
+    make_png(10, 10, interlace=1),
+    make_png(10, 10, color_type=3),  # no palette
+    make_png(10, 10, color_type=6, bit_depth=16),
+    make_png(10, 10, idat=b"garbage"),
+    make_png(10, 10)[:40],  # truncated
+    b"\x89PNG\r\n\x1a\n" + chunk(b"IEND", b""),  # no header
+], ids=["interlaced", "no-palette", "16-bit-alpha", "corrupt", "truncated", "no-header"])
+def test_unusable_png_falls_back_to_a_checksum_line(png):
+    pdf = render_agreement_pdf(agreement(signature_blob=pack_png(png)))
+    assert "/XObject" not in read(pdf).pages[0]["/Resources"]
+    assert "Electronic signature on file" in text(pdf)
+
+
+def test_stroke_signature_is_drawn_as_paths():
+    pdf = render_agreement_pdf(agreement())
+    content = read(pdf).pages[0].get_contents().get_data()
+    assert b" l S" in content
+
+
+def test_output_is_deterministic():
+    assert render_agreement_pdf(agreement()) == render_agreement_pdf(agreement())
+
+
+def test_long_text_wraps_and_paginates():
+    body = "\n".join(f"Clause {n}: " + "the client agrees " * 12 for n in range(120))
+    reader = read(render_agreement_pdf(agreement(agreement_text=body)))
+    assert len(reader.pages) > 1
+    assert "Clause 119" in "".join(page.extract_text() for page in reader.pages)
+
+
+# Fonts
+
+CJK = "李小龍"
+
+
+def square(width: int):
+    pen = TTGlyphPen(None)
+    pen.moveTo((50, 0))
+    pen.lineTo((50, 700))
+    pen.lineTo((width - 50, 700))
+    pen.lineTo((width - 50, 0))
+    pen.closePath()
+    return pen.glyph()
+
+
+@pytest.fixture(scope="module")
+def cjk_font(tmp_path_factory) -> str:
+    """A TrueType font with Latin letters, 李 and 小 as outlines, 龍 as a
+    composite of those two, and an unused glyph with an outline"""
+    latin = [chr(c) for c in range(32, 127)]
+    names = [".notdef"] + [f"uni{ord(c):04X}" for c in latin] + ["uni674E", "uni5C0F", "uni9F8D", "unused"]
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(names)
+    cmap = {ord(c): f"uni{ord(c):04X}" for c in latin}
+    cmap.update({0x674E: "uni674E", 0x5C0F: "uni5C0F", 0x9F8D: "uni9F8D"})
+    builder.setupCharacterMap(cmap)
+    glyphs = {name: square(600) for name in names}
+    dragon = TTGlyphPen(None).glyph()
+    dragon.numberOfContours = -1
+    dragon.components = []
+    for component_name in ("uni674E", "uni5C0F"):
+        component = GlyphComponent()
+        component.glyphName, component.x, component.y, component.flags = component_name, 0, 0, 0
+        dragon.components.append(component)
+    glyphs["uni9F8D"] = dragon
+    builder.setupGlyf(glyphs)
+    metrics = {name: (600, 50) for name in names}
+    metrics.update({"uni674E": (1000, 50), "uni5C0F": (1000, 50), "uni9F8D": (1000, 50)})
+    builder.setupHorizontalMetrics(metrics)
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({"familyName": "Test CJK", "styleName": "Regular"})
+    builder.setupOS2()
+    builder.setupPost()
+    path = tmp_path_factory.mktemp("fonts") / "cjk.ttf"
+    builder.save(str(path))
+    return str(path)
+
+
+def embedded_font(pdf: bytes) -> tuple:
+    fonts = read(pdf).pages[0]["/Resources"]["/Font"]
+    type0 = fonts["/F4"].get_object()
+    descendant = type0["/DescendantFonts"][0].get_object()
+    data = descendant["/FontDescriptor"].get_object()["/FontFile2"].get_object().get_data()
+    return type0, descendant, TTFont(io.BytesIO(data))
+
+
+def test_latin_text_uses_the_standard_fonts():
+    pdf = render_agreement_pdf(agreement(client_name="José Müller"))
+    assert "/F4" not in read(pdf).pages[0]["/Resources"]["/Font"]
+    assert "José Müller" in text(pdf)
+    assert read(pdf).metadata.title == "Meeting Agreement - José Müller"
+
+
+@pytest.mark.parametrize("name", ["Nguyễn Văn An", CJK])
+def test_text_without_a_font_is_refused(name):
+    with pytest.raises(UnrenderableText) as error:
+        render_agreement_pdf(agreement(client_name=name))
+    assert error.value.characters
+    assert "PDF_UNICODE_FONT" in str(error.value)
+
+
+def test_cjk_text_is_embedded_and_extractable(cjk_font):
+    font = TrueTypeFont(open(cjk_font, "rb").read())
+    pdf = render_agreement_pdf(agreement(client_name=CJK, agreement_text=f"{CJK} agrees."), font)
+    assert CJK in text(pdf)
+    assert read(pdf).metadata.title == f"Meeting Agreement - {CJK}"
+
+    type0, descendant, subset = embedded_font(pdf)
+    assert type0["/Encoding"] == "/Identity-H"
+    assert descendant["/CIDToGIDMap"] == "/Identity"
+    glyf = subset["glyf"]
+    order = subset.getGlyphOrder()
+    assert len(order) == font.glyph_count  # ids unchanged
+    # Used glyphs, and the components of the composite, keep their outlines
+    for char in "李小":
+        assert glyf[order[font.glyph(char)]].numberOfContours > 0
+    assert glyf[order[font.glyph("龍")]].isComposite()
+    assert glyf[order[len(order) - 1]].numberOfContours == 0  # the unused glyph
+    widths = list(descendant["/W"])
+    assert widths[widths.index(font.glyph("李")) + 1] == [1000]
+
+
+def test_subset_keeps_composite_components_when_only_the_composite_is_used(cjk_font):
+    font = TrueTypeFont(open(cjk_font, "rb").read())
+    subset = TTFont(io.BytesIO(font.subset([font.glyph("龍")])))
+    order = subset.getGlyphOrder()
+    assert subset["glyf"][order[font.glyph("李")]].numberOfContours > 0
+    assert subset["glyf"][order[font.glyph("A")]].numberOfContours == 0
+
+
+def test_wide_glyphs_wrap_within_the_margins(cjk_font):
+    font = TrueTypeFont(open(cjk_font, "rb").read())
+    pdf = render_agreement_pdf(agreement(agreement_text=CJK * 60), font)
+    # 180 full-width glyphs at 10pt are 1800pt; a line holds 504pt
+    assert text(pdf).count(CJK[0]) == 60
+    content = read(pdf).pages[0].get_contents().get_data()
+    assert content.count(b"/F4 10 Tf") >= 4
+
+
+def test_characters_missing_from_the_font_are_refused(cjk_font):
+    font = TrueTypeFont(open(cjk_font, "rb").read())
+    with pytest.raises(UnrenderableText) as error:
+        render_agreement_pdf(agreement(client_name="李小龍 Ωmega"), font)
+    assert error.value.characters == ["Ω"]
+
+
+def test_non_truetype_fonts_are_rejected():
+    with pytest.raises(FontError):
+        TrueTypeFont(b"OTTO" + bytes(100))
@@ -0,0 +1,82 @@
+"""The hot queries, as the routers and services build them, must not fall
+back to a table scan on a migrated database, and keyset pages must be read
+in index order rather than sorted."""
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+CURSOR = (datetime(2026, 10, 1), "ffffffff-ffff-ffff-ffff-ffffffffffff")
+
+# SQLite: "SCAN agreements" (older versions: "SCAN TABLE agreements").
+# "SCAN agreement_search VIRTUAL TABLE INDEX 0:M..." is a MATCH lookup in the FTS5 index.
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)\b(?! VIRTUAL TABLE INDEX \d+:M)")
+WATCHED_TABLES = (
+    "users", "agreements", "agreements_archive", "agreement_events", "agreement_search", "agreement_counters",
+)
+
+
+@pytest.fixture(scope="module")
+def migrated(migrated_url):
+    engine = create_engine(migrated_url)
+    yield engine
+    engine.dispose()
+
+
+def hot_queries():
+    from app.routers.agreements import active_agreement_query, search_results_query, user_agreements_query
+    from app.routers.auth import user_by_email_query, user_query
+    from app.services.archive import archive_batch_query
+    from app.services.audit_log import timeline_query
+    from app.services.counters import expirable_query, summary_query
+    from app.services.pdf_worker import pdf_batch_query
+    from app.services.search import ranked_queries
+
+    now = datetime.utcnow()
+    return {
+        "get_current_user": user_query(USER_ID),
+        "login/register by email": user_by_email_query("realtor@example.com"),
+        "agreement by signed link": active_agreement_query("token", USER_ID, now),
+        "agreement by opaque token": active_agreement_query("token", None, now),
+        "user agreements (first page)": user_agreements_query(USER_ID, None, None, None, None, 50, True),
+        "user agreements (after cursor)": user_agreements_query(USER_ID, None, None, None, CURSOR, 50, True),
+        "user agreements (live only)": user_agreements_query(USER_ID, None, None, None, CURSOR, 50, False),
+        "user agreements by status": user_agreements_query(USER_ID, "signed", None, None, None, None, True),
+        "expiry sweeper candidates": expirable_query(now, 500),
+        "signed agreements awaiting a PDF": pdf_batch_query(now, 20),
+        "dashboard summary": summary_query(USER_ID),
+        "archive sweeper candidates": archive_batch_query(now, 500),
+        **{
+            f"client search ({tier})": statement
+            for tier, statement in enumerate(ranked_queries("sqlite", USER_ID, ["smith"], 20), 1)
+        },
+        "client search results": search_results_query([USER_ID]),
+        "agreement timeline": timeline_query(USER_ID, 500),
+    }
+
+
+def query_plan(engine, statement) -> list:
+    with engine.connect() as connection:
+        sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+        return [row[-1].strip() for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_uses_an_index(migrated, name):
+    plan = query_plan(migrated, hot_queries()[name])
+    scans = [line for line in plan if (match := SCAN.match(line)) and match.group(1) in WATCHED_TABLES]
+    assert not scans, f"{name}: {' | '.join(plan)}"
+
+
+@pytest.mark.parametrize("include_archived", [True, False])
+@pytest.mark.parametrize("cursor", [None, CURSOR])
+def test_keyset_page_is_read_in_index_order(migrated, include_archived, cursor):
+    from app.routers.agreements import user_agreements_query
+
+    plan = query_plan(migrated, user_agreements_query(USER_ID, None, None, None, cursor, 50, include_archived))
+    # Each side of the union is a bounded page; only merging those pages may sort
+    assert not [line for line in plan if "RIGHT PART OF ORDER BY" in line], " | ".join(plan)
+    if not include_archived:
+        assert not [line for line in plan if "TEMP B-TREE" in line], " | ".join(plan)
@@ -0,0 +1,30 @@
+from sqlalchemy import delete
+
+from app.database import Agreement, SessionLocal
+from app.routers import agreements as agreements_router
+from tests.conftest import create_agreement, sign
+
+
+def test_agreement_is_signed_once(client, realtor):
+    agreement = create_agreement(client, realtor)
+    assert sign(client, agreement["security_token"]).status_code == 200
+    response = sign(client, agreement["security_token"])
+    assert response.status_code == 400, response.text
+
+
+def test_agreement_archived_while_signing_is_not_found(client, realtor, monkeypatch):
+    """The archive sweeper moves the row between the read and the guarded
+    UPDATE: the UPDATE matches nothing and the row can't be re-read"""
+    agreement = create_agreement(client, realtor)
+    get_active_agreement = agreements_router.get_active_agreement
+
+    async def read_then_archive(db, token, agreement_id=None):
+        found = await get_active_agreement(db, token, agreement_id)
+        with SessionLocal() as other:
+            other.execute(delete(Agreement).where(Agreement.id == found.id))
+            other.commit()
+        return found
+
+    monkeypatch.setattr(agreements_router, "get_active_agreement", read_then_archive)
+    response = sign(client, agreement["security_token"])
+    assert response.status_code == 404, response.text
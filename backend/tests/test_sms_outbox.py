@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core.config import settings
+from app.database import AgreementEvent, SessionLocal, SmsOutbox
+from app.services.sms import FakeSmsTransport
+from app.services.sms_outbox import SmsOutboxWorker, sms_worker
+from tests.conftest import create_agreement
+
+
+@pytest.fixture
+def outbox(client, realtor):
+    """An empty outbox holding one queued message for a new agreement"""
+    with SessionLocal() as db:
+        db.execute(delete(SmsOutbox))
+        db.commit()
+    agreement = create_agreement(client, realtor, client_phone="5550142")
+    return agreement["id"]
+
+
+@pytest.fixture
+def worker():
+    return SmsOutboxWorker(FakeSmsTransport())
+
+
+def outbox_rows():
+    with SessionLocal() as db:
+        return db.execute(select(SmsOutbox).order_by(SmsOutbox.id)).scalars().all()
+
+
+def make_due():
+    with SessionLocal() as db:
+        db.execute(update(SmsOutbox).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+
+
+def test_transport_is_created_on_start_not_import():
+    assert sms_worker.transport is None
+    assert sms_worker.enabled  # SMS_TRANSPORT=fake: agreements still queue messages
+
+
+def test_message_is_sent_once(outbox, worker):
+    assert asyncio.run(worker.process_batch()) == 1
+    (message,) = worker.transport.sent
+    assert message["to"] == "5550142" and "?token=" in message["body"]
+    (row,) = outbox_rows()
+    assert (row.status, row.attempts, row.provider_message_id) == ("sent", 1, "FAKE000001")
+    assert asyncio.run(worker.process_batch()) == 0
+    with SessionLocal() as db:
+        events = db.execute(select(AgreementEvent.event).where(AgreementEvent.agreement_id == outbox)).scalars().all()
+    assert "sms_sent" in events
+
+
+def test_claimed_message_is_not_claimed_again(outbox, worker):
+    other = SmsOutboxWorker(FakeSmsTransport())
+
+    async def claim_twice():
+        from app.database import AsyncSessionLocal
+        async with AsyncSessionLocal() as db:
+            first = await worker._claim(db)
+        async with AsyncSessionLocal() as db:
+            second = await other._claim(db)
+        return first, second
+
+    first, second = asyncio.run(claim_twice())
+    assert len(first) == 1 and second == []
+    (row,) = outbox_rows()
+    assert row.status == "sending" and row.next_attempt_at > datetime.utcnow()
+
+    # The first worker died mid-send: once its lease runs out the message is due again
+    make_due()
+    assert asyncio.run(other.process_batch()) == 1
+    assert outbox_rows()[0].status == "sent"
+
+
+def test_failed_send_is_retried_with_backoff(outbox, worker):
+    worker.transport.fail_next = 2
+    asyncio.run(worker.process_batch())
+    (row,) = outbox_rows()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert "fake transport failure" in row.last_error
+    delay = (row.next_attempt_at - datetime.utcnow()).total_seconds()
+    assert settings.SMS_RETRY_BASE_SECONDS - 5 < delay <= settings.SMS_RETRY_BASE_SECONDS
+
+    # Not due yet
+    assert asyncio.run(worker.process_batch()) == 0
+
+    make_due()
+    asyncio.run(worker.process_batch())
+    row = outbox_rows()[0]
+    delay = (row.next_attempt_at - datetime.utcnow()).total_seconds()
+    assert row.attempts == 2 and 2 * settings.SMS_RETRY_BASE_SECONDS - 5 < delay
+
+    make_due()
+    asyncio.run(worker.process_batch())
+    row = outbox_rows()[0]
+    assert (row.status, row.attempts, row.last_error) == ("sent", 3, None)
+    assert worker.stats()["retried"] == 2
+
+
+def test_gives_up_after_max_attempts(outbox, worker, monkeypatch):
+    monkeypatch.setattr(settings, "SMS_MAX_ATTEMPTS", 2)
+    worker.transport.fail_next = 5
+    asyncio.run(worker.process_batch())
+    make_due()
+    asyncio.run(worker.process_batch())
+    (row,) = outbox_rows()
+    assert (row.status, row.attempts) == ("failed", 2)
+    make_due()
+    assert asyncio.run(worker.process_batch()) == 0
+    assert worker.transport.sent == []
+    assert worker.stats()["failed"] == 1
+    with SessionLocal() as db:
+        events = db.execute(select(AgreementEvent.event).where(AgreementEvent.agreement_id == outbox)).scalars().all()
+    assert "sms_failed" in events
+
+
+def test_sent_messages_are_purged_after_retention(client, realtor, outbox, worker):
+    asyncio.run(worker.process_batch())
+    create_agreement(client, realtor)  # still pending
+
+    assert asyncio.run(worker.purge()) == 0
+    later = datetime.utcnow() + timedelta(hours=settings.SMS_OUTBOX_RETENTION_HOURS, minutes=5)
+    assert asyncio.run(worker.purge(later)) == 1
+    assert [row.status for row in outbox_rows()] == ["pending"]
+    assert worker.stats()["purged"] == 1
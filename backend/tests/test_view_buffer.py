@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import view_buffer as view_buffer_module
+from app.services.view_buffer import ViewEventBuffer
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    monkeypatch.setattr(settings, "VIEW_BUFFER_MAX_PENDING", 3)
+    return ViewEventBuffer()
+
+
+def buffered_ips(buffer) -> list:
+    return [event["client_ip"] for event in buffer._pending]
+
+
+def test_full_buffer_drops_the_oldest_views(buffer):
+    for n in range(5):
+        buffer.record("agreement", f"10.0.0.{n}", "agent")
+    assert buffered_ips(buffer) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert buffer.stats()["dropped"] == 2
+    assert buffer.stats()["buffered"] == 5
+
+
+def test_failed_flush_keeps_views_within_the_cap(buffer, monkeypatch):
+    def unavailable():
+        raise ConnectionError("database unavailable")
+
+    buffer.record("agreement", "10.0.0.1", "agent")
+    buffer.record("agreement", "10.0.0.2", "agent")
+    monkeypatch.setattr(view_buffer_module, "AsyncSessionLocal", unavailable)
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+    assert buffered_ips(buffer) == ["10.0.0.1", "10.0.0.2"]
+
+    buffer.record("agreement", "10.0.0.3", "agent")
+    buffer.record("agreement", "10.0.0.4", "agent")
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+    # Retried views go back ahead of newer ones, and the oldest go first
+    assert buffered_ips(buffer) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert buffer.stats()["dropped"] == 1
+    assert buffer.stats()["flushed"] == 0
+
+    monkeypatch.undo()
+    assert asyncio.run(buffer.flush()) == 3
+    assert buffer.pending == 0